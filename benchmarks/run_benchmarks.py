@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import numpy as np
+from time import perf_counter
+from multiprocessing import Process, Queue
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stages import stages
+from libraries.memory import format_mib, peak_rss
+
+
+def _run_stage(name: str, n: int, repeat: int, directory: str, results: Queue) -> None:
+    os.chdir(directory)
+    run, items = stages[name](n)
+
+    # the timings are taken without tracemalloc, which slows allocations down a lot
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        run()
+        seconds = min(seconds, perf_counter() - start)
+
+    tracemalloc.start()
+    run()
+    tracemalloc_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    results.put({
+        "stage": name,
+        "n": n,
+        "items": items,
+        "seconds": seconds,
+        "items_per_second": items / seconds if seconds > 0 else None,
+        "tracemalloc_peak": tracemalloc_peak,
+        "peak_rss": peak_rss(include_children=False),
+    })
+
+
+def run_benchmark(name: str, n: int, repeat: int = 3) -> dict:
+    """
+    Times a stage at a given size in a fresh process.
+
+    Running each stage in its own process keeps the peak RSS of one stage out of the others.
+
+    Parameters:
+    name (str): the name of the stage, a key of stages
+    n (int): the size of the polycubes the stage works on
+    repeat (int): the number of timed runs, the fastest one is kept
+
+    Returns:
+    dict: the stage, n, the number of items, the best time, the throughput,
+        the tracemalloc peak and the peak RSS of the process in bytes
+
+    """
+    directory = tempfile.mkdtemp(prefix="polycube_bench_")
+    results = Queue()
+    process = Process(target=_run_stage, args=(name, n, repeat, directory, results))
+    try:
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            raise RuntimeError(f"benchmark of {name} n={n} failed")
+        result = results.get()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return result
+
+
+def environment() -> dict:
+    """
+    Describes what the benchmarks ran on, so results can be compared across commits.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+
+def compare(results: list[dict], baseline: list[dict]) -> None:
+    """
+    Prints the speedup of each stage against a previous run.
+
+    Parameters:
+    results (list[dict]): the results of this run
+    baseline (list[dict]): the results of a previous run
+    """
+    previous = {(result["stage"], result["n"]): result for result in baseline}
+    for result in results:
+        before = previous.get((result["stage"], result["n"]))
+        if before is not None:
+            rss_ratio = "n/a" if result["peak_rss"] is None or not before["peak_rss"] \
+                else f"{result['peak_rss'] / before['peak_rss']:.2f}x"
+            print(f"{result['stage']:>27} n={result['n']}: {before['seconds'] / result['seconds']:.2f}x speed, "
+                  f"{rss_ratio} peak RSS")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog='Polycube Benchmarks',
+        description='Times the stages of polycube generation and saves the results as JSON.')
+
+    parser.add_argument('--n', type=int, nargs='+', default=[6, 7],
+                        help='The sizes of polycubes to benchmark')
+    parser.add_argument('--stages', nargs='+', choices=list(stages), default=list(stages),
+                        help='The stages to benchmark')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='The number of timed runs of each stage, the fastest one is kept')
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='The JSON file to write the results to')
+    parser.add_argument('--compare',
+                        help='A JSON file of a previous run to compare against')
+
+    args = parser.parse_args()
+
+    results = []
+    for n in args.n:
+        for name in args.stages:
+            result = run_benchmark(name, n, args.repeat)
+            results.append(result)
+            print(f"{name:>27} n={n}: {result['items']} items in {result['seconds']:.3f}s, "
+                  f"{result['items_per_second']:,.0f} items/s, "
+                  f"tracemalloc peak {result['tracemalloc_peak'] / (1 << 20):.1f} MiB, "
+                  f"peak RSS {format_mib(result['peak_rss'])}")
+
+    with open(args.output, "w") as output:
+        json.dump({"environment": environment(), "results": results}, output, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            compare(results, json.load(baseline)["results"])
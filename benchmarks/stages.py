@@ -0,0 +1,235 @@
+import io
+import os
+import sys
+import contextlib
+from typing import Callable
+from libraries import bitboard, kernels
+from libraries.cache import get_cache, save_cache
+from libraries.canonical import canonical_children
+from libraries.packing import pack, unpack
+from libraries.resizing import expand_cube
+from libraries.rotation import all_rotations
+
+solver_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rotation-free-Solver", "librairy")
+
+# A stage prepares its inputs for a size n, and returns a function running the timed work
+# together with the number of items (candidates or polycubes) that function processes.
+# Stages run in a temporary working directory, so the cache stages dont touch the real cache.
+Stage = Callable[[int], tuple[Callable[[], None], int]]
+
+
+def _quietly(function, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args)
+
+
+def _parents(n: int) -> list:
+    from cubes import generate_polycubes
+    return _quietly(generate_polycubes, n - 1)
+
+
+def _candidates(n: int) -> list:
+    return [child for parent in _parents(n) for child in expand_cube(parent)]
+
+
+def bench_expand_cube(n: int) -> tuple[Callable[[], None], int]:
+    parents = _parents(n)
+    candidates = sum(1 for parent in parents for _ in expand_cube(parent))
+
+    def run():
+        for parent in parents:
+            for _ in expand_cube(parent):
+                pass
+    return run, candidates
+
+
+def bench_expand_cube_bitboard(n: int) -> tuple[Callable[[], None], int]:
+    parents = [bitboard.from_array(parent) for parent in _parents(n)]
+    candidates = sum(1 for parent in parents for _ in bitboard.expand_cube(parent))
+
+    def run():
+        for parent in parents:
+            for _ in bitboard.expand_cube(parent):
+                pass
+    return run, candidates
+
+
+def bench_all_rotations(n: int) -> tuple[Callable[[], None], int]:
+    candidates = _candidates(n)
+
+    def run():
+        for candidate in candidates:
+            for _ in all_rotations(candidate):
+                pass
+    return run, len(candidates)
+
+
+def bench_pack(n: int) -> tuple[Callable[[], None], int]:
+    candidates = _candidates(n)
+
+    def run():
+        for candidate in candidates:
+            pack(candidate)
+    return run, len(candidates)
+
+
+def bench_pack_bitboard(n: int) -> tuple[Callable[[], None], int]:
+    candidates = [bitboard.from_array(candidate) for candidate in _candidates(n)]
+
+    def run():
+        for candidate in candidates:
+            bitboard.pack(candidate)
+    return run, len(candidates)
+
+
+def bench_unpack(n: int) -> tuple[Callable[[], None], int]:
+    cube_ids = [pack(candidate) for candidate in _candidates(n)]
+
+    def run():
+        for cube_id in cube_ids:
+            unpack(cube_id)
+    return run, len(cube_ids)
+
+
+def bench_get_canonical_packing(n: int) -> tuple[Callable[[], None], int]:
+    from cubes import get_canonical_packing
+    candidates = _candidates(n)
+
+    def run():
+        known_ids = set()
+        for candidate in candidates:
+            known_ids.add(get_canonical_packing(candidate, known_ids))
+    return run, len(candidates)
+
+
+def bench_canonical_id_bitboard(n: int) -> tuple[Callable[[], None], int]:
+    candidates = [bitboard.from_array(candidate) for candidate in _candidates(n)]
+
+    def run():
+        known_ids = set()
+        for candidate in candidates:
+            known_ids.add(bitboard.canonical_id(candidate))
+    return run, len(candidates)
+
+
+def bench_canonical_children(n: int) -> tuple[Callable[[], None], int]:
+    kernels.use_numba(False)
+    parents = _parents(n)
+    candidates = sum(1 for parent in parents for _ in expand_cube(parent))
+
+    def run():
+        known_ids = set()
+        for cube_ids in canonical_children(parents):
+            known_ids.update(cube_ids.tolist())
+    return run, candidates
+
+
+def bench_canonical_children_numba(n: int) -> tuple[Callable[[], None], int]:
+    kernels.use_numba(True)
+    parents = _parents(n)
+    candidates = sum(1 for parent in parents for _ in expand_cube(parent))
+
+    def run():
+        known_ids = set()
+        for cube_ids in canonical_children(parents):
+            known_ids.update(cube_ids.tolist())
+    # compile the kernel before timing it
+    run()
+    return run, candidates
+
+
+def bench_canonical_children_bitboard(n: int) -> tuple[Callable[[], None], int]:
+    parents = _parents(n)
+    candidates = sum(1 for parent in parents for _ in expand_cube(parent))
+
+    def run():
+        known_ids = set()
+        for cube_ids in bitboard.canonical_children(parents):
+            known_ids.update(cube_ids.tolist())
+    return run, candidates
+
+
+def bench_save_cache(n: int) -> tuple[Callable[[], None], int]:
+    polycubes = _parents(n + 1)
+
+    def run():
+        _quietly(save_cache, n, polycubes)
+    return run, len(polycubes)
+
+
+def bench_get_cache(n: int) -> tuple[Callable[[], None], int]:
+    polycubes = _parents(n + 1)
+    _quietly(save_cache, n, polycubes)
+
+    def run():
+        _quietly(get_cache, n)
+    return run, len(polycubes)
+
+
+def bench_cube_solver(n: int) -> tuple[Callable[[], None], int]:
+    sys.path.insert(0, solver_path)
+    from Solver import CubeSolver
+
+    def solve():
+        solver = CubeSolver()
+        solver.solve(n)
+        return solver
+    solver = _quietly(solve)
+    found = sum(holder.number_of_polycubes() for holder in solver.polycube_per_number_of_cubes[n].values())
+
+    def run():
+        _quietly(solve)
+    return run, found
+
+
+def bench_cube_solver_parallel(n: int) -> tuple[Callable[[], None], int]:
+    sys.path.insert(0, solver_path)
+    from Solver import CubeSolver
+    workers = max(2, os.cpu_count() or 1)
+
+    def solve():
+        solver = CubeSolver()
+        solver.solve(n, workers)
+        return solver
+    solver = _quietly(solve)
+    found = sum(holder.number_of_polycubes() for holder in solver.polycube_per_number_of_cubes[n].values())
+
+    def run():
+        _quietly(solve)
+    return run, found
+
+
+def bench_cube_solver_traced(n: int) -> tuple[Callable[[], None], int]:
+    sys.path.insert(0, solver_path)
+    import tracing
+    run, found = bench_cube_solver(n)
+
+    def traced():
+        tracing.set_level(tracing.DEBUG, io.StringIO())
+        try:
+            run()
+        finally:
+            tracing.set_level(tracing.OFF)
+    return traced, found
+
+
+stages: dict[str, Stage] = {
+    "expand_cube": bench_expand_cube,
+    "expand_cube_bitboard": bench_expand_cube_bitboard,
+    "all_rotations": bench_all_rotations,
+    "pack": bench_pack,
+    "pack_bitboard": bench_pack_bitboard,
+    "unpack": bench_unpack,
+    "get_canonical_packing": bench_get_canonical_packing,
+    "canonical_id_bitboard": bench_canonical_id_bitboard,
+    "canonical_children": bench_canonical_children,
+    "canonical_children_bitboard": bench_canonical_children_bitboard,
+    "save_cache": bench_save_cache,
+    "get_cache": bench_get_cache,
+    "cube_solver": bench_cube_solver,
+    "cube_solver_parallel": bench_cube_solver_parallel,
+    "cube_solver_traced": bench_cube_solver_traced,
+}
+
+if kernels.NUMBA_AVAILABLE:
+    stages["canonical_children_numba"] = bench_canonical_children_numba
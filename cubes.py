@@ -1,12 +1,28 @@
+import os
+import sys
+import tempfile
 import numpy as np
 import argparse
+from itertools import islice
 from time import perf_counter
-from libraries.cache import get_cache, save_cache, cache_exists
+from typing import Iterable
+from libraries.cache import get_cache, save_cache, cache_exists, cache_count, iter_cache, \
+    cache_manager, configure_cache, CacheManager
 from libraries.resizing import expand_cube
 from libraries.packing import pack, unpack
 from libraries.renderer import render_shapes
 from libraries.rotation import all_rotations
-import tracemalloc
+from libraries.canonical import CanonicalStats, canonical_children, canonical_shape
+from libraries.parallel import generate_ids_parallel
+from libraries.dedup import ExternalIdSet, U64IdSet, parse_size, unknown_ids
+from libraries.enumeration import KNOWN_COUNTS, check_count, enumerate_children, iter_polycubes
+from libraries.memory import deep_size, format_mib, peak_rss, representation_sizes
+from libraries.rotation import all_symmetries
+from libraries.symmetry import KNOWN_FREE_COUNTS, SymmetryCounts
+from libraries.checkpoint import Checkpoint, chunked
+from libraries.distribute import distribute_local, map_parents, merge_shards, reduce_shard, remove_shards
+from libraries.metrics import GenerationMetrics, json_lines, known_size
+from libraries import kernels
 import scipy.sparse as sp
 
 
@@ -15,17 +31,48 @@ def log_if_needed(n, total_n):
         print(f"\rcompleted {(n / total_n) * 100:.2f}%", end="\n" if n == total_n else "")
 
 
-def generate_polycubes(n: int, use_cache: bool = False) -> list[np.ndarray]:
+def cache_name(n: int, reflections: bool = False):
+    """
+    Returns the name of the cache of the polycubes of size n, free polycubes being cached apart.
+    """
+    return f"{n}_free" if reflections else n
+
+
+def generate_polycubes(n: int, use_cache: bool = False, batch_size: int = 100,
+                       workers: int = 1, max_memory: int = None, id_format: str = "bytes",
+                       checkpoint_interval: float = None, resume: bool = False,
+                       metrics: GenerationMetrics = None, mem_report: dict[int, int] = None,
+                       reflections: bool = False) -> list[np.ndarray]:
     """
     Generates all polycubes of size n
 
     Generates a list of all possible configurations of n cubes, where all cubes are connected via at least one face.
-    Builds each new polycube from the previous set of polycubes n-1.
-    Uses an optional cache to save and load polycubes of size n-1 for efficiency.
+    Builds each new polycube from the previous set of polycubes n-1, see build_caches.
+    Uses an optional cache to save and load polycubes of size n-1 for efficiency: the generation
+    starts from the highest size up to n with a cache that passes verification. Without the cache,
+    the sizes below n are written to a temporary directory, and only the polycubes of size n are
+    ever held in memory as arrays.
 
     Parameters:
     n (int): The size of the polycubes to generate, e.g. all combinations of n=4 cubes.
     use_cahe (bool): whether to use cache files. 
+    batch_size (int): the number of polycubes n-1 expanded and canonicalized together,
+        0 falls back to canonicalizing every new polycube on its own.
+    workers (int): the number of processes used to expand and canonicalize polycubes.
+    max_memory (int): if given, the known ids are spilled to disk to stay under this many bytes.
+        Requires batching.
+    id_format (str): "bytes" to dedup pack() ids in a set, or "u64" to dedup pack_u64 words
+        in NumPy arrays, which only fits polycubes of up to 12 cubes. Requires batching.
+    checkpoint_interval (float): if given, the progress is saved every this many seconds, next to the cache.
+        Requires batching and the cache.
+    resume (bool): whether to resume from a checkpoint left by an interrupted run.
+        The polycubes n-1 must come in the same order as before, so from the cache.
+    metrics (GenerationMetrics): optional metrics of the time spent in each stage,
+        given to its callback periodically and once per size generated.
+    mem_report (dict[int, int]): if given, filled with the size in bytes of the set of known ids
+        of each size generated, including the ids themselves.
+    reflections (bool): whether mirror images are the same polycube, generating the free polycubes
+        under all 48 symmetries instead of the one-sided polycubes under the 24 rotations.
 
     Returns:
     list(np.array): Returns a list of all polycubes of size n as numpy byte arrays
@@ -37,64 +84,379 @@ def generate_polycubes(n: int, use_cache: bool = False) -> list[np.ndarray]:
         return [np.ones((1, 1, 1), dtype=np.byte)]
     elif n == 2:
         return [np.ones((2, 1, 1), dtype=np.byte)]
+    if checkpoint_interval and not use_cache:
+        raise ValueError("checkpoints require the cache, the only source of the polycubes n-1 in the same order")
 
-    if (use_cache and cache_exists(n)):
-        results = get_cache(n)
+    with tempfile.TemporaryDirectory(prefix="polycubes_") as directory:
+        cache = cache_manager if use_cache else CacheManager(directory)
+        build_caches(n, cache, use_cache, batch_size, workers, max_memory, id_format,
+                     checkpoint_interval, resume, metrics, mem_report, reflections)
+        return cache.load(cache_name(n, reflections))
+
+
+def build_caches(n: int, cache: CacheManager, keep: bool = True, batch_size: int = 100,
+                 workers: int = 1, max_memory: int = None, id_format: str = "bytes",
+                 checkpoint_interval: float = None, resume: bool = False,
+                 metrics: GenerationMetrics = None, mem_report: dict[int, int] = None,
+                 reflections: bool = False) -> None:
+    """
+    Generates the polycubes of every size up to n into packed caches.
+
+    Starts from the highest size up to n with a cache that passes verification. Every size is
+    generated by streaming the cache of the size below, and written straight from the set of
+    known ids, so only that set is held in memory.
+
+    Parameters:
+    n (int): The size of the polycubes to generate, at least 3.
+    cache (CacheManager): the caches to read and write.
+    keep (bool): whether to keep the caches of the sizes below n, or to remove each one once
+        the size above it has been generated.
+    batch_size, workers, max_memory, id_format, checkpoint_interval, resume, metrics,
+        mem_report, reflections: see generate_polycubes.
+    """
+    name = lambda level: cache_name(level, reflections)
+    start = cache.nearest(n, name, 3, KNOWN_FREE_COUNTS if reflections else KNOWN_COUNTS)
+    if start == n:
         print(f"\nGot polycubes from cache n={n}")
+        return
+    if start is not None:
+        print(f"\nStarting from the cache n={start}")
     else:
-        pollycubes = generate_polycubes(n-1, use_cache)
+        start = 2
+
+    for size in range(start + 1, n + 1):
+        if size == 3:
+            parents, total = generate_polycubes(2), 1
+        else:
+            parents = (polycube for polycubes in cache.iter(name(size - 1)) for polycube in polycubes)
+            total = cache.count(name(size - 1))
+        generate_from_parents(size, parents, total, cache, batch_size, workers, max_memory,
+                              id_format, checkpoint_interval, resume, metrics, mem_report, reflections)
+        if not keep and size > 3:
+            cache.remove(name(size - 1))
+
+
+def generate_from_parents(n: int, pollycubes: Iterable[np.ndarray], total: int, cache: CacheManager,
+                          batch_size: int = 100, workers: int = 1, max_memory: int = None,
+                          id_format: str = "bytes", checkpoint_interval: float = None, resume: bool = False,
+                          metrics: GenerationMetrics = None, mem_report: dict[int, int] = None,
+                          reflections: bool = False) -> int:
+    """
+    Generates all polycubes of size n from all polycubes of size n-1, writing them to a packed cache.
+
+    The ids are written as they are read from the set of known ids, without unpacking them.
+
+    Parameters:
+    n (int): The size of the polycubes to generate.
+    pollycubes (Iterable[np.array]): all polycubes of size n-1, streamed in the same order on every run.
+    total (int): the number of polycubes of size n-1.
+    cache (CacheManager): the caches to write the polycubes of size n to, and to keep the checkpoint next to.
+        The cache is only opened for writing once every id is known.
+    batch_size, workers, max_memory, id_format, checkpoint_interval, resume, metrics,
+        mem_report, reflections: see generate_polycubes.
+
+    Returns:
+    int: the number of polycubes of size n
+
+    """
+    checkpoint = None
+    if checkpoint_interval:
+        checkpoint = Checkpoint(n, checkpoint_interval, cache.directory, cache_name(n, reflections))
+    known_ids = hash_polycubes(n, pollycubes, total, batch_size, workers, max_memory, id_format,
+                               checkpoint, resume, metrics, reflections)
+    if mem_report is not None:
+        mem_report[n] = deep_size(known_ids)
+
+    print(f"\nWriting polycubes n={n}")
+    clock = perf_counter()
+    count = len(known_ids)
+    done = 0
+    with cache.writer(cache_name(n, reflections)) as writer:
+        for cube_id in known_ids:
+            writer.write(cube_id)
+            log_if_needed(done, count)
+            done += 1
+    log_if_needed(done, count)
+    if hasattr(known_ids, "close"):
+        known_ids.close()
+    if metrics is not None:
+        metrics.lap("write", clock)
+        metrics.finish(count)
+
+    if checkpoint is not None:
+        checkpoint.remove()
+    return count
+
+
+def hash_polycubes(n: int, pollycubes: Iterable[np.ndarray], total: int, batch_size: int = 100,
+                   workers: int = 1, max_memory: int = None, id_format: str = "bytes",
+                   checkpoint: Checkpoint = None, resume: bool = False, metrics: GenerationMetrics = None,
+                   reflections: bool = False):
+    """
+    Expands all polycubes of size n-1 and collects the canonical ids of the polycubes of size n
 
+    Parameters:
+    n (int): The size of the polycubes to generate.
+    pollycubes (Iterable[np.array]): all polycubes of size n-1, streamed or in a list.
+    total (int): the number of polycubes of size n-1, to log the progress.
+    batch_size, workers, max_memory, id_format, resume, reflections: see generate_polycubes.
+    checkpoint (Checkpoint): optional checkpoint saving the progress. Requires batching.
+    metrics (GenerationMetrics): optional metrics, reset for size n and updated after every batch.
+
+    Returns:
+    the set of canonical ids of all polycubes of size n, of a type depending on the options
+
+    """
+    stats = metrics if metrics is not None else CanonicalStats()
+    if metrics is not None:
+        metrics.start(n, total)
+    done = 0
+    print(f"\nHashing polycubes n={n}")
+    if id_format == "u64":
+        shard_factory = U64IdSet
+    elif max_memory is not None:
+        shard_factory = lambda: ExternalIdSet(max_memory // workers)
+    else:
+        shard_factory = set
+
+    if checkpoint is not None and batch_size == 0:
+        raise ValueError("checkpoints require batching, batch_size must be positive")
+    resumed_ids = ()
+    if checkpoint is not None and resume and checkpoint.exists():
+        resumed_ids = checkpoint.load()
+        print(f"Resuming polycubes n={n} after {checkpoint.next_parent} polycubes n={n-1}")
+    elif checkpoint is not None:
+        # a stale checkpoint would otherwise get the new ids appended to its log
+        checkpoint.remove()
+
+    def progress(done: int, total: int, known_ids=None):
+        log_if_needed(done, total)
+        if metrics is not None:
+            metrics.update(done, known_size(known_ids) if known_ids is not None else None)
+
+    if batch_size > 0 and workers > 1:
+        parents = iter(pollycubes)
+        if resumed_ids:
+            checkpoint.skip(parents)
+        known_ids = generate_ids_parallel(parents, workers, batch_size, stats, progress, shard_factory,
+                                          checkpoint, resumed_ids, reflections, total)
+    elif batch_size > 0:
+        known_ids = shard_factory()
+        parents = iter(pollycubes)
+        if resumed_ids:
+            for chunk in chunked(resumed_ids):
+                known_ids.update(chunk)
+            checkpoint.skip(parents)
+            done = checkpoint.next_parent
+        for batch in iter(lambda: list(islice(parents, batch_size)), []):
+            if checkpoint is None:
+                for cube_ids in canonical_children(batch, stats, reflections):
+                    clock = perf_counter()
+                    # U64IdSet converts the void array of ids without building a bytes object per id
+                    known_ids.update(cube_ids if isinstance(known_ids, U64IdSet) else cube_ids.tolist())
+                    stats.lap("lookup", clock)
+            else:
+                batch_ids = set()
+                for cube_ids in canonical_children(batch, stats, reflections):
+                    clock = perf_counter()
+                    batch_ids.update(cube_ids.tolist())
+                    stats.lap("lookup", clock)
+                clock = perf_counter()
+                batch_ids = unknown_ids(known_ids, batch_ids)
+                known_ids.update(batch_ids)
+                stats.lap("lookup", clock)
+                checkpoint.advance(batch, batch_ids)
+            done += len(batch)
+            progress(done, total, known_ids)
+    else:
         known_ids = set()
-        done = 0
-        print(f"\nHashing polycubes n={n}")
         for base_cube in pollycubes:
+            clock = perf_counter()
             for new_cube in expand_cube(base_cube):
-                cube_id = get_canonical_packing(new_cube, known_ids)
+                clock = stats.lap("expansion", clock)
+                cube_id = get_canonical_packing(new_cube, known_ids, stats, reflections)
+                clock = perf_counter()
                 known_ids.add(cube_id)
-            log_if_needed(done, len(pollycubes))
+                clock = stats.lap("lookup", clock)
+            progress(done, total, known_ids)
             done += 1
-        log_if_needed(done, len(pollycubes))
+        progress(done, total, known_ids)
+    print(f"Rotations n={n}: {stats}")
+    return known_ids
 
-        print(f"\nGenerating polycubes from hash n={n}")
-        results = []
-        done = 0
-        for cube_id in known_ids:
-            results.append(unpack(cube_id))
-            log_if_needed(done, len(known_ids))
-            done += 1
-        log_if_needed(done, len(known_ids))
 
-    if (use_cache and not cache_exists(n)):
+def count_polycubes(n: int, use_cache: bool = False, engine: str = "hashset", batch_size: int = 100,
+                    workers: int = 1, max_memory: int = None, id_format: str = "bytes",
+                    checkpoint_interval: float = None, resume: bool = False,
+                    metrics: GenerationMetrics = None, mem_report: dict[int, int] = None,
+                    reflections: bool = False, symmetry: SymmetryCounts = None) -> int:
+    """
+    Counts all polycubes of size n, without building the polycubes of size n
+
+    The polycubes of size n-1 are streamed from the cache, generated first if needed (into a temporary
+    directory without the cache). Only the canonical ids of size n are kept with the hashset engine,
+    and nothing with the augmentation engine.
+
+    Parameters:
+    n (int): The size of the polycubes to count.
+    use_cahe (bool): whether to use cache files.
+    engine (str): "hashset" to dedup canonical ids, or "augmentation" to only count the
+        polycubes kept by their canonical parent.
+    batch_size, workers, max_memory, id_format, checkpoint_interval, resume, metrics, mem_report, reflections:
+        see generate_polycubes.
+        Checkpoints, metrics and reflections are only supported by the hashset engine.
+        Checkpoints require the cache.
+    symmetry (SymmetryCounts): if given, the polycubes of size n found are added to it.
+
+    Returns:
+    int: the number of polycubes of size n
+
+    """
+    if engine == "augmentation" and reflections:
+        raise ValueError("the augmentation engine only generates one-sided polycubes")
+    if checkpoint_interval and not use_cache:
+        raise ValueError("checkpoints require the cache, the only source of the polycubes n-1 in the same order")
+    if n < 3:
+        polycubes = generate_polycubes(n)
+        if symmetry is not None:
+            symmetry.add(pack(polycube) for polycube in polycubes)
+        return len(polycubes)
+    if (use_cache and cache_exists(cache_name(n, reflections))):
+        if symmetry is not None:
+            symmetry.add(pack(polycube) for polycubes in iter_cache(cache_name(n, reflections))
+                         for polycube in polycubes)
+        return cache_count(cache_name(n, reflections))
+
+    with tempfile.TemporaryDirectory(prefix="polycubes_") as directory:
+        if (use_cache and cache_exists(cache_name(n-1, reflections))):
+            total = cache_count(cache_name(n-1, reflections))
+            pollycubes = (polycube for polycubes in iter_cache(cache_name(n-1, reflections)) for polycube in polycubes)
+        elif engine == "augmentation":
+            total = KNOWN_COUNTS.get(n-1)
+            pollycubes = (unpack(cube_id) for cube_id in iter_polycubes(n-1))
+        elif n == 3:
+            pollycubes = generate_polycubes(n-1)
+            total = len(pollycubes)
+        else:
+            cache = cache_manager if use_cache else CacheManager(directory)
+            build_caches(n-1, cache, use_cache, batch_size, workers, max_memory, id_format,
+                         checkpoint_interval, resume, metrics, mem_report, reflections)
+            total = cache.count(cache_name(n-1, reflections))
+            pollycubes = (polycube for polycubes in cache.iter(cache_name(n-1, reflections)) for polycube in polycubes)
+
+        if engine == "augmentation":
+            print(f"\nCounting polycubes n={n}")
+            return sum(len(cube_ids) for cube_ids in enumerate_children(pollycubes, workers, batch_size))
+
+        checkpoint = None
+        if checkpoint_interval:
+            checkpoint = Checkpoint(n, checkpoint_interval, cache_manager.directory, cache_name(n, reflections))
+        known_ids = hash_polycubes(n, pollycubes, total, batch_size, workers, max_memory, id_format,
+                                   checkpoint, resume, metrics, reflections)
+    count = len(known_ids)
+    if symmetry is not None:
+        symmetry.add(known_ids)
+    if metrics is not None:
+        metrics.finish(count)
+    if mem_report is not None:
+        mem_report[n] = deep_size(known_ids)
+    if hasattr(known_ids, "close"):
+        known_ids.close()
+    if checkpoint is not None:
+        checkpoint.remove()
+    return count
+
+
+def generate_polycubes_augmentation(n: int, use_cache: bool = False, batch_size: int = 100,
+                                    workers: int = 1) -> list[np.ndarray]:
+    """
+    Generates all polycubes of size n by canonical augmentation
+
+    Every polycube of size n-1 is expanded, and a new polycube is only kept by its canonical parent,
+    so each polycube is generated exactly once without a set of all known polycubes.
+    The polycubes of size n-1 are streamed from the cache if there is one, and enumerated
+    depth first otherwise.
+
+    Parameters:
+    n (int): The size of the polycubes to generate, e.g. all combinations of n=4 cubes.
+    use_cahe (bool): whether to use cache files.
+    batch_size (int): the number of polycubes n-1 given to a worker at a time.
+    workers (int): the number of processes used to expand the polycubes n-1.
+
+    Returns:
+    list(np.array): Returns a list of all polycubes of size n as numpy byte arrays
+
+    """
+    if n < 3:
+        return generate_polycubes(n)
+
+    if (use_cache and cache_exists(n)):
+        results = get_cache(n)
+        print(f"\nGot polycubes from cache n={n}")
+        return results
+
+    if (use_cache and cache_exists(n-1)):
+        parents = (polycube for polycubes in iter_cache(n-1) for polycube in polycubes)
+    else:
+        parents = (unpack(cube_id) for cube_id in iter_polycubes(n-1))
+
+    print(f"\nEnumerating polycubes n={n}")
+    results = []
+    for cube_ids in enumerate_children(parents, workers, batch_size):
+        results.extend(unpack(cube_id) for cube_id in cube_ids)
+    check_count(n, len(results))
+
+    if (use_cache):
         save_cache(n, results)
 
     return results
 
 
 def get_canonical_packing(polycube: np.ndarray, 
-                          known_ids: set[bytes]) -> bytes:
+                          known_ids: set[bytes],
+                          stats: CanonicalStats = None,
+                          reflections: bool = False) -> bytes:
     """
     Determines if a polycube has already been seen.
 
     Considers all possible rotations of a polycube against the existing 
         ones stored in memory. Returns the id if it's found in the set,
         or the maximum id of all rotations if the polycube is new.
+        Rotations that are not in the canonical axis order are skipped,
+        they can neither be in the set nor be the maximum id.
 
     Parameters:
     polycube (np.array): 3D Numpy byte array where 1 values indicate 
         cube positions. Must be of type np.int8
     known_ids (set[bytes]): A set of all known polycube ids
+    stats (CanonicalStats): optional counters of the rotations checked and skipped
+    reflections (bool): whether to consider the 24 reflections too, so that mirror images share an id
 
     Returns:
     cube_id (bytes): the id for this cube
 
     """
+    if stats is None:
+        stats = CanonicalStats()
+    stats.candidates += 1
     max_id = b'\x00'
-    for cube_rotation in all_rotations(polycube):
+    axis_order = canonical_shape(polycube.shape)
+    clock = perf_counter()
+    for cube_rotation in (all_symmetries if reflections else all_rotations)(polycube):
+        clock = stats.lap("rotation", clock)
+        if cube_rotation.shape != axis_order:
+            stats.skipped += 1
+            continue
+        stats.checked += 1
         this_id = pack(cube_rotation)
+        clock = stats.lap("packing", clock)
         if (this_id in known_ids):
+            stats.early_exits += 1
+            stats.lap("lookup", clock)
             return this_id
         if (this_id > max_id):
             max_id = this_id
+        clock = stats.lap("lookup", clock)
     return max_id
 
 
@@ -120,7 +482,7 @@ def return_cube_is_shrunk_coo(matrix: np.ndarray) -> (bool, any):
     if can_be_sparsified_coo(matrix):
         shape = matrix.shape
         if len(shape) > 2:
-            matrix = matrix.resize((shape[0], shape[1] * shape[2]))
+            matrix = matrix.reshape((shape[0], shape[1] * shape[2]))
         return (True, shape), sp.coo_matrix(matrix)
     else:
         return False, matrix
@@ -130,14 +492,109 @@ def return_cube_is_shrunk_csr(matrix: np.ndarray) -> ((bool, tuple[int, int, int
     if can_be_sparsified_csr(matrix):
         shape = matrix.shape
         if len(shape) > 2:
-            print(matrix.dtype)
-            return (True, shape), sp.csr_matrix(matrix.resize((shape[0], shape[1] * shape[2])))
+            return (True, shape), sp.csr_matrix(matrix.reshape((shape[0], shape[1] * shape[2])))
         return (True, shape), sp.csr_matrix(matrix)
     else:
         return (False, ()), matrix
 
 
+def print_mem_report(known_sizes: dict[int, int], counts: dict[int, int], polycubes: list[np.ndarray] = None) -> None:
+    """
+    Prints the memory used by the sets of known ids and by each representation of a polycube.
+
+    Parameters:
+    known_sizes (dict[int, int]): the size in bytes of the set of known ids of each size generated
+    counts (dict[int, int]): the number of polycubes of each size, where known
+    polycubes (list[np.array]): optional polycubes to measure the representations of
+    """
+    print("\nMemory report:")
+    for size, known_size in sorted(known_sizes.items()):
+        count = counts.get(size)
+        per_polycube = f", {known_size / count:.1f} bytes per polycube" if count else ""
+        print(f"Known ids n={size}: {known_size / (1 << 20):.1f} MiB{per_polycube}")
+
+    if polycubes:
+        sizes = representation_sizes(polycubes)
+        print("Bytes per polycube: " + ", ".join(f"{name} {size:.1f}" for name, size in sizes.items()))
+        csr = sum(1 for polycube in polycubes if can_be_sparsified_csr(polycube)) / len(polycubes)
+        coo = sum(1 for polycube in polycubes if can_be_sparsified_coo(polycube)) / len(polycubes)
+        print(f"Sparse enough for csr: {csr * 100:.1f}%, for coo: {coo * 100:.1f}%")
+
+
+def print_symmetry_report(symmetry: SymmetryCounts) -> None:
+    """
+    Prints the counts of a SymmetryCounts and checks them.
+    """
+    print(f"\nSymmetry report {symmetry}")
+    for mismatch in symmetry.check():
+        print(f"Mismatch: {mismatch}")
+
+
+def distribute_main(argv: list[str]) -> None:
+    """
+    Runs a step of a distributed generation, see the README.
+
+    Parameters:
+    argv (list[str]): the command line arguments after "distribute"
+    """
+    parser = argparse.ArgumentParser(
+        prog='Polycube Generator distribute',
+        description='Generates the polycubes of size n from the packed cache of size n-1 by splitting '
+                    'the parents between nodes and the ids between hash partitioned shards.')
+
+    parser.add_argument('n', metavar='N', type=int,
+                        help='The number of cubes within each polycube')
+    parser.add_argument('--phase', choices=['local', 'map', 'reduce', 'merge'], default='local',
+                        help='Run every step with local processes, or a single step of a run shared between hosts')
+    parser.add_argument('--nodes', type=int, default=1,
+                        help='The number of nodes (processes with --phase local) sharing the work')
+    parser.add_argument('--node', type=int, default=0,
+                        help='The index of this node, for --phase map and reduce')
+    parser.add_argument('--shards', type=int,
+                        help='The number of shard files the ids are split between, defaults to the number of nodes')
+    parser.add_argument('--directory',
+                        help='The working directory shared by the nodes, defaults to distribute_{n}')
+    parser.add_argument('--batch-size', type=int, default=100,
+                        help='The number of polycubes canonicalized together')
+    parser.add_argument('--cache-dir', default='.',
+                        help='The directory of the cache files')
+    parser.add_argument('--compress-cache', action='store_true',
+                        help='Compress the packed cache written with zlib')
+
+    args = parser.parse_args(argv)
+    configure_cache(args.cache_dir, args.compress_cache)
+    n = args.n
+    shards = args.shards if args.shards is not None else args.nodes
+    directory = args.directory if args.directory is not None else f"distribute_{n}"
+
+    t1_start = perf_counter()
+    if args.phase == 'local':
+        # a legacy .npy cache is converted by cache_exists
+        if not cache_exists(n-1):
+            build_caches(n-1, cache_manager, batch_size=args.batch_size)
+        count = distribute_local(n, args.nodes, shards, directory, args.batch_size)
+    elif args.phase == 'map':
+        done = map_parents(n, args.node, args.nodes, shards, directory, args.batch_size)
+        print(f"Node {args.node} expanded {done} polycubes n={n-1}")
+        return
+    elif args.phase == 'reduce':
+        for shard in range(args.node, shards, args.nodes):
+            print(f"Shard {shard} holds {reduce_shard(shard, args.nodes, directory)} polycubes n={n}")
+        return
+    else:
+        count = merge_shards(n, shards, directory)
+        remove_shards(shards, directory)
+
+    check_count(n, count)
+    print(f"\nFound {count} unique polycubes, written to {cache_manager.path(n)}")
+    print(f"\nElapsed time: {round(perf_counter() - t1_start,3)}s")
+
+
 if __name__ == "__main__":
+    if sys.argv[1:2] == ['distribute']:
+        distribute_main(sys.argv[2:])
+        sys.exit()
+
     parser = argparse.ArgumentParser(
         prog='Polycube Generator',
         description='Generates all polycubes (combinations of cubes) of size n.')
@@ -148,37 +605,98 @@ if __name__ == "__main__":
     # Requires python >=3.9
     parser.add_argument('--cache', action=argparse.BooleanOptionalAction)
     parser.add_argument('--render', action=argparse.BooleanOptionalAction)
+    parser.add_argument('--cache-dir', default='.',
+                        help='The directory of the cache files')
+    parser.add_argument('--compress-cache', action='store_true',
+                        help='Compress the packed caches written with zlib, they are then streamed instead of memory mapped')
+    parser.add_argument('--verify-cache', action=argparse.BooleanOptionalAction, default=True,
+                        help='Check the counts and checksums of a cache before trusting it')
+    parser.add_argument('--batch-size', type=int, default=100,
+                        help='The number of polycubes canonicalized together, 0 to disable batching')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='The number of processes used to generate the polycubes')
+    parser.add_argument('--max-memory', type=parse_size,
+                        help='Spill the known polycubes to disk to stay under this memory, e.g. 8G')
+    parser.add_argument('--count-only', action='store_true',
+                        help='Only count the polycubes, without building or rendering them')
+    parser.add_argument('--engine', choices=['hashset', 'augmentation'], default='hashset',
+                        help='Dedup the polycubes in a set of known ids, or generate each one once by canonical augmentation')
+    parser.add_argument('--kernel', choices=['auto', 'numba', 'numpy'], default='auto',
+                        help='Canonicalize batches with a compiled numba kernel, or with NumPy. '
+                             'auto uses numba if it is installed')
+    parser.add_argument('--id-format', choices=['bytes', 'u64'], default='bytes',
+                        help='Dedup polycubes as bytes in a set, or as pairs of uint64 in NumPy arrays')
+    parser.add_argument('--checkpoint-interval', type=float,
+                        help='Save the progress every this many seconds, 0 to disable (default 300 with --resume)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Resume from the checkpoint of an interrupted run')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='Write the time spent in each stage and other metrics as JSON lines to FILE, - for stdout')
+    parser.add_argument('--metrics-interval', type=float, default=10.0,
+                        help='The number of seconds between two lines of metrics')
+    parser.add_argument('--symmetry', choices=['rotations', 'full'], default='rotations',
+                        help='Count mirror images as distinct polycubes (one-sided), or as the same one (free)')
+    parser.add_argument('--symmetry-report', action='store_true',
+                        help='Report the free, chiral, achiral, one-sided and fixed counts and the symmetry group orders')
+    parser.add_argument('--mem-report', action='store_true',
+                        help='Report the peak memory, the size of the known polycubes and the bytes per polycube '
+                             'of each representation')
 
     args = parser.parse_args()
+    if args.engine == 'augmentation' and args.symmetry == 'full':
+        parser.error("--engine augmentation only generates one-sided polycubes")
+    if (args.checkpoint_interval or args.resume) and args.cache is False:
+        parser.error("--checkpoint-interval and --resume need --cache, the polycubes n-1 are only read "
+                     "in the same order from the cache")
+    if args.kernel == 'numba' and not kernels.NUMBA_AVAILABLE:
+        parser.error("--kernel numba needs numba, install it with pip install numba")
+    kernels.use_numba(args.kernel != 'numpy' and kernels.NUMBA_AVAILABLE)
 
     n = args.n
     use_cache = args.cache if args.cache is not None else True
+    configure_cache(args.cache_dir, args.compress_cache, args.verify_cache)
     render = args.render if args.render is not None else False
+    checkpoint_interval = args.checkpoint_interval
+    if checkpoint_interval is None and args.resume:
+        checkpoint_interval = 300.0
 
-    # Start the timer
-    t1_start = perf_counter()
-
-    tracemalloc.start()
-    all_cubes = generate_polycubes(n, use_cache=use_cache)
-    print("simple implementation memory used: ", all_cubes.__sizeof__())
-    tracemalloc.stop()
-
-    tracemalloc.start()
-    all_cubes_csr = [(return_cube_is_shrunk_csr(cube)) for cube in all_cubes]
-    print("csr implementation memory used: ", all_cubes_csr.__sizeof__())
-    tracemalloc.stop()
+    metrics = None
+    if args.metrics is not None:
+        metrics_file = sys.stdout if args.metrics == '-' else open(args.metrics, 'a')
+        metrics = GenerationMetrics(json_lines(metrics_file), args.metrics_interval)
 
-    tracemalloc.start()
-    all_cubes_coo = [(return_cube_is_shrunk_coo(cube)) for cube in all_cubes]
-    print("coo implementation memory used: ", all_cubes_coo.__sizeof__())
-    tracemalloc.stop()
+    mem_report = {} if args.mem_report else None
+    reflections = args.symmetry == 'full'
+    known_counts = KNOWN_FREE_COUNTS if reflections else KNOWN_COUNTS
+    symmetry = SymmetryCounts(n, reflections) if args.symmetry_report else None
 
-    sparsity = sum([sum(cube.flatten()) / len(cube.flatten()) for cube in all_cubes]) / len(all_cubes)
-    print("we have the sparsity : ", sparsity)
+    # Start the timer
+    t1_start = perf_counter()
 
-    should_be_sparsified_csr = sum([1 if can_be_sparsified_csr(cube) else 0 for cube in all_cubes]) / len(all_cubes)
-    should_be_sparsified_coo = sum([1 if can_be_sparsified_coo(cube) else 0 for cube in all_cubes]) / len(all_cubes)
-    print(should_be_sparsified_coo, should_be_sparsified_csr)
+    if args.count_only:
+        count = count_polycubes(n, use_cache=use_cache, engine=args.engine, batch_size=args.batch_size,
+                                workers=args.workers, max_memory=args.max_memory, id_format=args.id_format,
+                                checkpoint_interval=checkpoint_interval, resume=args.resume, metrics=metrics,
+                                mem_report=mem_report, reflections=reflections, symmetry=symmetry)
+        check_count(n, count, known_counts=known_counts)
+        print(f"\nFound {count} unique polycubes")
+        print(f"\nElapsed time: {round(perf_counter() - t1_start,3)}s")
+        print(f"Peak memory: {format_mib(peak_rss())}")
+        if mem_report is not None:
+            print_mem_report(mem_report, {**known_counts, n: count})
+        if symmetry is not None:
+            print_symmetry_report(symmetry)
+        sys.exit()
+
+    if args.engine == 'augmentation':
+        all_cubes = generate_polycubes_augmentation(n, use_cache=use_cache, batch_size=args.batch_size,
+                                                    workers=args.workers)
+    else:
+        all_cubes = generate_polycubes(n, use_cache=use_cache, batch_size=args.batch_size,
+                                       workers=args.workers, max_memory=args.max_memory,
+                                       id_format=args.id_format, checkpoint_interval=checkpoint_interval,
+                                       resume=args.resume, metrics=metrics, mem_report=mem_report,
+                                       reflections=reflections)
 
     # Stop the timer
     t1_stop = perf_counter()
@@ -188,3 +706,11 @@ if __name__ == "__main__":
 
     print(f"\nFound {len(all_cubes)} unique polycubes")
     print(f"\nElapsed time: {round(t1_stop - t1_start,3)}s")
+
+    if mem_report is not None:
+        print(f"Peak memory: {format_mib(peak_rss())}")
+        print_mem_report(mem_report, {**known_counts, n: len(all_cubes)}, all_cubes)
+
+    if symmetry is not None:
+        symmetry.add(pack(polycube) for polycube in all_cubes)
+        print_symmetry_report(symmetry)
@@ -0,0 +1,220 @@
+import numpy as np
+from typing import Generator, Iterable
+from libraries.canonical import CanonicalStats, canonical_rotations
+
+# A bitboard polycube is a (shape, bits) pair, bit i of the Python int bits being the cube at flat index i
+# of the polycube in C order. That is the order of the bits of pack(), so packing is a single to_bytes.
+# To expand a polycube its bits are moved to a grid padded by one empty cell on every side, where the
+# neighbours of every cube are found at once by shifting the whole grid by the stride of each axis.
+Bitboard = tuple[tuple[int, int, int], int]
+
+# The rotations of each shape as lists of bit positions, keyed by shape and reflections
+_rotation_positions: dict[tuple[tuple[int, int, int], bool], tuple[bytes, list[list[int]]]] = {}
+
+
+def from_array(polycube: np.ndarray) -> Bitboard:
+    """
+    Converts a 3D ndarray to a bitboard.
+
+    Parameters:
+    polycube (np.array): 3D Numpy byte array where 1 values indicate polycube positions
+
+    Returns:
+    Bitboard: the shape and bits of the polycube
+
+    """
+    bits = np.packbits(polycube.flatten() != 0, bitorder='little').tobytes()
+    return tuple(int(dim) for dim in polycube.shape), int.from_bytes(bits, 'little')
+
+
+def to_array(bitboard: Bitboard) -> np.ndarray:
+    """
+    Converts a bitboard back to a 3D ndarray.
+
+    Parameters:
+    bitboard (Bitboard): the shape and bits of a polycube
+
+    Returns:
+    np.array: 3D Numpy byte array where 1 values indicate polycube positions
+
+    """
+    shape, bits = bitboard
+    size = shape[0] * shape[1] * shape[2]
+    data = np.frombuffer(bits.to_bytes(-(-size // 8), 'little'), dtype=np.uint8)
+    return np.unpackbits(data, count=size, bitorder='little').astype(np.byte).reshape(shape)
+
+
+def pack(bitboard: Bitboard) -> bytes:
+    """
+    Converts a bitboard to the same bytes id as libraries.packing.pack.
+
+    Parameters:
+    bitboard (Bitboard): the shape and bits of a polycube
+
+    Returns:
+    cube_id (bytes): a bytes representation of the polycube
+
+    """
+    shape, bits = bitboard
+    return bytes(shape) + bits.to_bytes(-(-(shape[0] * shape[1] * shape[2]) // 8), 'little')
+
+
+def unpack(cube_id: bytes) -> Bitboard:
+    """
+    Converts a bytes id back to a bitboard.
+
+    Parameters:
+    cube_id (bytes): a polycube id, as returned by pack()
+
+    Returns:
+    Bitboard: the shape and bits of the polycube
+
+    """
+    return (cube_id[0], cube_id[1], cube_id[2]), int.from_bytes(cube_id[3:], 'little')
+
+
+def _move(bits: int, shape: tuple[int, int, int], source: tuple[int, int, int], target: tuple[int, int, int]) -> int:
+    """
+    Moves a box of cells from one grid to another, one row along z at a time.
+
+    Parameters:
+    bits (int): the bits of the source grid
+    shape (tuple[int, int, int]): the shape of the box moved
+    source (tuple[int, int, int]): the x stride, y stride and bit offset of the box in the source grid
+    target (tuple[int, int, int]): the x stride, y stride and bit offset of the box in the target grid
+
+    Returns:
+    int: the bits of the target grid
+
+    """
+    row_mask = (1 << shape[2]) - 1
+    moved = 0
+    for x in range(shape[0]):
+        for y in range(shape[1]):
+            row = (bits >> (x * source[0] + y * source[1] + source[2])) & row_mask
+            moved |= row << (x * target[0] + y * target[1] + target[2])
+    return moved
+
+
+def expand_cube(bitboard: Bitboard) -> Generator[Bitboard, None, None]:
+    """
+    Expands a polycube by adding single blocks at all valid locations.
+
+    Yields the same polycubes in the same order as libraries.resizing.expand_cube. The free
+    neighbours of all cubes are found with six shifts of the padded grid, and the bounding box
+    of each new polycube only grows through the face the new block is on.
+
+    Parameters:
+    bitboard (Bitboard): the shape and bits of a polycube, with no empty plane on its edges
+
+    Returns:
+    generator(Bitboard): Yields new polycubes that are extensions of bitboard
+
+    """
+    (dx, dy, dz), bits = bitboard
+    y_stride = dz + 2
+    x_stride = (dy + 2) * y_stride
+    padded = _move(bits, (dx, dy, dz), (dy * dz, dz, 0), (x_stride, y_stride, x_stride + y_stride + 1))
+
+    grown = padded << 1 | padded >> 1 | padded << y_stride | padded >> y_stride \
+        | padded << x_stride | padded >> x_stride
+    free = grown & ~padded
+    while free:
+        block = free & -free
+        free ^= block
+        x, rest = divmod(block.bit_length() - 1, x_stride)
+        y, z = divmod(rest, y_stride)
+        lower = (min(x, 1), min(y, 1), min(z, 1))
+        shape = (max(x, dx) - lower[0] + 1, max(y, dy) - lower[1] + 1, max(z, dz) - lower[2] + 1)
+        offset = lower[0] * x_stride + lower[1] * y_stride + lower[2]
+        yield shape, _move(padded | block, shape, (x_stride, y_stride, offset), (shape[1] * shape[2], shape[2], 0))
+
+
+def _key_positions(shape: tuple[int, int, int], reflections: bool) -> tuple[bytes, list[list[int]]]:
+    """
+    Finds where every bit of a polycube of a given shape goes in each rotation in the canonical axis order.
+
+    The positions are given in a key whose big endian bytes are the little endian bytes of the rotation,
+    so the largest key is the rotation with the largest pack().
+
+    Returns:
+    bytes: the shape of the rotations, the start of their pack()
+    list[list[int]]: for each rotation, the key position of each flat index of the polycube
+
+    """
+    rotations = _rotation_positions.get((shape, reflections))
+    if rotations is None:
+        shapes, permutations = canonical_rotations(shape, reflections)
+        length = -(-(shape[0] * shape[1] * shape[2]) // 8)
+        # the bit at flat index j of a rotation is the byte j // 8 from the end of the key, at bit j % 8
+        targets = np.arange(permutations.shape[1])
+        keys = (length - 1 - targets // 8) * 8 + targets % 8
+        positions = np.empty_like(permutations)
+        positions[np.arange(len(permutations))[:, np.newaxis], permutations] = keys
+        rotations = _rotation_positions[(shape, reflections)] = (bytes(shapes[0].tolist()), positions.tolist())
+    return rotations
+
+
+def canonical_id(bitboard: Bitboard, stats: CanonicalStats = None, reflections: bool = False) -> bytes:
+    """
+    Computes the canonical id of a polycube, the same as the one returned by get_canonical_packing.
+
+    Every rotation in the canonical axis order is built by setting the bit of each cube at its
+    precomputed position, and the rotations are compared as Python ints.
+
+    Parameters:
+    bitboard (Bitboard): the shape and bits of a polycube
+    stats (CanonicalStats): optional counters of the rotations checked and skipped
+    reflections (bool): whether to take the largest of all 48 symmetries, so that mirror images
+        share the same id
+
+    Returns:
+    cube_id (bytes): the canonical bytes id of the polycube
+
+    """
+    shape, bits = bitboard
+    header, rotations = _key_positions(shape, reflections)
+    if stats is not None:
+        stats.checked += len(rotations)
+        stats.skipped += (48 if reflections else 24) - len(rotations)
+        stats.candidates += 1
+
+    cells = []
+    while bits:
+        cell = bits & -bits
+        bits ^= cell
+        cells.append(cell.bit_length() - 1)
+    best = 0
+    for positions in rotations:
+        key = 0
+        for cell in cells:
+            key |= 1 << positions[cell]
+        if key > best:
+            best = key
+    return header + best.to_bytes(-(-(shape[0] * shape[1] * shape[2]) // 8), 'big')
+
+
+def canonical_children(polycubes: Iterable[np.ndarray],
+                       stats: CanonicalStats = None,
+                       reflections: bool = False) -> Generator[np.ndarray, None, None]:
+    """
+    Expands a batch of polycubes and computes the canonical ids of all children with bitboards.
+
+    A drop in replacement for libraries.canonical.canonical_children, to compare the two backends.
+
+    Parameters:
+    polycubes (Iterable[np.array]): the polycubes to expand
+    stats (CanonicalStats): optional counters of the rotations checked and skipped
+    reflections (bool): whether mirror images share the same id, see canonical_ids
+
+    Returns:
+    generator(np.array): Yields Numpy void arrays of canonical ids, one per id length
+
+    """
+    groups: dict[int, list[bytes]] = {}
+    for polycube in polycubes:
+        for child in expand_cube(from_array(polycube)):
+            cube_id = canonical_id(child, stats, reflections)
+            groups.setdefault(len(cube_id), []).append(cube_id)
+    for length, cube_ids in groups.items():
+        yield np.frombuffer(b"".join(cube_ids), dtype=f"V{length}")
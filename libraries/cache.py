@@ -1,7 +1,34 @@
 import os
+import zlib
+import shutil
+import struct
+import argparse
 import numpy as np
+from typing import Callable, Generator, Iterable
+from libraries.packing import pack
 
 cache_path_fstring = "cubes_{0}.npy"
+packed_cache_path_fstring = "cubes_{0}.pcubes"
+# The size and modification time of a packed cache that passed verification, next to the cache
+verified_path_fstring = "{0}.verified"
+
+# File layout of a packed cache:
+# - header: magic, number of shape groups, flags, total number of polycubes
+# - one table entry per shape group: shape, record width, number of records, offset of the first record,
+#   number of bytes stored and CRC-32 of the bytes stored
+# - the records of every group, each record being the pack() bytes of one polycube,
+#   stored as a single zlib stream per group if the cache is compressed
+PACKED_MAGIC = b"PCUBES02"
+PACKED_HEADER = struct.Struct("<8sIIQ")
+PACKED_GROUP = struct.Struct("<BBBxIQQQI4x")
+PACKED_COMPRESSED = 1
+
+# Caches written before checksums, with no flags and no stored sizes or checksums in the group table
+PACKED_MAGIC_V1 = b"PCUBES01"
+PACKED_HEADER_V1 = struct.Struct("<8sIxxxxQ")
+PACKED_GROUP_V1 = struct.Struct("<BBBxIQQ")
+
+READ_BLOCK = 1 << 20
 
 
 def cache_exists(n: int) -> bool:
@@ -12,11 +39,26 @@ def cache_exists(n: int) -> bool:
     n (int): the size of polycube to search for
 
     Returns:
-    bool: whether that cache exists
+    bool: whether that cache exists, and passed verification if the cache is verified
+
+    """
+    return cache_manager.exists(n)
+
+
+def cache_count(n: int) -> int:
+    """
+    Returns the number of polycubes in the cache of a given size
+
+    Only the header is read for a packed cache.
+
+    Parameters:
+    n (int): the size of polycube to search for
+
+    Returns:
+    int: the number of polycubes in the cache, or None if there is no cache
 
     """
-    cache_path = cache_path_fstring.format(n)
-    return os.path.exists(cache_path)
+    return cache_manager.count(n)
 
 
 def get_cache_raw(cache_path: str) -> list[np.ndarray]:
@@ -43,6 +85,8 @@ def get_cache(n: int) -> np.ndarray:
     """
     Loads a Cache File for a given size of polycube
 
+    Reads the packed cache if there is one, and the legacy .npy cache otherwise.
+
     Parameters:
     n (int): the size of polycube to load the cache of
 
@@ -50,11 +94,7 @@ def get_cache(n: int) -> np.ndarray:
     list[np.ndarray]: the list of polycubes of that size from the cache
 
     """
-    cache_path = cache_path_fstring.format(n)
-    print(f"\rLoading polycubes n={n} from cache: ", end="")
-    polycubes = get_cache_raw(cache_path)
-    print(f"{len(polycubes)} shapes")
-    return polycubes
+    return cache_manager.load(n)
 
 
 def save_cache_raw(cache_path: str, polycubes: list[np.ndarray]) -> None:
@@ -76,6 +116,609 @@ def save_cache(n: int, polycubes: np.ndarray) -> None:
     n (int): the size of the polycubes to be cached
     polycubes (list[np.ndarray]): the polycubes to be cached
     """
-    cache_path = cache_path_fstring.format(n)
-    save_cache_raw(cache_path, polycubes)
-    print(f"Wrote file for polycubes n={n}")
+    cache_manager.save(n, polycubes)
+
+
+class PackedCacheWriter:
+    """
+    Writes polycube ids to a packed cache file, grouping them by shape.
+
+    Ids are buffered per shape and spilled to one temporary file per shape when the
+    buffers get large, so the whole cache never has to be held in memory.
+    The cache file is assembled from the temporary files when the writer is closed,
+    under a temporary name until it is complete, so an interrupted write never leaves
+    a truncated cache behind.
+    """
+
+    def __init__(self, cache_path: str, buffer_size: int = 1 << 26, compress: bool = False, level: int = 6):
+        self.cache_path = cache_path
+        self.spool_path = cache_path + ".tmp"
+        self.buffer_size = buffer_size
+        self.compress = compress
+        self.level = level
+        self.buffers: dict[bytes, bytearray] = {}
+        self.counts: dict[bytes, int] = {}
+        self.buffered = 0
+        # a spool left by a killed run would otherwise have its ids appended to
+        shutil.rmtree(self.spool_path, ignore_errors=True)
+        os.makedirs(self.spool_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            shutil.rmtree(self.spool_path, ignore_errors=True)
+
+    def __len__(self) -> int:
+        return sum(self.counts.values())
+
+    def write(self, cube_id: bytes) -> None:
+        """
+        Adds a single id to the cache.
+
+        Parameters:
+        cube_id (bytes): a polycube id, as returned by pack()
+        """
+        shape = cube_id[:3]
+        buffer = self.buffers.get(shape)
+        if buffer is None:
+            buffer = self.buffers[shape] = bytearray()
+            self.counts[shape] = 0
+        buffer += cube_id
+        self.counts[shape] += 1
+        self.buffered += len(cube_id)
+        if self.buffered >= self.buffer_size:
+            self.flush()
+
+    def write_ids(self, cube_ids: Iterable[bytes]) -> None:
+        """
+        Adds many ids to the cache.
+
+        Parameters:
+        cube_ids (Iterable[bytes]): polycube ids, as returned by pack()
+        """
+        for cube_id in cube_ids:
+            self.write(cube_id)
+
+    def flush(self) -> None:
+        """
+        Spills the buffered ids to the temporary file of their shape.
+        """
+        for shape, buffer in self.buffers.items():
+            if buffer:
+                with open(self._spool_file(shape), "ab") as spool:
+                    spool.write(buffer)
+                buffer.clear()
+        self.buffered = 0
+
+    def close(self) -> None:
+        """
+        Writes the header, the group table and all the records to the cache file.
+        """
+        self.flush()
+        shapes = sorted(self.counts)
+        partial_path = self.cache_path + ".part"
+        table = []
+        with open(partial_path, "wb") as cache_file:
+            # the group table is written last, once the stored sizes and checksums are known
+            cache_file.seek(PACKED_HEADER.size + PACKED_GROUP.size * len(shapes))
+            for shape in shapes:
+                width = 3 + -(-(shape[0] * shape[1] * shape[2]) // 8)
+                offset = cache_file.tell()
+                stored = checksum = 0
+                compressor = zlib.compressobj(self.level) if self.compress else None
+                with open(self._spool_file(shape), "rb") as spool:
+                    while True:
+                        block = spool.read(READ_BLOCK)
+                        if not block:
+                            break
+                        if compressor is not None:
+                            block = compressor.compress(block)
+                        cache_file.write(block)
+                        stored += len(block)
+                        checksum = zlib.crc32(block, checksum)
+                if compressor is not None:
+                    block = compressor.flush()
+                    cache_file.write(block)
+                    stored += len(block)
+                    checksum = zlib.crc32(block, checksum)
+                table.append(PACKED_GROUP.pack(*shape, width, self.counts[shape], offset, stored, checksum))
+            cache_file.seek(0)
+            cache_file.write(PACKED_HEADER.pack(PACKED_MAGIC, len(shapes),
+                                                PACKED_COMPRESSED if self.compress else 0, len(self)))
+            cache_file.write(b"".join(table))
+        os.replace(partial_path, self.cache_path)
+        shutil.rmtree(self.spool_path, ignore_errors=True)
+
+    def _spool_file(self, shape: bytes) -> str:
+        return os.path.join(self.spool_path, shape.hex())
+
+
+class PackedCache:
+    """
+    Reads a packed cache file through np.memmap, or by streaming its groups through zlib if it is compressed.
+
+    groups holds one entry per shape: the shape, the width of a record,
+    the number of records and the offset of the first record.
+    stored_sizes and checksums hold the number of bytes stored and their CRC-32 for each group,
+    checksums being None for caches written before checksums.
+    """
+
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        self.groups = []
+        self.stored_sizes = []
+        self.checksums = []
+        with open(cache_path, "rb") as cache_file:
+            magic = cache_file.read(8)
+            cache_file.seek(0)
+            if magic == PACKED_MAGIC:
+                _, group_count, flags, self.count = PACKED_HEADER.unpack(cache_file.read(PACKED_HEADER.size))
+                self.compressed = bool(flags & PACKED_COMPRESSED)
+                for _ in range(group_count):
+                    dx, dy, dz, width, count, offset, stored, checksum = \
+                        PACKED_GROUP.unpack(cache_file.read(PACKED_GROUP.size))
+                    self.groups.append(((dx, dy, dz), width, count, offset))
+                    self.stored_sizes.append(stored)
+                    self.checksums.append(checksum)
+            elif magic == PACKED_MAGIC_V1:
+                _, group_count, self.count = PACKED_HEADER_V1.unpack(cache_file.read(PACKED_HEADER_V1.size))
+                self.compressed = False
+                self.checksums = None
+                for _ in range(group_count):
+                    dx, dy, dz, width, count, offset = PACKED_GROUP_V1.unpack(cache_file.read(PACKED_GROUP_V1.size))
+                    self.groups.append(((dx, dy, dz), width, count, offset))
+                    self.stored_sizes.append(width * count)
+            else:
+                raise ValueError(f"{cache_path} is not a packed polycube cache")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def verify(self, full: bool = True) -> list[str]:
+        """
+        Checks that the cache is complete and uncorrupted.
+
+        The counts of the groups must add up to the count in the header, and the groups must
+        follow each other up to the end of the file. With full, the bytes of every group are
+        also read to check their CRC-32, and decompressed if the cache is compressed.
+
+        Parameters:
+        full (bool): whether to read the whole file to check the checksums
+
+        Returns:
+        list[str]: a description of every problem found, empty if the cache can be trusted
+
+        """
+        problems = []
+        if sum(count for _, _, count, _ in self.groups) != self.count:
+            problems.append(f"the groups hold {sum(count for _, _, count, _ in self.groups)} polycubes, "
+                            f"the header {self.count}")
+        header_size = PACKED_HEADER.size + PACKED_GROUP.size * len(self.groups) if self.checksums is not None \
+            else PACKED_HEADER_V1.size + PACKED_GROUP_V1.size * len(self.groups)
+        end = header_size
+        for group, (shape, width, count, offset) in enumerate(self.groups):
+            if width != 3 + -(-(shape[0] * shape[1] * shape[2]) // 8):
+                problems.append(f"group {group} has records of {width} bytes for the shape {shape}")
+            if not self.compressed and self.stored_sizes[group] != width * count:
+                problems.append(f"group {group} stores {self.stored_sizes[group]} bytes for {count} records")
+            if offset != end:
+                problems.append(f"group {group} starts at {offset}, expected {end}")
+            end = offset + self.stored_sizes[group]
+        file_size = os.path.getsize(self.cache_path)
+        if file_size != end:
+            problems.append(f"the file is {file_size} bytes, expected {end}")
+        if problems or not full:
+            return problems
+
+        with open(self.cache_path, "rb") as cache_file:
+            for group, (_, width, count, offset) in enumerate(self.groups):
+                cache_file.seek(offset)
+                remaining = self.stored_sizes[group]
+                checksum = unpacked = 0
+                decompressor = zlib.decompressobj() if self.compressed else None
+                try:
+                    while remaining:
+                        block = cache_file.read(min(remaining, READ_BLOCK))
+                        remaining -= len(block)
+                        checksum = zlib.crc32(block, checksum)
+                        if decompressor is not None:
+                            unpacked += len(decompressor.decompress(block))
+                except zlib.error as error:
+                    problems.append(f"group {group} cannot be decompressed: {error}")
+                    continue
+                if self.checksums is not None and checksum != self.checksums[group]:
+                    problems.append(f"group {group} has the checksum {checksum:08x}, expected {self.checksums[group]:08x}")
+                elif decompressor is not None and (unpacked != width * count or not decompressor.eof):
+                    problems.append(f"group {group} decompresses to {unpacked} bytes, expected {width * count}")
+        return problems
+
+    def records(self, group: int) -> np.ndarray:
+        """
+        Maps the records of a shape group without reading them.
+
+        The records of a compressed cache cant be mapped, and are decompressed in memory instead.
+
+        Parameters:
+        group (int): the index of the group in groups
+
+        Returns:
+        np.ndarray: (count, width) uint8 memmap, each row being the pack() bytes of a polycube
+
+        """
+        _, width, count, offset = self.groups[group]
+        if count == 0:
+            return np.zeros((0, width), dtype=np.uint8)
+        if self.compressed:
+            return np.concatenate(list(self._iter_group(group, 0, count, count)))
+        return np.memmap(self.cache_path, dtype=np.uint8, mode="r", offset=offset, shape=(count, width))
+
+    def iter_records(self, chunk_size: int = 65536) -> Generator[np.ndarray, None, None]:
+        """
+        Iterates over the records in chunks, a chunk never mixing shapes.
+
+        Parameters:
+        chunk_size (int): the maximum number of records in a chunk
+
+        Returns:
+        generator(np.ndarray): Yields (count, width) uint8 arrays of pack() bytes
+
+        """
+        for group, (_, _, count, _) in enumerate(self.groups):
+            yield from self._iter_group(group, 0, count, chunk_size)
+
+    def iter_polycubes(self, chunk_size: int = 65536,
+                       start: int = 0, stop: int = None) -> Generator[np.ndarray, None, None]:
+        """
+        Iterates over the polycubes in chunks, a chunk never mixing shapes.
+
+        Parameters:
+        chunk_size (int): the maximum number of polycubes in a chunk
+        start (int): the index of the first polycube, counting across all groups in file order
+        stop (int): the index after the last polycube, the end of the cache if not given
+
+        Returns:
+        generator(np.ndarray): Yields (count, X, Y, Z) Numpy byte arrays of polycubes of the same shape
+
+        """
+        stop = self.count if stop is None else min(stop, self.count)
+        first = 0
+        for group in range(len(self.groups)):
+            shape, _, count, _ = self.groups[group]
+            size = shape[0] * shape[1] * shape[2]
+            # the part of [start, stop) that falls in this group
+            begin, end = max(start - first, 0), min(stop - first, count)
+            if begin < end:
+                for chunk in self._iter_group(group, begin, end, chunk_size):
+                    bits = np.unpackbits(chunk[:, 3:], axis=1, count=size, bitorder='little')
+                    yield bits.reshape((len(chunk),) + shape)
+            first += count
+
+    def _iter_group(self, group: int, begin: int, end: int, chunk_size: int) -> Generator[np.ndarray, None, None]:
+        _, width, _, offset = self.groups[group]
+        if not self.compressed:
+            records = self.records(group)
+            for chunk_start in range(begin, end, chunk_size):
+                yield records[chunk_start:min(chunk_start + chunk_size, end)]
+            return
+
+        # a zlib stream can only be read from its start, so the records before begin are skipped
+        decompressor = zlib.decompressobj()
+        pending = bytearray()
+        remaining = self.stored_sizes[group]
+        row = 0
+        with open(self.cache_path, "rb") as cache_file:
+            cache_file.seek(offset)
+            while row < end:
+                rows = min(len(pending) // width, chunk_size, end - row)
+                if rows < min(chunk_size, end - row) and remaining:
+                    block = cache_file.read(min(remaining, READ_BLOCK))
+                    remaining -= len(block)
+                    pending += decompressor.decompress(block)
+                    continue
+                if rows == 0:
+                    raise ValueError(f"{self.cache_path} is truncated in group {group}")
+                if row + rows > begin:
+                    chunk = np.frombuffer(bytes(pending[:rows * width]), dtype=np.uint8).reshape(rows, width)
+                    yield chunk[max(begin - row, 0):]
+                del pending[:rows * width]
+                row += rows
+
+
+class CacheManager:
+    """
+    Finds, verifies, reads and writes the caches of every size of polycube in a directory.
+
+    A legacy .npy cache is converted to a packed cache the first time it is used, so it is only
+    unpickled once. A packed cache is only trusted once its counts agree with its size on disk and the checksum
+    of every group matches. The size and modification time of a cache whose checksums passed are
+    recorded in a .verified file next to it, so a cache is only read through once to be verified,
+    across runs, until it is rewritten.
+    """
+
+    def __init__(self, directory: str = ".", compress: bool = False, verify: bool = True):
+        self.directory = directory
+        self.compress = compress
+        self.verify_caches = verify
+
+    def path(self, n: int) -> str:
+        """
+        Returns the path of the packed cache of a given size.
+        """
+        return os.path.join(self.directory, packed_cache_path_fstring.format(n))
+
+    def legacy_path(self, n: int) -> str:
+        """
+        Returns the path of the legacy .npy cache of a given size.
+        """
+        return os.path.join(self.directory, cache_path_fstring.format(n))
+
+    def verify(self, n: int, expected_count: int = None, recheck: bool = False) -> list[str]:
+        """
+        Checks that the cache of a given size is complete and uncorrupted.
+
+        A legacy .npy cache is converted to a packed cache and that is verified. If it cannot be
+        converted, it has no checksums, so it is only checked to load in full.
+
+        Parameters:
+        n (int): the size of polycube to verify the cache of
+        expected_count (int): if given, the number of polycubes the cache must hold
+        recheck (bool): whether to check the checksums again even if the cache was verified before
+
+        Returns:
+        list[str]: a description of every problem found, empty if the cache can be trusted
+
+        """
+        try:
+            self._convert_legacy(n)
+        except Exception as error:
+            return [f"{self.legacy_path(n)} cannot be loaded: {error}"]
+        path = self.path(n)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            try:
+                cache = PackedCache(path)
+            except (ValueError, struct.error) as error:
+                return [str(error)]
+            record = (stat.st_size, stat.st_mtime_ns)
+            verified = not recheck and _read_verified(path) == record
+            problems = [] if verified else cache.verify()
+            if not problems and not verified:
+                _write_verified(path, record)
+            count = len(cache)
+        elif os.path.exists(self.legacy_path(n)):
+            path = self.legacy_path(n)
+            stat = os.stat(path)
+            problems = []
+            try:
+                count = len(get_cache_raw(path))
+            except Exception as error:
+                return [f"{path} cannot be loaded: {error}"]
+        else:
+            return [f"there is no cache n={n} in {self.directory}"]
+
+        if expected_count is not None and count != expected_count:
+            problems.append(f"the cache holds {count} polycubes, expected {expected_count}")
+        return problems
+
+    def exists(self, n: int) -> bool:
+        """
+        Checks if there is a cache of a given size that can be trusted.
+
+        Parameters:
+        n (int): the size of polycube to search for
+
+        Returns:
+        bool: whether that cache exists, and passed verification if the caches are verified
+
+        """
+        if not (os.path.exists(self.path(n)) or os.path.exists(self.legacy_path(n))):
+            return False
+        if not self.verify_caches:
+            self._convert_legacy(n)
+            return True
+        return self._trusted(n, None)
+
+    def nearest(self, n: int, name: Callable[[int], int] = None, lowest: int = 1,
+                known_counts: dict[int, int] = None) -> int:
+        """
+        Finds the highest size up to n with a cache that can be trusted.
+
+        Parameters:
+        n (int): the highest size of polycube to search for
+        name (Callable[[int], int]): gives the name of the cache of a size, the size itself if not given
+        lowest (int): the lowest size of polycube to search for
+        known_counts (dict[int, int]): if given, the caches of sizes with a known count must hold that many polycubes
+
+        Returns:
+        int: the highest size with a cache, or None if there is none
+
+        """
+        for level in range(n, lowest - 1, -1):
+            cache = name(level) if name is not None else level
+            if not (os.path.exists(self.path(cache)) or os.path.exists(self.legacy_path(cache))):
+                continue
+            if not self.verify_caches:
+                self._convert_legacy(cache)
+                return level
+            if self._trusted(cache, (known_counts or {}).get(level)):
+                return level
+        return None
+
+    def count(self, n: int) -> int:
+        """
+        Returns the number of polycubes in the cache of a given size, see cache_count.
+        """
+        if os.path.exists(self.path(n)):
+            return len(PackedCache(self.path(n)))
+        if os.path.exists(self.legacy_path(n)):
+            return len(get_cache_raw(self.legacy_path(n)))
+        return None
+
+    def load(self, n: int) -> list[np.ndarray]:
+        """
+        Loads the polycubes of a given size, see get_cache.
+        """
+        print(f"\rLoading polycubes n={n} from cache: ", end="")
+        if os.path.exists(self.path(n)):
+            # a view would keep its whole chunk of unpacked bits alive, and costs more than a copy
+            polycubes = [polycube.copy() for polycubes in self.iter(n) for polycube in polycubes]
+        else:
+            polycubes = get_cache_raw(self.legacy_path(n))
+        print(f"{len(polycubes)} shapes")
+        return polycubes
+
+    def iter(self, n: int, chunk_size: int = 65536) -> Generator[np.ndarray, None, None]:
+        """
+        Streams the polycubes of a given size, see iter_cache.
+        """
+        if os.path.exists(self.path(n)):
+            yield from PackedCache(self.path(n)).iter_polycubes(chunk_size)
+        else:
+            polycubes = get_cache_raw(self.legacy_path(n))
+            for start in range(0, len(polycubes), chunk_size):
+                yield from _stack_by_shape(polycubes[start:start + chunk_size])
+
+    def writer(self, n: int) -> PackedCacheWriter:
+        """
+        Opens a writer for the packed cache of a given size, compressed if the caches are compressed.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        return PackedCacheWriter(self.path(n), compress=self.compress)
+
+    def save(self, n: int, polycubes: Iterable[np.ndarray]) -> None:
+        """
+        Saves the polycubes of a given size, see save_cache.
+        """
+        with self.writer(n) as writer:
+            for polycube in polycubes:
+                writer.write(pack(polycube))
+        print(f"Wrote file for polycubes n={n}")
+
+    def convert(self, n: int) -> None:
+        """
+        Converts the legacy .npy cache of a given size, see convert_cache.
+        """
+        with self.writer(n) as writer:
+            for polycube in get_cache_raw(self.legacy_path(n)):
+                writer.write(pack(polycube))
+        print(f"Converted {len(writer)} polycubes n={n} to {self.path(n)}")
+
+    def remove(self, n: int) -> None:
+        """
+        Deletes the packed cache of a given size, and the record of its verification.
+        """
+        for path in [self.path(n), verified_path_fstring.format(self.path(n))]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _convert_legacy(self, n: int) -> None:
+        # the packed cache is counted from its header and streamed, instead of unpickling the legacy one every time
+        if os.path.exists(self.path(n)) or not os.path.exists(self.legacy_path(n)):
+            return
+        try:
+            self.convert(n)
+        except OSError as error:
+            print(f"\nReading the legacy cache n={n}, it cannot be converted: {error}")
+
+    def _trusted(self, n: int, expected_count: int) -> bool:
+        problems = self.verify(n, expected_count)
+        for problem in problems:
+            print(f"\nIgnoring the cache n={n}: {problem}")
+        return not problems
+
+
+def _read_verified(path: str) -> tuple[int, int]:
+    try:
+        with open(verified_path_fstring.format(path)) as verified_file:
+            size, mtime_ns = verified_file.read().split()
+        return int(size), int(mtime_ns)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_verified(path: str, record: tuple[int, int]) -> None:
+    # a cache in a read only directory is verified again on every run
+    try:
+        with open(verified_path_fstring.format(path), "w") as verified_file:
+            verified_file.write(f"{record[0]} {record[1]}\n")
+    except OSError:
+        pass
+
+
+# The caches used by default, configured once from the command line
+cache_manager = CacheManager()
+
+
+def configure_cache(directory: str = ".", compress: bool = False, verify: bool = True) -> None:
+    """
+    Sets where the caches are read and written, and how.
+
+    Parameters:
+    directory (str): the directory of the cache files
+    compress (bool): whether new packed caches are compressed with zlib
+    verify (bool): whether caches are verified before being trusted
+    """
+    cache_manager.directory = directory
+    cache_manager.compress = compress
+    cache_manager.verify_caches = verify
+
+
+def iter_cache(n: int, chunk_size: int = 65536) -> Generator[np.ndarray, None, None]:
+    """
+    Streams the polycubes of a given size from the cache, without loading it all in memory.
+
+    Parameters:
+    n (int): the size of polycube to load the cache of
+    chunk_size (int): the maximum number of polycubes in a chunk
+
+    Returns:
+    generator(np.ndarray): Yields (count, X, Y, Z) Numpy byte arrays of polycubes of the same shape
+
+    """
+    yield from cache_manager.iter(n, chunk_size)
+
+
+def convert_cache(n: int) -> None:
+    """
+    Converts the legacy .npy cache of a given size to a packed cache.
+
+    Parameters:
+    n (int): the size of polycube to convert the cache of
+    """
+    cache_manager.convert(n)
+
+
+def _stack_by_shape(polycubes: Iterable[np.ndarray]) -> Generator[np.ndarray, None, None]:
+    groups: dict[tuple[int, int, int], list[np.ndarray]] = {}
+    for polycube in polycubes:
+        groups.setdefault(polycube.shape, []).append(polycube)
+    for group in groups.values():
+        yield np.stack(group)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog='Polycube Cache Converter',
+        description='Converts cubes_{n}.npy cache files to the packed cache format, or verifies cache files.')
+
+    parser.add_argument('n', metavar='N', type=int, nargs='+',
+                        help='The sizes of polycubes to convert the cache of')
+    parser.add_argument('--directory', default='.',
+                        help='The directory of the cache files')
+    parser.add_argument('--compress', action='store_true',
+                        help='Compresses the packed caches written')
+    parser.add_argument('--verify', action='store_true',
+                        help='Only verifies the caches, checking their counts and checksums')
+
+    args = parser.parse_args()
+    configure_cache(args.directory, args.compress)
+    for n in args.n:
+        if args.verify:
+            problems = cache_manager.verify(n, recheck=True)
+            print(f"n={n}: " + ("; ".join(problems) if problems else "OK"))
+        else:
+            convert_cache(n)
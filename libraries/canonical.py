@@ -0,0 +1,266 @@
+import numpy as np
+from time import perf_counter
+from typing import Generator, Iterable
+from libraries import kernels
+from libraries.resizing import expand_cube_bulk
+from libraries.rotation import rotation_table
+
+
+# The stages of generating a polycube that can be timed
+STAGES = ("expansion", "rotation", "packing", "lookup", "write")
+
+
+class CanonicalStats:
+    """
+    Counts how many rotations were packed and compared while canonicalizing polycubes,
+    and how many could be skipped.
+
+    candidates counts the polycubes canonicalized, and early_exits those whose search stopped
+    at a rotation already known. If timed, the time spent in each of STAGES is added up too.
+    """
+
+    def __init__(self, timed: bool = False):
+        self.checked = 0
+        self.skipped = 0
+        self.candidates = 0
+        self.early_exits = 0
+        self.timings: dict[str, float] = dict.fromkeys(STAGES, 0.0) if timed else None
+
+    def __repr__(self):
+        total = self.checked + self.skipped
+        string = f"checked {self.checked} rotations, skipped {self.skipped} " \
+                 f"({(self.skipped / total if total else 0) * 100:.2f}%)"
+        if self.early_exits:
+            string += f", {self.early_exits} early exits"
+        return string
+
+    def lap(self, stage: str, start: float) -> float:
+        """
+        Adds the time elapsed since start to a stage, if timed.
+
+        Parameters:
+        stage (str): one of STAGES
+        start (float): the perf_counter() at the start of the stage
+
+        Returns:
+        float: the current perf_counter(), the start of the next stage
+
+        """
+        now = perf_counter()
+        if self.timings is not None:
+            self.timings[stage] += now - start
+        return now
+
+    def merge(self, other: "CanonicalStats") -> None:
+        """
+        Adds the counters of another CanonicalStats, e.g. from a worker process.
+        """
+        self.checked += other.checked
+        self.skipped += other.skipped
+        self.candidates += other.candidates
+        self.early_exits += other.early_exits
+        if self.timings is not None and other.timings is not None:
+            for stage, seconds in other.timings.items():
+                self.timings[stage] += seconds
+
+
+def canonical_shape(shape: tuple[int, int, int]) -> tuple[int, int, int]:
+    """
+    Returns the axis order of the canonical rotation of a polycube of a given shape.
+
+    The canonical id is the largest pack() of all rotations, and the shape is the start of
+    the packing, so only rotations with the dimensions sorted in descending order can be canonical.
+
+    Parameters:
+    shape (tuple[int, int, int]): the shape of a polycube
+
+    Returns:
+    tuple[int, int, int]: the shape of its canonical rotation
+
+    """
+    return tuple(sorted(shape, reverse=True))
+
+
+def canonical_rotations(shape: tuple[int, int, int], reflections: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Selects the rotations that may be canonical from the rotation table of a shape.
+
+    Parameters:
+    shape (tuple[int, int, int]): the shape of the polycubes to be rotated
+    reflections (bool): whether to select from the 48 symmetries instead of the 24 rotations
+
+    Returns:
+    np.array: (R, 3) array holding the shape of each rotation in the canonical axis order
+    np.array: (R, N) array of the flat index permutations of these rotations
+
+    """
+    table = rotation_table(shape, reflections)
+    selected = (table.shapes == canonical_shape(shape)).all(axis=1)
+    return table.shapes[selected], table.permutations[selected]
+
+
+def _lexicographic_argmax(rows: np.ndarray) -> np.ndarray:
+    """
+    Finds the lexicographically largest row of bytes for every candidate.
+
+    Parameters:
+    rows (np.array): (B, R, L) uint8 array of R byte strings of length L for each of B candidates
+
+    Returns:
+    np.array: (B,) array holding the index of the largest byte string for each candidate
+
+    """
+    count, options, length = rows.shape
+    padding = -length % 8
+    if padding:
+        rows = np.concatenate((rows, np.zeros((count, options, padding), dtype=np.uint8)), axis=-1)
+    # big endian words compare in the same order as the bytes they are made of
+    words = np.ascontiguousarray(rows).view('>u8')
+
+    alive = np.ones((count, options), dtype=bool)
+    for column in range(words.shape[2]):
+        values = np.where(alive, words[:, :, column], 0)
+        alive &= values == values.max(axis=1, keepdims=True)
+    return alive.argmax(axis=1)
+
+
+def _packed_rotations(polycubes: np.ndarray, stats: CanonicalStats, reflections: bool) -> np.ndarray:
+    """
+    Packs the rotations in the canonical axis order of a stack of polycubes sharing the same shape.
+
+    Returns:
+    np.array: (B, R, L) uint8 array of the pack() bytes of the R rotations of each polycube
+
+    """
+    count = polycubes.shape[0]
+    shapes, permutations = canonical_rotations(polycubes.shape[1:], reflections)
+    stats.checked += count * len(permutations)
+    stats.skipped += count * ((48 if reflections else 24) - len(permutations))
+    stats.candidates += count
+
+    clock = perf_counter()
+    rotated = (polycubes.reshape(count, -1) != 0)[:, permutations]
+    clock = stats.lap("rotation", clock)
+    bits = np.packbits(rotated, axis=-1, bitorder='little')
+    headers = np.broadcast_to(shapes, (count,) + shapes.shape)
+    packed = np.concatenate((headers, bits), axis=-1)
+    stats.lap("packing", clock)
+    return packed
+
+
+def canonical_ids(polycubes: np.ndarray, stats: CanonicalStats = None, reflections: bool = False) -> np.ndarray:
+    """
+    Computes the canonical id of a stack of polycubes sharing the same shape.
+
+    The canonical id is the same as the one returned by get_canonical_packing, e.g. the largest
+    pack() of all 24 rotations. Only the rotations in the canonical axis order are considered,
+    they are gathered at once with precomputed index permutations and packed with a single
+    call to np.packbits, or rotated, packed and compared by a compiled kernel if numba is enabled.
+
+    Parameters:
+    polycubes (np.array): (B, X, Y, Z) Numpy array of B polycubes where 1 values indicate cube positions
+    stats (CanonicalStats): optional counters of the rotations checked and skipped
+    reflections (bool): whether to take the largest of all 48 symmetries, so that mirror images
+        share the same id
+
+    Returns:
+    np.array: (B,) Numpy void array, where each item is the canonical bytes id of a polycube
+
+    """
+    if stats is None:
+        stats = CanonicalStats()
+    if kernels.numba_enabled():
+        return _kernel_ids(polycubes, stats, reflections)
+    packed = _packed_rotations(polycubes, stats, reflections)
+
+    clock = perf_counter()
+    best = packed[np.arange(len(packed)), _lexicographic_argmax(packed)]
+    stats.lap("packing", clock)
+    return best.view(f"V{packed.shape[-1]}").ravel()
+
+
+def _kernel_ids(polycubes: np.ndarray, stats: CanonicalStats, reflections: bool) -> np.ndarray:
+    """
+    Computes the same canonical ids as canonical_ids with the compiled kernel, timed as rotation.
+    """
+    count = polycubes.shape[0]
+    shapes, permutations = canonical_rotations(polycubes.shape[1:], reflections)
+    stats.checked += count * len(permutations)
+    stats.skipped += count * ((48 if reflections else 24) - len(permutations))
+    stats.candidates += count
+
+    clock = perf_counter()
+    flat = np.ascontiguousarray(polycubes.reshape(count, -1) != 0).view(np.uint8)
+    best = np.empty((count, 3 + -(-flat.shape[1] // 8)), dtype=np.uint8)
+    best[:, :3] = shapes[0]
+    bits = np.empty((count, best.shape[1] - 3), dtype=np.uint8)
+    kernels.canonical_bits_compiled(flat, np.ascontiguousarray(permutations), bits)
+    best[:, 3:] = bits
+    stats.lap("rotation", clock)
+    return best.view(f"V{best.shape[1]}").ravel()
+
+
+def canonical_symmetries(polycubes: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Computes the canonical id under all 48 symmetries of a stack of polycubes sharing the same shape,
+    and the order of their symmetry group.
+
+    There are as many symmetries mapping a polycube to its canonical orientation as symmetries mapping
+    it to itself (its stabilizer), so the group order is counted by comparing every packed symmetry to
+    the canonical id. Those symmetries can only be in the canonical axis order, so no other is needed.
+    A polycube is achiral when its stabilizer holds as many reflections as rotations, and chiral when
+    it holds no reflection, its mirror image then being a different one-sided polycube. The symmetries
+    mapping it to its canonical orientation are then either all rotations or all reflections.
+
+    Parameters:
+    polycubes (np.array): (B, X, Y, Z) Numpy array of B polycubes where 1 values indicate cube positions
+
+    Returns:
+    np.array: (B,) Numpy void array, where each item is the canonical bytes id of a polycube under all 48 symmetries
+    np.array: (B,) array of the number of symmetries mapping each polycube to itself
+    np.array: (B,) array of the number of rotations mapping each polycube to itself
+
+    """
+    shape = polycubes.shape[1:]
+    table = rotation_table(shape, reflections=True)
+    # the first 24 rows of the table are the rotations, the last 24 the reflections
+    proper = np.flatnonzero((table.shapes == canonical_shape(shape)).all(axis=1)) < 24
+
+    packed = _packed_rotations(polycubes, CanonicalStats(), reflections=True)
+    best = packed[np.arange(len(packed)), _lexicographic_argmax(packed)]
+    canonical = (packed == best[:, np.newaxis, :]).all(axis=-1)
+    order = canonical.sum(axis=1)
+    achiral = 2 * canonical[:, proper].sum(axis=1) == order
+    return best.view(f"V{packed.shape[-1]}").ravel(), order, np.where(achiral, order // 2, order)
+
+
+def canonical_children(polycubes: Iterable[np.ndarray],
+                       stats: CanonicalStats = None,
+                       reflections: bool = False) -> Generator[np.ndarray, None, None]:
+    """
+    Expands a batch of polycubes and computes the canonical ids of all children.
+
+    The children are grouped by shape, so that each group can be canonicalized in a single batch.
+
+    Parameters:
+    polycubes (Iterable[np.array]): the polycubes to expand
+    stats (CanonicalStats): optional counters of the rotations checked and skipped
+    reflections (bool): whether mirror images share the same id, see canonical_ids
+
+    Returns:
+    generator(np.array): Yields Numpy void arrays of canonical ids, one per shape of children
+
+    """
+    if stats is None:
+        stats = CanonicalStats()
+    clock = perf_counter()
+    groups: dict[tuple[int, int, int], list[np.ndarray]] = {}
+    for polycube in polycubes:
+        for children in expand_cube_bulk(polycube):
+            groups.setdefault(children.shape[1:], []).append(children)
+
+    for children in groups.values():
+        children = np.concatenate(children)
+        stats.lap("expansion", clock)
+        yield canonical_ids(children, stats, reflections)
+        clock = perf_counter()
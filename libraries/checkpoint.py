@@ -0,0 +1,145 @@
+import os
+import json
+import zlib
+import numpy as np
+from itertools import islice
+from time import perf_counter
+from typing import Generator, Iterable, Iterator
+from libraries.dedup import read_ids
+from libraries.packing import pack
+
+checkpoint_state_fstring = "checkpoint_{0}.json"
+checkpoint_ids_fstring = "checkpoint_{0}.ids"
+# The number of resumed ids added to the known ids at a time, so the log is never all in memory
+RESUME_CHUNK = 1 << 16
+
+
+class Checkpoint:
+    """
+    Records the progress of generating the polycubes of size n, so an interrupted run can be resumed.
+
+    The state holds the number of polycubes of size n-1 already expanded, and a crc32 of these
+    parents to check they come in the same order when resuming. The ids found since the last save
+    are appended to a log of pack() ids, so a save only costs writing the new ids and a small
+    json file, and the log is truncated back to the size recorded in the state when resuming.
+    """
+
+    def __init__(self, n: int, interval: float = 300.0, directory: str = ".", name=None):
+        """
+        Parameters:
+        n (int): the size of the polycubes generated.
+        interval (float): the number of seconds between two saves.
+        directory (str): the directory of the checkpoint files, the one of the caches.
+        name: the name of the cache of size n, so one-sided and free runs get their own
+            checkpoint, n by default.
+        """
+        self.n = n
+        self.interval = interval
+        name = n if name is None else name
+        self.state_path = os.path.join(directory, checkpoint_state_fstring.format(name))
+        self.ids_path = os.path.join(directory, checkpoint_ids_fstring.format(name))
+        self.next_parent = 0
+        self.digest = 0
+        self.ids_size = 0
+        self.pending = bytearray()
+        self.last_save = perf_counter()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.state_path)
+
+    def load(self) -> Generator[bytes, None, None]:
+        """
+        Reads the checkpoint state back, dropping any id written after the last complete save.
+
+        Returns:
+        generator(bytes): Yields the ids found before the checkpoint, read lazily from the log
+
+        """
+        with open(self.state_path) as state_file:
+            state = json.load(state_file)
+        if state["n"] != self.n:
+            raise ValueError(f"{self.state_path} is a checkpoint for n={state['n']}, not n={self.n}")
+        self.next_parent = state["next_parent"]
+        self.digest = state["digest"]
+        self.ids_size = state["ids_size"]
+
+        with open(self.ids_path, "r+b") as ids_file:
+            ids_file.truncate(self.ids_size)
+        return self._read_ids()
+
+    def _read_ids(self) -> Generator[bytes, None, None]:
+        with open(self.ids_path, "rb", buffering=1 << 20) as ids_file:
+            yield from read_ids(ids_file)
+
+    def skip(self, polycubes: Iterator[np.ndarray]) -> None:
+        """
+        Consumes the parents expanded before the checkpoint, checking they are the same.
+
+        Parameters:
+        polycubes (Iterator[np.array]): the polycubes of size n-1, in the order they are expanded
+        """
+        digest = 0
+        for _ in range(self.next_parent):
+            digest = zlib.crc32(pack(next(polycubes)), digest)
+        if digest != self.digest:
+            raise ValueError(f"the polycubes n={self.n - 1} are not the ones expanded before the checkpoint, "
+                             f"resuming needs them to be read from the cache")
+
+    def advance(self, polycubes: Iterable[np.ndarray], new_ids: Iterable[bytes]) -> None:
+        """
+        Records that some parents were expanded, and the new ids they produced.
+        Saves the checkpoint if the interval has elapsed since the last save.
+
+        Parameters:
+        polycubes (Iterable[np.array]): the parents expanded, in order
+        new_ids (Iterable[bytes]): the ids that were not known before expanding them
+        """
+        for polycube in polycubes:
+            self.digest = zlib.crc32(pack(polycube), self.digest)
+            self.next_parent += 1
+        for cube_id in new_ids:
+            self.pending += cube_id
+        if perf_counter() - self.last_save >= self.interval:
+            self.save()
+
+    def save(self) -> None:
+        """
+        Appends the new ids to the log, then atomically replaces the state.
+        """
+        with open(self.ids_path, "ab") as ids_file:
+            ids_file.write(self.pending)
+            ids_file.flush()
+            os.fsync(ids_file.fileno())
+        self.ids_size += len(self.pending)
+        self.pending = bytearray()
+
+        state = {"n": self.n, "next_parent": self.next_parent, "digest": self.digest, "ids_size": self.ids_size}
+        with open(self.state_path + ".tmp", "w") as state_file:
+            json.dump(state, state_file)
+            state_file.flush()
+            os.fsync(state_file.fileno())
+        os.replace(self.state_path + ".tmp", self.state_path)
+        self.last_save = perf_counter()
+
+    def remove(self) -> None:
+        """
+        Deletes the checkpoint once the polycubes of size n are complete.
+        """
+        for path in [self.state_path, self.ids_path]:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def chunked(cube_ids: Iterable[bytes], size: int = RESUME_CHUNK) -> Generator[list[bytes], None, None]:
+    """
+    Splits the ids resumed from a checkpoint into lists of at most size ids.
+
+    Parameters:
+    cube_ids (Iterable[bytes]): the ids, e.g. as returned by Checkpoint.load
+    size (int): the largest number of ids in a list
+
+    Returns:
+    generator(list[bytes]): Yields the ids in lists
+    """
+    cube_ids = iter(cube_ids)
+    yield from iter(lambda: list(islice(cube_ids, size)), [])
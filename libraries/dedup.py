@@ -0,0 +1,442 @@
+import os
+import sys
+import heapq
+import shutil
+import tempfile
+import numpy as np
+from itertools import compress
+from typing import BinaryIO, Generator, Iterable, Iterator
+from libraries.packing import ids_to_u64, u64_to_ids
+
+size_suffixes = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(size: str) -> int:
+    """
+    Parses a memory size such as 512M or 8G into a number of bytes.
+
+    Parameters:
+    size (str): a number optionally followed by K, M, G or T
+
+    Returns:
+    int: the number of bytes
+
+    """
+    size = size.strip().upper().removesuffix("B")
+    suffix = size[-1:] if size[-1:] in size_suffixes else ""
+    return int(float(size[:len(size) - len(suffix)]) * size_suffixes[suffix])
+
+
+def read_ids(id_file: BinaryIO) -> Generator[bytes, None, None]:
+    """
+    Reads back polycube ids written one after the other.
+
+    The ids use the pack() encoding, whose 3 byte shape header gives the length of each id,
+    so no separator is needed between them.
+
+    Parameters:
+    id_file (BinaryIO): a file opened in binary mode
+
+    Returns:
+    generator(bytes): Yields the ids in the order they were written
+
+    """
+    while True:
+        shape = id_file.read(3)
+        if len(shape) < 3:
+            return
+        yield shape + id_file.read(-(-(shape[0] * shape[1] * shape[2]) // 8))
+
+
+class ExternalIdSet:
+    """
+    A set of polycube ids that spills to disk to stay under a memory cap.
+
+    Ids are collected in an in-memory set. When it grows past max_memory, the set is
+    written to disk as a sorted run and cleared. Iterating merges the runs like an
+    external sort, dropping duplicates, so it yields each id once in sorted order.
+    Each run is indexed by shape, so ids can be looked up in it without reading it in full.
+    """
+
+    # the largest number of runs opened at once while merging
+    merge_fan_in = 64
+
+    def __init__(self, max_memory: int, directory: str = None):
+        self.max_memory = max_memory
+        self.directory = tempfile.mkdtemp(prefix="polycube_ids_", dir=directory)
+        self.buffer: set[bytes] = set()
+        self.id_memory = 0
+        self.runs: list[str] = []
+        self.merged = False
+        self.length = 0
+        # the offset, number and length of the ids of each shape in each run, and the runs memory mapped
+        self.indexes: dict[str, dict[bytes, list[int]]] = {}
+        self.maps: dict[str, np.memmap] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        if not self.runs:
+            return len(self.buffer)
+        self.merge()
+        return self.length
+
+    def __iter__(self) -> Iterator[bytes]:
+        if not self.runs:
+            return iter(sorted(self.buffer))
+        self.merge()
+        return self._read_run(self.runs[0])
+
+    def memory(self) -> int:
+        """
+        Estimates the memory held by the in-memory set, including the bytes objects.
+        """
+        return sys.getsizeof(self.buffer) + self.id_memory
+
+    def add(self, cube_id: bytes) -> None:
+        self.update((cube_id,))
+
+    def update(self, cube_ids: Iterable[bytes]) -> None:
+        """
+        Adds ids to the set, spilling to disk if the memory cap is reached.
+
+        Parameters:
+        cube_ids (Iterable[bytes]): polycube ids, their memory is estimated from the size of the first one
+        """
+        cube_ids = list(cube_ids)
+        if not cube_ids:
+            return
+        self.merged = False
+        before = len(self.buffer)
+        self.buffer.update(cube_ids)
+        self.id_memory += (len(self.buffer) - before) * sys.getsizeof(cube_ids[0])
+        if self.memory() >= self.max_memory:
+            self.spill()
+
+    def unknown(self, cube_ids: set[bytes]) -> set[bytes]:
+        """
+        Returns the ids that are not in the set.
+
+        The ids not in memory are binary searched in the memory mapped runs, among the ids of
+        the same shape.
+
+        Parameters:
+        cube_ids (set[bytes]): polycube ids
+
+        Returns:
+        set[bytes]: the ids not found
+        """
+        unknown = cube_ids - self.buffer
+        if not self.runs or not unknown:
+            return unknown
+        by_shape: dict[bytes, list[bytes]] = {}
+        for cube_id in unknown:
+            by_shape.setdefault(cube_id[:3], []).append(cube_id)
+        for shape, same_shape in by_shape.items():
+            width = len(same_shape[0])
+            dtype = np.dtype((np.void, width))
+            records = np.frombuffer(b"".join(same_shape), dtype=dtype)
+            found = np.zeros(len(records), dtype=bool)
+            for path in self.runs:
+                entry = self.indexes[path].get(shape)
+                if entry is None:
+                    continue
+                offset, count, _ = entry
+                if path not in self.maps:
+                    self.maps[path] = np.memmap(path, dtype=np.uint8, mode="r")
+                stored = self.maps[path][offset:offset + count * width].view(dtype)
+                found |= stored[np.minimum(np.searchsorted(stored, records), count - 1)] == records
+            unknown.difference_update(compress(same_shape, found))
+        return unknown
+
+    def spill(self) -> None:
+        """
+        Writes the in-memory ids to disk as a sorted run.
+        """
+        if self.buffer:
+            self.runs.append(self._write_run(sorted(self.buffer)))
+            self.buffer = set()
+            self.id_memory = 0
+
+    def merge(self) -> None:
+        """
+        Merges all runs and the in-memory ids into a single sorted run without duplicates.
+        """
+        if self.merged:
+            return
+        self.spill()
+        while True:
+            merged, self.runs = self.runs[:self.merge_fan_in], self.runs[self.merge_fan_in:]
+            self.runs.append(self._merge_runs(merged))
+            if len(self.runs) == 1:
+                break
+        self.merged = True
+
+    def close(self) -> None:
+        """
+        Deletes the runs from disk.
+        """
+        self.maps = {}
+        self.indexes = {}
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.runs = []
+        self.buffer = set()
+
+    def _write_run(self, cube_ids: Iterable[bytes]) -> str:
+        fd, path = tempfile.mkstemp(suffix=".run", dir=self.directory)
+        # the ids are sorted, so the ids of a shape are contiguous
+        index: dict[bytes, list[int]] = {}
+        offset = 0
+        with os.fdopen(fd, "wb", buffering=1 << 20) as run:
+            for cube_id in cube_ids:
+                entry = index.get(cube_id[:3])
+                if entry is None:
+                    entry = index[cube_id[:3]] = [offset, 0, len(cube_id)]
+                entry[1] += 1
+                offset += len(cube_id)
+                run.write(cube_id)
+        self.indexes[path] = index
+        return path
+
+    def _read_run(self, path: str) -> Generator[bytes, None, None]:
+        with open(path, "rb", buffering=1 << 20) as run:
+            yield from read_ids(run)
+
+    def _merge_runs(self, paths: list[str]) -> str:
+        self.length = 0
+
+        def unique(cube_ids):
+            previous = None
+            for cube_id in cube_ids:
+                if cube_id != previous:
+                    self.length += 1
+                    yield cube_id
+                    previous = cube_id
+
+        merged = self._write_run(unique(heapq.merge(*(self._read_run(path) for path in paths))))
+        for path in paths:
+            self.maps.pop(path, None)
+            del self.indexes[path]
+            os.remove(path)
+        return merged
+
+
+# Odd multipliers mixing the two words of a pack_u64 id into the 64 bit key U64IdSet sorts by
+U64_KEY_LOW = np.uint64(0x9E3779B97F4A7C15)
+U64_KEY_HIGH = np.uint64(0xC2B2AE3D27D4EB4F)
+
+
+def u64_keys(words: np.ndarray) -> np.ndarray:
+    """
+    Mixes each id encoded by pack_u64 into a single uint64 key.
+
+    Different ids rarely share a key, so sorting by the key first lets ids be searched with a
+    numeric np.searchsorted instead of comparing both words.
+
+    Parameters:
+    words (np.array): (B, 2) uint64 array of (low, high) words
+
+    Returns:
+    np.array: (B,) uint64 array of keys
+
+    """
+    return (words[:, 0] * U64_KEY_LOW) ^ (words[:, 1] * U64_KEY_HIGH)
+
+
+def unique_u64(words: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Sorts ids encoded by pack_u64 by key, high word and low word, and drops the duplicates.
+
+    Parameters:
+    words (np.array): (B, 2) uint64 array of (low, high) words
+
+    Returns:
+    np.array: the sorted unique ids, as a (U, 2) uint64 array of (low, high) words
+    np.array: their keys
+
+    """
+    keys = u64_keys(words)
+    order = np.argsort(keys)
+    words, keys = words[order], keys[order]
+    duplicate = (words[1:] == words[:-1]).all(axis=1)
+    if (~duplicate & (keys[1:] == keys[:-1])).any():
+        # different ids sharing a key, order them by their words too
+        order = np.lexsort((words[:, 0], words[:, 1], keys))
+        words, keys = words[order], keys[order]
+        duplicate = (words[1:] == words[:-1]).all(axis=1)
+    keep = np.ones(len(words), dtype=bool)
+    keep[1:] = ~duplicate
+    return words[keep], keys[keep]
+
+
+def _search_u64(unique: np.ndarray, unique_keys: np.ndarray,
+                words: np.ndarray, keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # the positions of the ids in the ids sorted by unique_u64, and whether they are there
+    positions = np.searchsorted(unique_keys, keys, side="left")
+    ends = np.searchsorted(unique_keys, keys, side="right")
+    # walk the stored ids sharing the key of each id, nearly always none or one
+    found = np.zeros(len(words), dtype=bool)
+    offsets = positions.copy()
+    for _ in range(int((ends - positions).max(initial=0))):
+        active = offsets < ends
+        stored = unique[np.minimum(offsets, len(unique) - 1)]
+        found |= active & (stored == words).all(axis=1)
+        less = active & ((stored[:, 1] < words[:, 1]) | (stored[:, 1] == words[:, 1]) & (stored[:, 0] < words[:, 0]))
+        positions += less
+        offsets += active
+    return positions, found
+
+
+def unknown_ids(known_ids, cube_ids: set[bytes]) -> set[bytes]:
+    """
+    Returns the ids of a batch that are not yet known, so that only new ids are logged to a checkpoint.
+
+    Parameters:
+    known_ids: a set of bytes ids, or an id set with an unknown() method such as ExternalIdSet or U64IdSet
+    cube_ids (set[bytes]): the ids of a batch
+
+    Returns:
+    set[bytes]: the ids of the batch not in known_ids
+
+    """
+    if isinstance(known_ids, (set, frozenset)):
+        return cube_ids - known_ids
+    return known_ids.unknown(cube_ids)
+
+
+class U64IdSet:
+    """
+    A set of polycube ids stored as pairs of uint64 words, as encoded by pack_u64.
+
+    The stored ids are kept sorted by u64_keys. Each chunk of new ids is deduplicated and queued,
+    and once the queued ids are a quarter of the stored ones they are deduplicated together, and
+    the ones not yet stored are inserted at the positions np.searchsorted finds for their keys.
+    This costs 16 bytes per id instead of a bytes object and a set slot, but only works for
+    polycubes that fit pack_u64.
+    """
+
+    def __init__(self, compact_size: int = 1 << 16, chunk_size: int = 1 << 15):
+        self.compact_size = compact_size
+        self.chunk_size = chunk_size
+        self.incoming: list[np.ndarray] = []
+        self.incoming_count = 0
+        self.unique = np.zeros((0, 2), dtype=np.uint64)
+        # the keys of the unique ids, only kept between two compactions while looking ids up
+        self.unique_keys: np.ndarray = None
+        self.pending: list[np.ndarray] = []
+        self.pending_count = 0
+
+    def __len__(self) -> int:
+        self.compact()
+        return len(self.unique)
+
+    def __iter__(self) -> Iterator[bytes]:
+        self.compact()
+        for start in range(0, len(self.unique), 65536):
+            yield from u64_to_ids(self.unique[start:start + 65536])
+
+    def memory(self) -> int:
+        """
+        Returns the memory held by the id arrays.
+        """
+        keys = self.unique_keys.nbytes if self.unique_keys is not None else 0
+        return self.unique.nbytes + keys + sum(words.nbytes for words in self.pending + self.incoming)
+
+    def add(self, cube_id: bytes) -> None:
+        self.update((cube_id,))
+
+    def update(self, cube_ids: Iterable[bytes] | np.ndarray) -> None:
+        """
+        Adds pack() bytes ids to the set.
+
+        Parameters:
+        cube_ids (Iterable[bytes] | np.array): polycube ids, as returned by pack(), or a void array
+            of ids of the same length as yielded by canonical_children, converted without
+            building a bytes object per id
+        """
+        if isinstance(cube_ids, np.ndarray):
+            self.update_u64(ids_to_u64(cube_ids))
+            return
+        for _, words in _by_length(cube_ids):
+            self.update_u64(words)
+
+    def unknown(self, cube_ids: set[bytes]) -> set[bytes]:
+        """
+        Returns the ids that are not in the set.
+
+        Parameters:
+        cube_ids (set[bytes]): polycube ids, as returned by pack()
+
+        Returns:
+        set[bytes]: the ids not found
+        """
+        self.queue()
+        if self.unique_keys is None:
+            self.unique_keys = u64_keys(self.unique)
+        stored = [(self.unique, self.unique_keys)] + [(words, u64_keys(words)) for words in self.pending]
+        unknown = set()
+        for same_length, words in _by_length(cube_ids):
+            keys = u64_keys(words)
+            found = np.zeros(len(words), dtype=bool)
+            for unique, unique_keys in stored:
+                found |= _search_u64(unique, unique_keys, words, keys)[1]
+            unknown.update(compress(same_length, ~found))
+        return unknown
+
+    def update_u64(self, words: np.ndarray) -> None:
+        """
+        Adds ids already encoded by pack_u64 to the set.
+
+        Parameters:
+        words (np.array): (B, 2) uint64 array of (low, high) words
+        """
+        if len(words) == 0:
+            return
+        self.incoming.append(words)
+        self.incoming_count += len(words)
+        if self.incoming_count >= self.chunk_size:
+            self.queue()
+
+    def queue(self) -> None:
+        """
+        Deduplicates the ids added since the last call and queues them to be merged.
+        """
+        if not self.incoming:
+            return
+        words, _ = unique_u64(np.concatenate(self.incoming))
+        self.incoming = []
+        self.incoming_count = 0
+        self.pending.append(words)
+        self.pending_count += len(words)
+        if self.pending_count >= max(self.compact_size, len(self.unique) // 4):
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Merges the pending ids into the sorted array of unique ids.
+        """
+        self.queue()
+        if not self.pending:
+            return
+        words, keys = unique_u64(np.concatenate(self.pending))
+        self.pending = []
+        self.pending_count = 0
+
+        unique_keys = self.unique_keys if self.unique_keys is not None else u64_keys(self.unique)
+        positions, found = _search_u64(self.unique, unique_keys, words, keys)
+        self.unique = np.insert(self.unique, positions[~found], words[~found], axis=0)
+        self.unique_keys = None
+
+
+def _by_length(cube_ids: Iterable[bytes]) -> Generator[tuple[list[bytes], np.ndarray], None, None]:
+    # pack() ids of the same length, with their pack_u64 words
+    by_length: dict[int, list[bytes]] = {}
+    for cube_id in cube_ids:
+        by_length.setdefault(len(cube_id), []).append(cube_id)
+    for length, same_length in by_length.items():
+        records = np.frombuffer(b"".join(same_length), dtype=np.uint8).reshape(-1, length)
+        yield same_length, ids_to_u64(records)
@@ -0,0 +1,188 @@
+import os
+import shutil
+from functools import partial
+from multiprocessing import Pool
+from libraries.cache import PackedCache, cache_manager
+from libraries.canonical import canonical_children
+from libraries.dedup import read_ids
+from libraries.parallel import shard_of
+
+# Layout of a distributed run, all paths relative to its working directory:
+# - shard_{s}/map_{node}.ids: the ids of shard s found by a node, possibly with duplicates
+# - shard_{s}.ids: the ids of shard s once reduced, sorted and without duplicates
+shard_directory_fstring = "shard_{0}"
+map_file_fstring = "map_{0}.ids"
+reduced_file_fstring = "shard_{0}.ids"
+
+
+def parent_range(total: int, node: int, nodes: int) -> tuple[int, int]:
+    """
+    Finds the slice of parents expanded by a node.
+
+    Parameters:
+    total (int): the number of polycubes of size n-1
+    node (int): the index of the node
+    nodes (int): the number of nodes
+
+    Returns:
+    tuple[int, int]: the start and stop index of the parents of the node
+
+    """
+    return total * node // nodes, total * (node + 1) // nodes
+
+
+def map_parents(n: int, node: int, nodes: int, shards: int, directory: str,
+                batch_size: int = 100, buffer_size: int = 1 << 24) -> int:
+    """
+    Expands a node's slice of the cache of size n-1, writing the canonical ids to shard files.
+
+    Every id goes to the shard given by shard_of, so a shard can be deduplicated on its own.
+    The ids are only deduplicated within a batch of parents, and buffered up to buffer_size
+    bytes before being appended to the shard files, so a node only holds its parents in memory.
+
+    Parameters:
+    n (int): the size of the polycubes to generate, the packed cache of size n-1 must exist
+    node (int): the index of the node
+    nodes (int): the number of nodes the parents are split between
+    shards (int): the number of shards the ids are split between
+    directory (str): the working directory of the run, shared by all nodes
+    batch_size (int): the number of parents expanded and canonicalized together
+    buffer_size (int): the number of bytes buffered before writing to the shard files
+
+    Returns:
+    int: the number of parents expanded
+
+    """
+    cache_path = cache_manager.path(n - 1)
+    if not os.path.exists(cache_path):
+        raise ValueError(f"distributing needs the packed cache {cache_path}, "
+                         f"convert a .npy cache with python -m libraries.cache {n - 1}")
+    start, stop = parent_range(len(PackedCache(cache_path)), node, nodes)
+
+    paths = []
+    for shard in range(shards):
+        os.makedirs(os.path.join(directory, shard_directory_fstring.format(shard)), exist_ok=True)
+        paths.append(os.path.join(directory, shard_directory_fstring.format(shard), map_file_fstring.format(node)))
+        # a node that is run again starts its map files over
+        open(paths[shard], "wb").close()
+
+    buffers = [bytearray() for _ in range(shards)]
+    buffered = 0
+
+    def flush():
+        for path, buffer in zip(paths, buffers):
+            if buffer:
+                with open(path, "ab") as map_file:
+                    map_file.write(buffer)
+                buffer.clear()
+
+    for parents in PackedCache(cache_path).iter_polycubes(batch_size, start, stop):
+        batch_ids = set()
+        for cube_ids in canonical_children(parents):
+            batch_ids.update(cube_ids.tolist())
+        for cube_id in batch_ids:
+            buffers[shard_of(cube_id, shards)] += cube_id
+            buffered += len(cube_id)
+        if buffered >= buffer_size:
+            flush()
+            buffered = 0
+    flush()
+    return stop - start
+
+
+def reduce_shard(shard: int, nodes: int, directory: str) -> int:
+    """
+    Deduplicates the ids of a shard written by every node.
+
+    Only the map files of the nodes 0 to nodes-1 are read, so the map files left by an earlier
+    run with more nodes are not merged in.
+
+    Parameters:
+    shard (int): the index of the shard
+    nodes (int): the number of nodes the parents were split between
+    directory (str): the working directory of the run
+
+    Returns:
+    int: the number of unique ids in the shard
+
+    """
+    shard_path = os.path.join(directory, shard_directory_fstring.format(shard))
+    cube_ids = set()
+    for node in range(nodes):
+        with open(os.path.join(shard_path, map_file_fstring.format(node)), "rb", buffering=1 << 20) as map_file:
+            cube_ids.update(read_ids(map_file))
+
+    reduced_path = os.path.join(directory, reduced_file_fstring.format(shard))
+    with open(reduced_path + ".tmp", "wb", buffering=1 << 20) as reduced_file:
+        for cube_id in sorted(cube_ids):
+            reduced_file.write(cube_id)
+    os.replace(reduced_path + ".tmp", reduced_path)
+    return len(cube_ids)
+
+
+def merge_shards(n: int, shards: int, directory: str) -> int:
+    """
+    Writes the reduced shards to the packed cache of size n.
+
+    Parameters:
+    n (int): the size of the polycubes generated
+    shards (int): the number of shards
+    directory (str): the working directory of the run
+
+    Returns:
+    int: the number of polycubes of size n
+
+    """
+    with cache_manager.writer(n) as writer:
+        for shard in range(shards):
+            with open(os.path.join(directory, reduced_file_fstring.format(shard)), "rb", buffering=1 << 20) as reduced:
+                writer.write_ids(read_ids(reduced))
+    return len(writer)
+
+
+def distribute_local(n: int, nodes: int, shards: int, directory: str, batch_size: int = 100) -> int:
+    """
+    Runs every step of a distributed generation on this machine, with one process per node.
+
+    Parameters:
+    n (int): the size of the polycubes to generate, the packed cache of size n-1 must exist
+    nodes (int): the number of processes the parents are split between
+    shards (int): the number of shards the ids are split between
+    directory (str): the working directory of the run
+    batch_size (int): the number of parents expanded and canonicalized together
+
+    Returns:
+    int: the number of polycubes of size n
+
+    """
+    with Pool(nodes) as pool:
+        pool.map(partial(_map_node, n, nodes, shards, directory, batch_size), range(nodes))
+        counts = pool.map(partial(reduce_shard, nodes=nodes, directory=directory), range(shards))
+    print(f"Reduced {shards} shards of polycubes n={n}: {min(counts)} to {max(counts)} polycubes each")
+    count = merge_shards(n, shards, directory)
+    remove_shards(shards, directory)
+    return count
+
+
+def remove_shards(shards: int, directory: str) -> None:
+    """
+    Deletes the map and reduced shard files once they are merged into the cache, and the working
+    directory if nothing else is left in it.
+
+    Parameters:
+    shards (int): the number of shards
+    directory (str): the working directory of the run
+    """
+    for shard in range(shards):
+        shutil.rmtree(os.path.join(directory, shard_directory_fstring.format(shard)), ignore_errors=True)
+        reduced_path = os.path.join(directory, reduced_file_fstring.format(shard))
+        if os.path.exists(reduced_path):
+            os.remove(reduced_path)
+    try:
+        os.rmdir(directory)
+    except OSError:
+        pass
+
+
+def _map_node(n: int, nodes: int, shards: int, directory: str, batch_size: int, node: int) -> int:
+    return map_parents(n, node, nodes, shards, directory, batch_size)
@@ -0,0 +1,167 @@
+import numpy as np
+from itertools import islice
+from multiprocessing import Pool
+from typing import Generator, Iterable
+from scipy import ndimage
+from libraries.canonical import canonical_ids
+from libraries.packing import unpack
+from libraries.resizing import crop_cube, expand_cube_bulk
+
+# Number of polycubes of size n, mirror images being distinct (OEIS A000162)
+KNOWN_COUNTS = {
+    1: 1, 2: 1, 3: 2, 4: 8, 5: 29, 6: 166, 7: 1023, 8: 6922, 9: 48311, 10: 346543,
+    11: 2522522, 12: 18598427, 13: 138462649, 14: 1039496297, 15: 7859514470, 16: 59795121480,
+}
+
+face_connectivity = ndimage.generate_binary_structure(3, 1)
+
+
+def canonical_id(polycube: np.ndarray) -> bytes:
+    """
+    Computes the canonical id of a single polycube, see canonical_ids.
+    """
+    return canonical_ids(polycube[np.newaxis]).tolist()[0]
+
+
+def canonical_deletion(polycube: np.ndarray) -> np.ndarray:
+    """
+    Removes the canonical cube of a polycube given in its canonical orientation.
+
+    The removed cube is the last one in flat order whose removal leaves the polycube connected.
+    As the orientation is canonical the choice only depends on the shape of the polycube,
+    so every polycube has a single canonical parent.
+
+    Parameters:
+    polycube (np.array): 3D Numpy byte array of a polycube in the orientation given by unpack of its canonical id
+
+    Returns:
+    np.array: the cropped polycube with one cube less
+
+    """
+    flat = polycube.flatten()
+    for index in np.flatnonzero(flat)[::-1]:
+        flat[index] = 0
+        reduced = flat.reshape(polycube.shape)
+        if ndimage.label(reduced, structure=face_connectivity)[1] == 1:
+            return crop_cube(reduced)
+        flat[index] = 1
+    raise ValueError("polycube has no cube that can be removed")
+
+
+def accepted_children(polycube: np.ndarray, polycube_id: bytes = None) -> list[bytes]:
+    """
+    Finds the children of a polycube for which it is the canonical parent.
+
+    Each polycube of size n has exactly one canonical parent of size n-1, so expanding every
+    polycube of size n-1 and keeping the accepted children generates each polycube of size n
+    exactly once, with no global set of known polycubes.
+
+    Parameters:
+    polycube (np.array): 3D Numpy byte array of a polycube
+    polycube_id (bytes): the canonical id of the polycube, computed if not given
+
+    Returns:
+    list[bytes]: the canonical ids of the accepted children
+
+    """
+    if polycube_id is None:
+        polycube_id = canonical_id(polycube)
+
+    child_ids = set()
+    for children in expand_cube_bulk(polycube):
+        child_ids.update(canonical_ids(children).tolist())
+
+    groups: dict[tuple[int, int, int], tuple[list[np.ndarray], list[bytes]]] = {}
+    for child_id in child_ids:
+        parent = canonical_deletion(unpack(child_id))
+        parents, ids = groups.setdefault(parent.shape, ([], []))
+        parents.append(parent)
+        ids.append(child_id)
+
+    accepted = []
+    for parents, ids in groups.values():
+        for child_id, parent_id in zip(ids, canonical_ids(np.stack(parents)).tolist()):
+            if parent_id == polycube_id:
+                accepted.append(child_id)
+    return accepted
+
+
+def iter_polycubes(n: int) -> Generator[bytes, None, None]:
+    """
+    Enumerates the canonical ids of all polycubes of size n by canonical augmentation.
+
+    Walks the tree of canonical parents depth first from the single cube, so only the
+    current path of at most n polycubes is held in memory.
+
+    Parameters:
+    n (int): The size of the polycubes to generate
+
+    Returns:
+    generator(bytes): Yields the canonical id of every polycube of size n exactly once
+
+    """
+    if n < 1:
+        return
+
+    def descend(polycube: np.ndarray, polycube_id: bytes, size: int):
+        if size == n:
+            yield polycube_id
+            return
+        for child_id in accepted_children(polycube, polycube_id):
+            yield from descend(unpack(child_id), child_id, size + 1)
+
+    monomer = np.ones((1, 1, 1), dtype=np.byte)
+    yield from descend(monomer, canonical_id(monomer), 1)
+
+
+def _accepted_children_of_chunk(polycubes: list[np.ndarray]) -> list[bytes]:
+    return [child_id for polycube in polycubes for child_id in accepted_children(polycube)]
+
+
+def enumerate_children(polycubes: Iterable[np.ndarray],
+                       workers: int = 1,
+                       chunk_size: int = 100) -> Generator[list[bytes], None, None]:
+    """
+    Enumerates the polycubes of size n from the polycubes of size n-1 by canonical augmentation.
+
+    Parents are independent, so they are streamed in chunks to a process pool.
+
+    Parameters:
+    polycubes (Iterable[np.array]): every polycube of size n-1, each exactly once
+    workers (int): the number of worker processes
+    chunk_size (int): the number of parents given to a worker at a time
+
+    Returns:
+    generator(list[bytes]): Yields the canonical ids of the accepted children of each chunk of parents
+
+    """
+    iterator = iter(polycubes)
+    chunks = iter(lambda: list(islice(iterator, chunk_size)), [])
+    if workers > 1:
+        with Pool(workers) as pool:
+            yield from pool.imap_unordered(_accepted_children_of_chunk, chunks)
+    else:
+        yield from map(_accepted_children_of_chunk, chunks)
+
+
+def check_count(n: int, count: int, cached_count: int = None, known_counts: dict[int, int] = None) -> bool:
+    """
+    Cross checks the number of polycubes found against the cache or the known counts.
+
+    Parameters:
+    n (int): the size of the polycubes
+    count (int): the number of polycubes found
+    cached_count (int): the number of polycubes in the cache of size n, if there is one
+    known_counts (dict[int, int]): the known counts to compare to, KNOWN_COUNTS by default
+
+    Returns:
+    bool: whether the count matches, or True if there is nothing to compare to
+
+    """
+    if known_counts is None:
+        known_counts = KNOWN_COUNTS
+    expected = cached_count if cached_count is not None else known_counts.get(n)
+    if expected is not None and expected != count:
+        print(f"\nFound {count} polycubes n={n}, expected {expected}")
+        return False
+    return True
@@ -0,0 +1,41 @@
+import numpy as np
+from itertools import chain
+
+
+def fingerprint(polycube: np.ndarray) -> bytes:
+    """
+    Computes a rotation invariant fingerprint of a polycube.
+
+    Two rotations of the same polycube always have the same fingerprint, so polycubes with
+    different fingerprints can never be the same. The fingerprint is made of:
+    - the sorted dimensions of the bounding box,
+    - for each axis the number of cubes in each layer along it, read in the
+      direction that gives the largest sequence, sorted with the dimensions,
+    - the number of cubes having 0 to 6 face neighbours.
+
+    Parameters:
+    polycube (np.array): 3D Numpy byte array where 1 values indicate polycube positions
+
+    Returns:
+    bytes: the fingerprint of the polycube
+
+    """
+    cube = polycube != 0
+
+    layers = []
+    for axis in range(3):
+        other_axes = tuple(a for a in range(3) if a != axis)
+        counts = cube.sum(axis=other_axes).tolist()
+        layers.append((len(counts), max(counts, counts[::-1])))
+    layers.sort(reverse=True)
+
+    padded = np.pad(cube, 1).astype(np.uint8)
+    neighbours = padded[2:, 1:-1, 1:-1] + padded[:-2, 1:-1, 1:-1] \
+        + padded[1:-1, 2:, 1:-1] + padded[1:-1, :-2, 1:-1] \
+        + padded[1:-1, 1:-1, 2:] + padded[1:-1, 1:-1, :-2]
+    degrees = np.bincount(neighbours[cube], minlength=7)
+
+    return bytes([dim for dim, _ in layers]) \
+        + bytes(chain.from_iterable(counts for _, counts in layers)) \
+        + bytes(degrees.tolist())
+
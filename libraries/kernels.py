@@ -0,0 +1,80 @@
+import numpy as np
+
+# numba is optional: without it, canonical_ids keeps to the batched NumPy path
+try:
+    import numba
+except ImportError:
+    numba = None
+
+NUMBA_AVAILABLE = numba is not None
+prange = numba.prange if NUMBA_AVAILABLE else range
+
+_numba_enabled = NUMBA_AVAILABLE
+
+
+def use_numba(enabled: bool) -> None:
+    """
+    Chooses whether canonical_ids runs the compiled kernel or the NumPy path.
+
+    Parameters:
+    enabled (bool): whether to use the compiled kernel, which needs numba to be installed
+    """
+    global _numba_enabled
+    if enabled and not NUMBA_AVAILABLE:
+        raise ValueError("the compiled kernel needs numba, install it with pip install numba")
+    _numba_enabled = enabled
+
+
+def numba_enabled() -> bool:
+    return _numba_enabled
+
+
+def single_threaded() -> None:
+    """
+    Runs the compiled kernel on a single thread, for processes of a pool already using every core.
+    """
+    if NUMBA_AVAILABLE:
+        numba.set_num_threads(1)
+
+
+def canonical_bits(polycubes: np.ndarray, permutations: np.ndarray, best: np.ndarray) -> None:
+    """
+    Finds the largest packed rotation of every polycube of a batch.
+
+    Every rotation is packed one byte at a time and compared to the largest one so far while
+    it is packed, moving on to the next rotation as soon as a byte is smaller. The polycubes
+    are split between threads when compiled with numba.
+
+    Parameters:
+    polycubes (np.array): (B, N) uint8 array of flattened polycubes sharing the same shape, of 0 and 1 values
+    permutations (np.array): (R, N) array of the flat index permutations of the rotations compared,
+        all in the same axis order
+    best (np.array): (B, (N + 7) // 8) uint8 array filled with the packbits of the largest rotation
+        of each polycube, in little bit order
+    """
+    count, size = polycubes.shape
+    length = best.shape[1]
+    for candidate in prange(count):
+        rotated = np.empty(length, dtype=np.uint8)
+        for rotation in range(permutations.shape[0]):
+            # 1 once this rotation is known to be larger than the best one, -1 once it is smaller
+            order = 1 if rotation == 0 else 0
+            for byte in range(length):
+                value = 0
+                for bit in range(min(8, size - 8 * byte)):
+                    value |= polycubes[candidate, permutations[rotation, 8 * byte + bit]] << bit
+                rotated[byte] = value
+                if order == 0:
+                    if value > best[candidate, byte]:
+                        order = 1
+                    elif value < best[candidate, byte]:
+                        order = -1
+                        break
+            if order == 1:
+                best[candidate, :] = rotated
+
+
+if NUMBA_AVAILABLE:
+    canonical_bits_compiled = numba.njit(parallel=True, cache=True)(canonical_bits)
+else:
+    canonical_bits_compiled = None
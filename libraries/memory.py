@@ -0,0 +1,113 @@
+import sys
+import numpy as np
+import scipy.sparse as sp
+from libraries.packing import pack
+from libraries.parallel import ShardedIds
+
+# resource only exists on Unix, psutil is optional: without either the peak memory is not known
+try:
+    import resource
+except ImportError:
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def peak_rss(include_children: bool = True) -> int:
+    """
+    Returns the peak resident set size of the process, as reported by the OS
+
+    Uses the resource module on Unix. Elsewhere it falls back to psutil if it is installed,
+    which only reports the peak working set of the process itself on Windows, and its current
+    resident memory on other systems.
+
+    Parameters:
+    include_children (bool): whether to add the peak of the largest finished child process,
+        e.g. the workers of a process pool, only supported by the resource module
+
+    Returns:
+    int: the peak resident memory in bytes, or None if neither resource nor psutil is available
+
+    """
+    if resource is None:
+        if psutil is None:
+            return None
+        memory_info = psutil.Process().memory_info()
+        return getattr(memory_info, "peak_wset", memory_info.rss)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if include_children:
+        peak += resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak * scale
+
+
+def format_mib(size: int) -> str:
+    """
+    Returns a size in bytes as MiB, or n/a if it is not known.
+    """
+    return "n/a" if size is None else f"{size / (1 << 20):.1f} MiB"
+
+
+def deep_size(known_ids) -> int:
+    """
+    Estimates the memory held by a set of known ids, including the ids themselves.
+
+    sys.getsizeof only measures the container, not the bytes objects it holds.
+
+    Parameters:
+    known_ids: a set or ShardedIds of bytes ids, or an id set with a memory() method
+        such as ExternalIdSet (only counting the ids in memory) or U64IdSet
+
+    Returns:
+    int: the size in bytes
+
+    """
+    if hasattr(known_ids, "memory"):
+        return known_ids.memory()
+    if isinstance(known_ids, ShardedIds):
+        return sys.getsizeof(known_ids.shards) + sum(deep_size(shard) for shard in known_ids.shards)
+    if isinstance(known_ids, (set, frozenset, list, tuple)):
+        return sys.getsizeof(known_ids) + sum(sys.getsizeof(cube_id) for cube_id in known_ids)
+    return sys.getsizeof(known_ids)
+
+
+def _array_size(array: np.ndarray) -> int:
+    # a view does not own its data, so getsizeof leaves it out
+    return sys.getsizeof(array) + (array.nbytes if array.base is not None else 0)
+
+
+def _sparse_size(matrix) -> int:
+    arrays = [matrix.data, matrix.indices, matrix.indptr] if matrix.format == "csr" \
+        else [matrix.data, matrix.row, matrix.col]
+    return sys.getsizeof(matrix) + sum(_array_size(array) for array in arrays)
+
+
+def representation_sizes(polycubes: list[np.ndarray], sample: int = 100000) -> dict[str, float]:
+    """
+    Measures the average memory of a polycube in each representation.
+
+    - dense: the 3D Numpy byte array
+    - packed: the bytes id returned by pack()
+    - csr, coo: a scipy sparse matrix of the polycube flattened to 2D
+
+    Parameters:
+    polycubes (list[np.array]): the polycubes to measure
+    sample (int): the largest number of polycubes measured, evenly spread over the list
+
+    Returns:
+    dict[str, float]: the average number of bytes per polycube of each representation
+
+    """
+    step = max(1, len(polycubes) // sample)
+    measured = polycubes[::step]
+    totals = dict.fromkeys(["dense", "packed", "csr", "coo"], 0)
+    for polycube in measured:
+        flat = polycube.reshape(polycube.shape[0], -1)
+        totals["dense"] += _array_size(polycube)
+        totals["packed"] += sys.getsizeof(pack(polycube))
+        totals["csr"] += _sparse_size(sp.csr_matrix(flat))
+        totals["coo"] += _sparse_size(sp.coo_matrix(flat))
+    return {name: total / max(1, len(measured)) for name, total in totals.items()}
@@ -0,0 +1,127 @@
+import sys
+import json
+from time import perf_counter
+from typing import Callable, TextIO
+from libraries.canonical import CanonicalStats
+from libraries.parallel import ShardedIds
+
+
+def known_size(known_ids) -> int:
+    """
+    Returns the number of known ids if it can be found cheaply, without merging spilled runs
+    or compacting pending arrays.
+
+    Parameters:
+    known_ids: the set of known ids, of any of the types used by hash_polycubes
+
+    Returns:
+    int: the number of known ids, or None if counting them would be costly
+
+    """
+    if isinstance(known_ids, ShardedIds):
+        sizes = [known_size(shard) for shard in known_ids.shards]
+        return None if None in sizes else sum(sizes)
+    if isinstance(known_ids, set):
+        return len(known_ids)
+    return None
+
+
+def json_lines(output: TextIO = sys.stdout) -> Callable[[dict], None]:
+    """
+    Creates a callback writing each metrics snapshot as a line of JSON.
+
+    Parameters:
+    output (TextIO): the file to write to
+
+    Returns:
+    Callable[[dict], None]: a callback for GenerationMetrics
+
+    """
+    def write(snapshot: dict) -> None:
+        output.write(json.dumps(snapshot) + "\n")
+        output.flush()
+    return write
+
+
+class GenerationMetrics(CanonicalStats):
+    """
+    Measures where the time goes while generating the polycubes of each size.
+
+    Extends the rotation counters with the time spent in each stage, the number of
+    parents expanded and the size of the set of known ids. A snapshot is given to the
+    callback every interval seconds, and once more when a size is complete.
+    """
+
+    def __init__(self, callback: Callable[[dict], None], interval: float = 10.0):
+        super().__init__(timed=True)
+        self.callback = callback
+        self.interval = interval
+        self.start(0, None)
+
+    def start(self, n: int, total_parents: int) -> None:
+        """
+        Resets the metrics before generating the polycubes of size n.
+
+        Parameters:
+        n (int): the size of the polycubes generated
+        total_parents (int): the number of polycubes of size n-1, if known
+        """
+        CanonicalStats.__init__(self, timed=True)
+        self.n = n
+        self.total_parents = total_parents
+        self.parents = 0
+        self.set_size = None
+        self.started = self.last_emit = perf_counter()
+
+    def update(self, parents: int, set_size: int = None) -> None:
+        """
+        Records the progress, and emits a snapshot if the interval has elapsed.
+
+        Parameters:
+        parents (int): the number of polycubes of size n-1 expanded so far
+        set_size (int): the number of known ids, if known
+        """
+        self.parents = parents
+        if set_size is not None:
+            self.set_size = set_size
+        if perf_counter() - self.last_emit >= self.interval:
+            self.emit()
+
+    def finish(self, set_size: int) -> None:
+        """
+        Emits the final snapshot of a size.
+
+        Parameters:
+        set_size (int): the number of polycubes of size n found
+        """
+        self.set_size = set_size
+        self.emit(final=True)
+
+    def emit(self, final: bool = False) -> None:
+        self.last_emit = perf_counter()
+        self.callback(self.snapshot(final))
+
+    def snapshot(self, final: bool = False) -> dict:
+        """
+        Returns the current metrics as a dict that can be serialized to JSON.
+        """
+        total_rotations = self.checked + self.skipped
+        duplicates = self.candidates - self.set_size if self.set_size is not None else None
+        return {
+            "n": self.n,
+            "final": final,
+            "elapsed": perf_counter() - self.started,
+            "parents": self.parents,
+            "total_parents": self.total_parents,
+            "candidates": self.candidates,
+            "candidates_per_parent": self.candidates / self.parents if self.parents else None,
+            "set_size": self.set_size,
+            "duplicates": duplicates,
+            "duplicate_rate": duplicates / self.candidates if duplicates is not None and self.candidates else None,
+            "rotations_checked": self.checked,
+            "rotations_skipped": self.skipped,
+            "rotation_skip_rate": self.skipped / total_rotations if total_rotations else None,
+            "early_exits": self.early_exits,
+            "early_exit_rate": self.early_exits / self.candidates if self.candidates else None,
+            "timings": dict(self.timings),
+        }
@@ -1,6 +1,13 @@
 import numpy as np
 import math
 
+# pack_u64 stores a polycube in two little endian uint64 words (low, high):
+# the bits of the polycube fill the low word then the bottom 52 bits of the high word,
+# and the top 12 bits of the high word hold each dimension minus one on 4 bits.
+U64_MAX_DIM = 16
+U64_MAX_SIZE = 116
+U64_SHAPE_SHIFT = 52
+
 
 def pack(polycube: np.ndarray) -> bytes:
     """
@@ -41,3 +48,92 @@ def unpack(cube_id: bytes) -> np.ndarray:
     polycube = np.unpackbits(np.frombuffer(cube_id[3:], dtype=np.uint8), count=size, bitorder='little').reshape(shape)
     return polycube
 
+
+def ids_to_u64(cube_ids: np.ndarray) -> np.ndarray:
+    """
+    Converts the bytes ids of polycubes of the same id length to the two word encoding of pack_u64.
+
+    Parameters:
+    cube_ids (np.array): (B, L) uint8 array, each row being the pack() bytes of a polycube,
+        or a (B,) void array of ids of length L as yielded by canonical_children
+
+    Returns:
+    words (np.array): (B, 2) uint64 array of (low, high) words
+
+    """
+    if cube_ids.dtype.kind == 'V':
+        cube_ids = cube_ids.view(np.uint8).reshape(len(cube_ids), cube_ids.dtype.itemsize)
+    shapes = cube_ids[:, :3].astype(np.uint64)
+    if len(cube_ids):
+        sizes = shapes[:, 0] * shapes[:, 1] * shapes[:, 2]
+        too_large = (shapes.max(axis=1) > U64_MAX_DIM) | (sizes > U64_MAX_SIZE)
+        if too_large.any():
+            shape = tuple(shapes[np.argmax(too_large)].tolist())
+            raise ValueError(f"polycubes of shape {shape} dont fit in two uint64 words")
+
+    data = np.zeros((len(cube_ids), 16), dtype=np.uint8)
+    data[:, :cube_ids.shape[1] - 3] = cube_ids[:, 3:]
+    words = data.view('<u8')
+    one = np.uint64(1)
+    dims = (shapes[:, 0] - one) << np.uint64(8) | (shapes[:, 1] - one) << np.uint64(4) | (shapes[:, 2] - one)
+    words[:, 1] |= dims << np.uint64(U64_SHAPE_SHIFT)
+    return words
+
+
+def u64_to_ids(words: np.ndarray) -> list[bytes]:
+    """
+    Converts polycubes encoded by pack_u64 back to their pack() bytes ids.
+
+    Parameters:
+    words (np.array): (B, 2) uint64 array of (low, high) words
+
+    Returns:
+    list[bytes]: the pack() bytes of every polycube
+
+    """
+    words = np.asarray(words, dtype=np.uint64).reshape(-1, 2)
+    dims = (words[:, 1] >> np.uint64(U64_SHAPE_SHIFT)).astype(np.int64)
+    shapes = np.stack(((dims >> 8) + 1, ((dims >> 4) & 15) + 1, (dims & 15) + 1), axis=1).astype(np.uint8)
+    data = words.copy()
+    data[:, 1] &= np.uint64((1 << U64_SHAPE_SHIFT) - 1)
+    data = data.astype('<u8').view(np.uint8).reshape(-1, 16)
+
+    cube_ids = []
+    for shape, bits in zip(shapes, data):
+        length = -(-(int(shape[0]) * int(shape[1]) * int(shape[2])) // 8)
+        cube_ids.append(shape.tobytes() + bits[:length].tobytes())
+    return cube_ids
+
+
+def pack_u64(polycube: np.ndarray) -> np.ndarray:
+    """
+    Converts a 3D ndarray into two uint64 words that unique identify the polycube.
+
+    Only polycubes of at most 16 cubes along each axis and 116 cubes in their bounding box fit,
+    which is the case of every polycube of up to 12 cubes.
+
+    Parameters:
+    polycube (np.array): 3D Numpy byte array where 1 values indicate polycube positions,
+        and 0 values indicate empty space.
+
+    Returns:
+    words (np.array): (2,) uint64 array of the (low, high) words
+
+    """
+    cube_id = np.frombuffer(pack(polycube), dtype=np.uint8)
+    return ids_to_u64(cube_id[np.newaxis])[0]
+
+
+def unpack_u64(words: np.ndarray) -> np.ndarray:
+    """
+    Converts two uint64 words back into a 3D ndarray
+
+    Parameters:
+    words (np.array): (2,) uint64 array of the (low, high) words
+
+    Returns:
+    polycube (np.array): 3D Numpy byte array where 1 values indicate 
+        cube positions
+
+    """
+    return unpack(u64_to_ids(words)[0])
@@ -0,0 +1,147 @@
+import zlib
+import numpy as np
+from collections import deque
+from itertools import chain, islice
+from multiprocessing import Pool
+from typing import Callable, Iterable, Iterator
+from libraries.canonical import CanonicalStats, canonical_children
+from libraries.checkpoint import Checkpoint, chunked
+from libraries.dedup import unknown_ids
+from libraries.kernels import single_threaded
+
+
+def shard_of(cube_id: bytes, shards: int) -> int:
+    """
+    Finds the shard owning a polycube id.
+
+    Uses crc32 rather than hash(), so that every process agrees on the shard of an id.
+
+    Parameters:
+    cube_id (bytes): the id of a polycube
+    shards (int): the number of shards
+
+    Returns:
+    int: the index of the shard owning the id
+
+    """
+    return zlib.crc32(cube_id) % shards
+
+
+class ShardedIds:
+    """
+    The union of disjoint shards of polycube ids.
+
+    Every id is owned by a single shard, so merging the shards is just chaining them.
+    """
+
+    def __init__(self, shards: list[set[bytes]]):
+        self.shards = shards
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return chain.from_iterable(self.shards)
+
+    def close(self) -> None:
+        for shard in self.shards:
+            if hasattr(shard, "close"):
+                shard.close()
+
+
+def _canonicalize_batch(task: tuple[list[np.ndarray], int, bool, bool]) -> tuple[list[set[bytes]], CanonicalStats]:
+    polycubes, shards, timed, reflections = task
+    stats = CanonicalStats(timed)
+    routed = [set() for _ in range(shards)]
+    for cube_ids in canonical_children(polycubes, stats, reflections):
+        for cube_id in cube_ids.tolist():
+            routed[shard_of(cube_id, shards)].add(cube_id)
+    return routed, stats
+
+
+def generate_ids_parallel(polycubes: Iterable[np.ndarray],
+                          workers: int,
+                          batch_size: int = 100,
+                          stats: CanonicalStats = None,
+                          progress: Callable[[int, int], None] = None,
+                          shard_factory: Callable[[], set[bytes]] = set,
+                          checkpoint: Checkpoint = None,
+                          resumed_ids: Iterable[bytes] = (),
+                          reflections: bool = False,
+                          total: int = None) -> ShardedIds:
+    """
+    Computes the canonical ids of all the children of polycubes using a process pool.
+
+    The polycubes are read in chunks of batch_size polycubes, and only a few chunks per worker
+    are read ahead, so they can be streamed from the cache. Each worker expands and canonicalizes
+    its chunk, drops the duplicates within it, and routes the canonical ids to one set per shard by
+    hashing them. The shards are disjoint, so they only need to be chained together at the end.
+
+    Only the expansion and canonicalization run in the workers: the main process adds the ids of
+    every chunk to the shards. Sharding keeps each set of known ids smaller, and lets it spill or be
+    compacted on its own, but the dedup against the known ids is not parallel.
+
+    Parameters:
+    polycubes (Iterable[np.array]): the polycubes of size n-1 to expand. With a checkpoint, a list
+        starts at checkpoint.next_parent, and any other iterable must already be past it.
+    workers (int): the number of worker processes, and of shards
+    batch_size (int): the number of polycubes given to a worker at a time
+    stats (CanonicalStats): optional counters of the rotations checked and skipped,
+        the stage timings add up the time of every worker
+    progress (Callable[[int, int], None]): optional callback given the number of polycubes done and the total
+    shard_factory (Callable[[], set[bytes]]): creates the set of ids owned by a shard
+    checkpoint (Checkpoint): optional checkpoint recording the progress
+    resumed_ids (Iterable[bytes]): ids loaded from the checkpoint
+    reflections (bool): whether mirror images share the same id, see canonical_ids
+    total (int): the number of polycubes of size n-1 given to progress, the length of a list if not given
+
+    Returns:
+    ShardedIds: the canonical ids of all polycubes of size n
+
+    """
+    shards = [shard_factory() for _ in range(workers)]
+    for chunk in chunked(resumed_ids):
+        routed = [[] for _ in range(workers)]
+        for cube_id in chunk:
+            routed[shard_of(cube_id, workers)].append(cube_id)
+        for shard, cube_ids in zip(shards, routed):
+            shard.update(cube_ids)
+
+    done = checkpoint.next_parent if checkpoint is not None else 0
+    parents = iter(polycubes)
+    if isinstance(polycubes, list):
+        total = len(polycubes) if total is None else total
+        parents = islice(parents, done, None)
+    timed = stats is not None and stats.timings is not None
+    batches = iter(lambda: list(islice(parents, batch_size)), [])
+
+    def collect(batch: list[np.ndarray], routed: list[set[bytes]], chunk_stats: CanonicalStats) -> None:
+        nonlocal done
+        if checkpoint is not None:
+            # only the new ids are logged, so the log grows with the unique ids and not the candidates
+            routed = [unknown_ids(shard, cube_ids) for shard, cube_ids in zip(shards, routed)]
+        for shard, cube_ids in zip(shards, routed):
+            shard.update(cube_ids)
+        if checkpoint is not None:
+            checkpoint.advance(batch, chain.from_iterable(routed))
+        if stats is not None:
+            stats.merge(chunk_stats)
+        done += len(batch)
+        if progress is not None:
+            progress(done, total)
+
+    # every worker runs the compiled kernel on a single thread, as the workers already use every core
+    with Pool(workers, initializer=single_threaded) as pool:
+        # the chunks are collected in order, as a checkpoint needs the parents done to be a prefix,
+        # and only a few are read ahead so the parents are never all held in memory
+        pending = deque()
+        for batch in batches:
+            pending.append((batch, pool.apply_async(_canonicalize_batch, ((batch, workers, timed, reflections),))))
+            if len(pending) >= 2 * workers:
+                batch, result = pending.popleft()
+                collect(batch, *result.get())
+        while pending:
+            batch, result = pending.popleft()
+            collect(batch, *result.get())
+
+    return ShardedIds(shards)
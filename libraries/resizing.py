@@ -53,3 +53,56 @@ def expand_cube(cube: np.ndarray) -> Generator[np.ndarray, None, None]:
         new_cube = np.array(cube)
         new_cube[x, y, z] = 1
         yield crop_cube(new_cube)
+
+
+def expand_cube_bulk(cube: np.ndarray) -> list[np.ndarray]:
+    """
+    Expands a polycube by adding single blocks at all valid locations, returning the new polycubes in bulk.
+
+    Produces the same polycubes as expand_cube, but stacked by shape. A new block can only grow
+    the bounding box through one of its 6 faces, so the crop of every new polycube is known from
+    the position of the added block, and each of the at most 7 stacks is built with one copy of
+    the padded cube and a single scatter of the added blocks.
+
+    Parameters:
+    cube (np.array): 3D Numpy byte array where 1 values indicate polycube positions,
+        with no zero padding around the edge
+
+    Returns:
+    list(np.array): (B, X, Y, Z) Numpy arrays of new polycubes sharing the same shape
+
+    """
+    padded = np.pad(cube, 1, 'constant', constant_values=0)
+    filled = padded != 0
+    grown = np.zeros_like(filled)
+    grown[1:] |= filled[:-1]
+    grown[:-1] |= filled[1:]
+    grown[:, 1:] |= filled[:, :-1]
+    grown[:, :-1] |= filled[:, 1:]
+    grown[:, :, 1:] |= filled[:, :, :-1]
+    grown[:, :, :-1] |= filled[:, :, 1:]
+    positions = np.stack((grown & ~filled).nonzero(), axis=1)
+
+    # the face of the bounding box grown by each new block, 0 if it stays inside
+    limits = np.array(padded.shape) - 1
+    faces = np.zeros(len(positions), dtype=np.intp)
+    for axis in range(3):
+        faces[positions[:, axis] == 0] = 2 * axis + 1
+        faces[positions[:, axis] == limits[axis]] = 2 * axis + 2
+
+    stacks = []
+    for face in np.unique(faces):
+        lower = np.ones(3, dtype=np.intp)
+        upper = limits.copy()
+        if face > 0:
+            axis = (face - 1) // 2
+            if face % 2:
+                lower[axis] = 0
+            else:
+                upper[axis] += 1
+        selected = positions[faces == face] - lower
+        base = padded[lower[0]:upper[0], lower[1]:upper[1], lower[2]:upper[2]]
+        stack = np.repeat(base[np.newaxis], len(selected), axis=0)
+        stack[np.arange(len(selected)), selected[:, 0], selected[:, 1], selected[:, 2]] = 1
+        stacks.append(stack)
+    return stacks
\ No newline at end of file
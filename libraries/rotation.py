@@ -1,5 +1,6 @@
 import numpy as np
-from typing import Generator
+from collections import OrderedDict
+from typing import Generator, NamedTuple
 
 
 def all_rotations(polycube: np.ndarray) -> Generator[np.ndarray, None, None]:
@@ -36,3 +37,133 @@ def all_rotations(polycube: np.ndarray) -> Generator[np.ndarray, None, None]:
     # rotate about axis 2, 8 rotations about axis 1
     yield from single_axis_rotation(np.rot90(polycube, axes=(0, 1)), (0, 2))
     yield from single_axis_rotation(np.rot90(polycube, -1, axes=(0, 1)), (0, 2))
+
+
+def all_symmetries(polycube: np.ndarray) -> Generator[np.ndarray, None, None]:
+    """
+    Calculates all 48 symmetries of a polycube, e.g. the rotations and the reflections.
+
+    Yields the 24 rotations of the polycube, then the 24 rotations of its mirror image
+    through the first axis, every reflection being a rotation of that mirror image.
+
+    Parameters:
+    polycube (np.array): 3D Numpy byte array where 1 values indicate polycube positions
+
+    Returns:
+    generator(np.array): Yields the 24 rotations, then the 24 reflections of this cube
+
+    """
+    yield from all_rotations(polycube)
+    yield from all_rotations(np.flip(polycube, axis=0))
+
+
+class RotationTable(NamedTuple):
+    """
+    The 24 rotations of every polycube of a given shape, in the order of all_rotations,
+    or its 48 symmetries in the order of all_symmetries if reflections are included.
+
+    shapes (np.array): (24, 3) or (48, 3) array holding the shape of each rotation
+    permutations (np.array): (24, N) or (48, N) array of flat indices, gathering the flattened polycube
+        with a row gives the flattened rotation
+    """
+    shapes: np.ndarray
+    permutations: np.ndarray
+
+
+class RotationTableCache:
+    """
+    A least recently used cache of rotation tables, keyed by shape.
+
+    Keeps count of the hits, misses and evictions so the cache size can be tuned.
+    With reflections, the tables hold the 48 symmetries instead of the 24 rotations.
+    """
+
+    def __init__(self, maxsize: int = 1024, reflections: bool = False):
+        self.maxsize = maxsize
+        self.reflections = reflections
+        self.tables: OrderedDict[tuple[int, int, int], RotationTable] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return f"{len(self.tables)}/{self.maxsize} tables, {self.hits} hits, " \
+               f"{self.misses} misses, {self.evictions} evictions"
+
+    def get(self, shape: tuple[int, int, int]) -> RotationTable:
+        """
+        Returns the rotation table of a shape, building it if it isnt cached.
+
+        Parameters:
+        shape (tuple[int, int, int]): the shape of the polycubes to be rotated
+
+        Returns:
+        RotationTable: the shapes and flat index permutations of the 24 rotations, or 48 symmetries
+
+        """
+        table = self.tables.get(shape)
+        if table is not None:
+            self.hits += 1
+            self.tables.move_to_end(shape)
+            return table
+
+        self.misses += 1
+        table = build_rotation_table(shape, self.reflections)
+        self.tables[shape] = table
+        if len(self.tables) > self.maxsize:
+            self.tables.popitem(last=False)
+            self.evictions += 1
+        return table
+
+    def clear(self) -> None:
+        self.tables.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+def build_rotation_table(shape: tuple[int, int, int], reflections: bool = False) -> RotationTable:
+    """
+    Computes the flat index permutations of all 24 rotations for a given shape.
+
+    The rotations are taken from all_rotations applied to an array of flat indices,
+    so the order and orientation match all_rotations exactly, or all_symmetries with reflections.
+
+    Parameters:
+    shape (tuple[int, int, int]): the shape of the polycubes to be rotated
+    reflections (bool): whether to add the 24 reflections after the rotations
+
+    Returns:
+    RotationTable: the shapes and flat index permutations of the 24 rotations, or 48 symmetries
+
+    """
+    indices = np.arange(np.prod(shape), dtype=np.intp).reshape(shape)
+    rotations = list(all_symmetries(indices) if reflections else all_rotations(indices))
+    shapes = np.array([rotation.shape for rotation in rotations], dtype=np.uint8)
+    permutations = np.stack([rotation.flatten() for rotation in rotations])
+    shapes.flags.writeable = False
+    permutations.flags.writeable = False
+    return RotationTable(shapes, permutations)
+
+
+rotation_tables = RotationTableCache()
+symmetry_tables = RotationTableCache(reflections=True)
+
+
+def rotation_table(shape: tuple[int, int, int], reflections: bool = False) -> RotationTable:
+    """
+    Returns the rotation table of a shape from the shared cache.
+
+    Rotating a polycube of that shape is then a single gather:
+    polycube.flatten()[table.permutations[i]].reshape(table.shapes[i])
+
+    Parameters:
+    shape (tuple[int, int, int]): the shape of the polycubes to be rotated
+    reflections (bool): whether to include the 24 reflections
+
+    Returns:
+    RotationTable: the shapes and flat index permutations of the 24 rotations, or 48 symmetries
+
+    """
+    tables = symmetry_tables if reflections else rotation_tables
+    return tables.get(tuple(int(dim) for dim in shape))
@@ -0,0 +1,126 @@
+import numpy as np
+from collections import Counter
+from typing import Iterable
+from libraries.canonical import canonical_symmetries
+from libraries.enumeration import KNOWN_COUNTS
+
+# Number of polycubes of size n, mirror images being the same (OEIS A038119)
+KNOWN_FREE_COUNTS = {
+    1: 1, 2: 1, 3: 2, 4: 7, 5: 23, 6: 112, 7: 607, 8: 3811, 9: 25413, 10: 178083,
+    11: 1279537, 12: 9371094,
+}
+
+# Number of polycubes of size n, every rotation and mirror image being distinct (OEIS A001931)
+KNOWN_FIXED_COUNTS = {
+    1: 1, 2: 3, 3: 15, 4: 86, 5: 534, 6: 3481, 7: 23502, 8: 162913, 9: 1152870, 10: 8294738,
+    11: 60494549, 12: 446205905,
+}
+
+
+class SymmetryCounts:
+    """
+    Counts the free, chiral and achiral polycubes of a size, from the canonical ids of its polycubes.
+
+    The ids can be the one-sided ones (mirror images being distinct) or the free ones given by
+    canonical_ids with reflections. Every id is canonicalized once more under all 48 symmetries
+    to find the order of its symmetry group, so the one-sided, free and fixed counts all come
+    out of the ids found by a single generation.
+    """
+
+    def __init__(self, n: int, reflections: bool = False):
+        self.n = n
+        self.reflections = reflections
+        self.ids = 0
+        self.chiral_ids = 0
+        # free polycubes by the order of their symmetry group, out of 48
+        self.group_orders: Counter[int] = Counter()
+        # the polycubes counted with every rotation and reflection being distinct, by orbit-stabilizer
+        self.fixed = 0
+
+    def __repr__(self):
+        orders = ", ".join(f"{order}: {count}" for order, count in sorted(self.group_orders.items()))
+        return f"n={self.n}: {self.free} free ({self.chiral} chiral, {self.achiral} achiral), " \
+               f"{self.one_sided} one-sided, {self.fixed} fixed, symmetry group orders {{{orders}}}"
+
+    @property
+    def one_sided(self) -> int:
+        return self.free + self.chiral
+
+    @property
+    def free(self) -> int:
+        # a chiral free polycube is found twice when mirror images are distinct
+        return self.ids if self.reflections else self.ids - self.chiral_ids // 2
+
+    @property
+    def chiral(self) -> int:
+        return self.chiral_ids if self.reflections else self.chiral_ids // 2
+
+    @property
+    def achiral(self) -> int:
+        return self.free - self.chiral
+
+    def add(self, cube_ids: Iterable[bytes]) -> None:
+        """
+        Adds the canonical ids of polycubes, each exactly once.
+
+        Parameters:
+        cube_ids (Iterable[bytes]): canonical polycube ids, as returned by pack()
+        """
+        by_length: dict[int, list[bytes]] = {}
+        for cube_id in cube_ids:
+            by_length.setdefault(len(cube_id), []).append(cube_id)
+        for length, same_length in by_length.items():
+            records = np.frombuffer(b"".join(same_length), dtype=np.uint8).reshape(-1, length)
+            # ids of the same length may still have different shapes
+            for shape in np.unique(records[:, :3], axis=0):
+                self.add_records(records[(records[:, :3] == shape).all(axis=1)])
+
+    def add_records(self, records: np.ndarray) -> None:
+        """
+        Adds the canonical ids of polycubes sharing the same shape.
+
+        Parameters:
+        records (np.array): (B, L) uint8 array, each row being the pack() bytes of a polycube
+        """
+        shape = tuple(int(dim) for dim in records[0, :3])
+        size = shape[0] * shape[1] * shape[2]
+        polycubes = np.unpackbits(records[:, 3:], axis=1, count=size, bitorder='little')
+        _, orders, rotation_orders = canonical_symmetries(polycubes.reshape((len(records),) + shape))
+
+        chiral = orders == rotation_orders
+        self.ids += len(records)
+        self.chiral_ids += int(chiral.sum())
+        if self.reflections:
+            self.fixed += int((48 // orders).sum())
+            self.group_orders.update(orders.tolist())
+        else:
+            # a one-sided polycube has 24 / rotation_order orientations
+            self.fixed += int((24 // rotation_orders).sum())
+            # count a chiral free polycube through one of its two one-sided polycubes
+            self.group_orders.update((orders[~chiral]).tolist())
+            self.group_orders.update(Counter({order: count // 2 for order, count in
+                                              Counter(orders[chiral].tolist()).items()}))
+
+    def check(self) -> list[str]:
+        """
+        Cross checks the counts against each other and against the known counts.
+
+        A free polycube whose symmetry group has a given order has 48 / order fixed orientations
+        (orbit-stabilizer, as in Burnside's lemma), so the group orders give the number of fixed
+        polycubes. It is compared to the fixed count found from the ids, which for one-sided ids
+        comes from their rotation groups instead, and to the known fixed counts.
+
+        Returns:
+        list[str]: a description of every count that doesnt match, empty if all match
+
+        """
+        mismatches = []
+        fixed_from_orders = sum(48 // order * count for order, count in self.group_orders.items())
+        if fixed_from_orders != self.fixed:
+            mismatches.append(f"the symmetry group orders give {fixed_from_orders} fixed polycubes, found {self.fixed}")
+        for name, found, known in [("free", self.free, KNOWN_FREE_COUNTS),
+                                   ("one-sided", self.one_sided, KNOWN_COUNTS),
+                                   ("fixed", self.fixed, KNOWN_FIXED_COUNTS)]:
+            if self.n in known and known[self.n] != found:
+                mismatches.append(f"found {found} {name} polycubes n={self.n}, expected {known[self.n]}")
+        return mismatches
@@ -1,13 +1,55 @@
 from __future__ import annotations
 import sys
+import argparse
+import contextlib
+import multiprocessing
 from time import perf_counter
 import numpy as np
 from holder import PolycubeHolder
 from polycube import PolyCube
-from utils import identity_to_tag, render_shapes
+from utils import identity_to_tag, tag_to_string, render_shapes
+import tracing
 import tracemalloc
 
 
+def split_tags(buckets: dict[int, list[PolyCube]], workers: int) -> list[list[tuple[int, list[PolyCube]]]]:
+    """
+    split the tags between the workers, giving the tags with the most polycubes first
+    to the worker with the fewest polycubes so far.
+
+    Args:
+        buckets: the polycubes of each tag
+        workers: the number of workers
+
+    Returns: the tags of each worker with their polycubes, leaving out the workers with no tag
+    """
+    groups = [[] for _ in range(workers)]
+    loads = [0] * workers
+    for tag in sorted(buckets, key=lambda tag: len(buckets[tag]), reverse=True):
+        worker = loads.index(min(loads))
+        groups[worker].append((tag, buckets[tag]))
+        loads[worker] += len(buckets[tag])
+    return [group for group in groups if group]
+
+
+def solve_tags(buckets: list[tuple[int, list[PolyCube]]]) -> list[tuple[int, PolycubeHolder]]:
+    """
+    sort the polycubes of a set of tags, in a worker process.
+
+    Args:
+        buckets: the tags of the worker, each with its polycubes in the order they were generated
+
+    Returns: the holder of each tag
+    """
+    holders = []
+    for tag, polycubes in buckets:
+        holder = PolycubeHolder(tag)
+        for polycube in polycubes:
+            holder.add_polycube(polycube)
+        holders.append((tag, holder))
+    return holders
+
+
 class CubeSolver:
     def __repr__(self):
         value = []
@@ -19,11 +61,13 @@ class CubeSolver:
         return string
 
     def __init__(self):
-        initial_holder = PolycubeHolder("C0")
+        initial_tag = identity_to_tag([0])
+        initial_holder = PolycubeHolder(initial_tag)
         initial_holder.add_polycube(PolyCube(np.array([[0]]), [(0, 0, 0)]))
 
-        self.polycube_per_number_of_cubes: dict[int, dict[str, PolycubeHolder]] = \
-            {1: {"C0": initial_holder}}
+        # the holders of each number of cubes, keyed by the integer tag of their polycubes
+        self.polycube_per_number_of_cubes: dict[int, dict[int, PolycubeHolder]] = \
+            {1: {initial_tag: initial_holder}}
 
     def render_shapes(self, output_file: str, number_of_cubes: int = 0, shapes: str = ""):
         polycubes = []
@@ -37,36 +81,81 @@ class CubeSolver:
                 polycubes += by_shape.polycubes
 
         else:
-            polycubes += self.polycube_per_number_of_cubes[number_of_cubes][shapes].polycubes
+            for tag, by_shape in self.polycube_per_number_of_cubes[number_of_cubes].items():
+                if tag_to_string(tag) == shapes:
+                    polycubes += by_shape.polycubes
 
         polycubes = [polycube.get_3D_representation() for polycube in polycubes]
         print(polycubes)
 
         render_shapes(polycubes, output_file)
 
-    def solve(self, cube_number: int):
-        for i in range(1, cube_number):
-            print(i)
-            self.polycube_per_number_of_cubes[i + 1] = dict()
-            for polycube_type in self.polycube_per_number_of_cubes[i]:
-                for polycube in self.polycube_per_number_of_cubes[i].get(polycube_type).polycubes:
-                    new_PCPOs = polycube.iterate_through_All_PCPO()
-                    for PCPO in new_PCPOs:
-                        tag = identity_to_tag(PCPO.cube_identity)
-                        if self.polycube_per_number_of_cubes[i + 1].get(tag) is not None:
-                            self.polycube_per_number_of_cubes[i + 1][tag].add_polycube(PCPO)
-                        else:
-                            self.polycube_per_number_of_cubes[i + 1][tag] = PolycubeHolder(tag)
-                            self.polycube_per_number_of_cubes[i + 1][tag].add_polycube(PCPO)
+    def solve(self, cube_number: int, workers: int = 1):
+        """
+        find the polycubes of every number of cubes up to cube_number.
+
+        Args:
+            cube_number: the number of cubes of the largest polycubes
+            workers: the number of processes sorting the polycubes. polycubes with different tags are
+                     never equal, so with more than one worker each process owns a disjoint set of tags
+        """
+        with multiprocessing.Pool(workers) if workers > 1 else contextlib.nullcontext() as pool:
+            for i in range(1, cube_number):
+                tracing.info("solving polycubes of {} cubes", i + 1)
+                if pool is None:
+                    self.__solve_level(i)
+                else:
+                    self.__solve_level_parallel(i, pool, workers)
+
+    def __solve_level(self, i: int):
+        self.polycube_per_number_of_cubes[i + 1] = dict()
+        for polycube_type in self.polycube_per_number_of_cubes[i]:
+            for polycube in self.polycube_per_number_of_cubes[i].get(polycube_type).polycubes:
+                new_PCPOs = polycube.iterate_through_All_PCPO()
+                for PCPO in new_PCPOs:
+                    holder = self.polycube_per_number_of_cubes[i + 1].get(PCPO.tag)
+                    if holder is None:
+                        holder = PolycubeHolder(PCPO.tag)
+                        self.polycube_per_number_of_cubes[i + 1][PCPO.tag] = holder
+                    holder.add_polycube(PCPO)
+
+    def __solve_level_parallel(self, i: int, pool: multiprocessing.Pool, workers: int):
+        """
+        route all the polycubes of i + 1 cubes to the bucket of their tag, then sort the buckets
+        in the worker processes and merge their holders, in the order the tags were first found.
+        """
+        buckets: dict[int, list[PolyCube]] = dict()
+        for polycube_type in self.polycube_per_number_of_cubes[i]:
+            for polycube in self.polycube_per_number_of_cubes[i].get(polycube_type).polycubes:
+                for PCPO in polycube.iterate_through_All_PCPO():
+                    buckets.setdefault(PCPO.tag, []).append(PCPO)
+
+        holders: dict[int, PolycubeHolder] = dict()
+        for worker_holders in pool.map(solve_tags, split_tags(buckets, workers)):
+            holders.update(worker_holders)
+        self.polycube_per_number_of_cubes[i + 1] = {tag: holders[tag] for tag in buckets}
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='solve the polycubes without rotations')
+    parser.add_argument('n', type=int, nargs='?', default=5, help='the number of cubes of the largest polycubes')
+    parser.add_argument('--trace', choices=sorted(tracing.LEVELS), default='off',
+                        help='the level of the trace messages written, off by default')
+    parser.add_argument('--counters', action='store_true',
+                        help='count the calls of the main functions and write them at the end')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='the number of processes sorting the polycubes of each size, split by tag. '
+                             'the counters only count the calls of the main process')
+    args = parser.parse_args()
+    tracing.set_level(args.trace)
+    tracing.set_counting(args.counters)
+
     # Start the timer
     tracemalloc.start()
     t1_start = perf_counter()
 
     solver = CubeSolver()
-    solver.solve(5)
+    solver.solve(args.n, args.workers)
     solver.render_shapes("out", 4)
     print(solver)
 
@@ -75,6 +164,8 @@ if __name__ == "__main__":
 
     print(f"Elapsed time: {round(t1_stop - t1_start, 3)}s")
     print(tracemalloc.get_traced_memory())
+    if args.counters:
+        print(tracing.report())
 
     # val = np.load("../tests/cubes_7.npy", allow_pickle=True)
     # print(len(val))
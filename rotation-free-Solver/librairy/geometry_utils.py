@@ -1,5 +1,8 @@
 import numpy as np
 
+# the offset of the neighbor through the face 2 ** slot, in the order of the slots
+FACE_OFFSETS = ((0, 1, 0), (1, 0, 0), (0, 0, 1), (0, -1, 0), (-1, 0, 0), (0, 0, -1))
+
 
 def get_adjacency_matrix_from_position_vector(position_vector: list[tuple[int, int, int]]):
     adjacency_matrix = np.zeros((len(position_vector), len(position_vector)), dtype=int)
@@ -1,4 +1,4 @@
-from utils import identity_to_tag, has_equivalence, render_shapes
+from utils import has_equivalence, render_shapes
 import geometry_utils as gu
 from polycube import PolyCube
 from sorter import PolycubeSorter
@@ -9,7 +9,7 @@ class PolycubeHolder:
     the structure that holds the polycube depending on their tags
     """
 
-    def __init__(self, polycube_tag: str):
+    def __init__(self, polycube_tag: int):
         self.polycube_tags = polycube_tag
         self.sorter = PolycubeSorter()
         self.polycubes = []
@@ -24,7 +24,7 @@ class PolycubeHolder:
         return len(self.polycubes)
 
     def add_polycube(self, polycube: PolyCube):
-        if identity_to_tag(polycube.cube_identity) == self.polycube_tags:
+        if polycube.tag == self.polycube_tags:
             if self.sorter.try_add_polycube(polycube):
                 self.polycubes.append(polycube)
 
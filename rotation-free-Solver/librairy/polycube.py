@@ -1,15 +1,43 @@
 from __future__ import annotations
-import copy
+from array import array
 import numpy as np
 import geometry_utils as gu
 import numpy.typing as npt
-from collections import Counter
-from utils import update_adjacency_matrix
+from utils import update_adjacencies, identity_to_tag
+import tracing
 
 sort_order = [1, 2, 4, 8, 16, 32]
 
+# the neighbors of a node are stored in 6 slots, the neighbor through the face 2 ** slot being in the slot
+# number slot, and -1 if there is no cube on that face
+SLOTS = {face: slot for slot, face in enumerate(sort_order)}
+EMPTY_SLOTS = array('h', [-1] * 6)
+EMPTY_MASK = array('B', [0])
 
-def create_parse_rec(adjacency_matrix: npt.NDArray,
+
+def compact_adjacency(adjacency_matrix: npt.NDArray) -> tuple[array, array]:
+    """
+    convert an adjacency matrix to the neighbor slots and face masks of its nodes.
+
+    Args:
+        adjacency_matrix: the matrix where the value at [i, j] is the face of the cube i touching the cube j
+
+    Returns: the 6 neighbor slots of every node in a flat array, and the faces of every node
+             touching another cube as 6 bit masks
+
+    """
+    size = len(adjacency_matrix)
+    neighbors = EMPTY_SLOTS * size
+    masks = EMPTY_MASK * size
+    for node in range(size):
+        for neighbor, face in enumerate(adjacency_matrix[node]):
+            if face != 0:
+                neighbors[6 * node + SLOTS[int(face)]] = neighbor
+                masks[node] |= int(face)
+    return neighbors, masks
+
+
+def create_parse_rec(polycube: PolyCube,
                      parse_list: list[any],
                      node: int,
                      backtrack: int,
@@ -17,7 +45,7 @@ def create_parse_rec(adjacency_matrix: npt.NDArray,
                      eq_list: dict[int, int]) -> int:
     traversed_node[node] = True
     adjacency_list = dict(
-        [(eq_list[adjacency], i) for (i, adjacency) in enumerate(adjacency_matrix[node]) if adjacency != 0]
+        [(eq_list[adjacency], i) for (adjacency, i) in polycube.neighbor_items(node)]
     )
     # error with the backtracking values
     for adjacency in sort_order:
@@ -27,7 +55,7 @@ def create_parse_rec(adjacency_matrix: npt.NDArray,
                 backtrack = 0
 
             parse_list.append(adjacency)
-            backtrack = create_parse_rec(adjacency_matrix, parse_list, adjacency_list[adjacency], backtrack,
+            backtrack = create_parse_rec(polycube, parse_list, adjacency_list[adjacency], backtrack,
                                          traversed_node, eq_list)
             backtrack += 1
     return backtrack
@@ -36,19 +64,64 @@ def create_parse_rec(adjacency_matrix: npt.NDArray,
 class PolyCube:
     """
     this is the class that represents the polycube.
-    it possesses an adjacency matrix, as well as a coo of all the positions of the cube inside the polycube
+    it possesses the neighbors of each cube in 6 slots and the mask of the faces of each cube touching
+    another one, as well as a coo of all the positions of the cube inside the polycube
     """
 
+    __slots__ = ("neighbors", "masks", "position_vector", "size", "cube_identity", "tag", "__parses",
+                 "__position_index", "__parent_index", "__adjacencies")
+
     def __init__(self, adjacency_matrix: npt.NDArray, position_vector: list):
-        self.adjacency_matrix = adjacency_matrix
-        self.position_vector = position_vector
-        self.size = np.shape(adjacency_matrix)[0]
-        self.__parses = []
+        neighbors, masks = compact_adjacency(adjacency_matrix)
+        self.__set_adjacencies(neighbors, masks, position_vector)
+
+    @classmethod
+    def from_adjacencies(cls, neighbors: array, masks: array, position_vector: list,
+                         parent_index: dict[tuple[int, int, int], int] = None) -> PolyCube:
+        """
+        create a polycube from the neighbor slots and face masks of its nodes, without an adjacency matrix.
 
-        neighbor_list = []
-        for cube in self.adjacency_matrix:
-            neighbor_list += [gu.get_number_of_neighbors(np.sum(cube))]
-        self.cube_identity = np.array(neighbor_list)
+        Args:
+            neighbors: the 6 neighbor slots of every node, see compact_adjacency
+            masks: the faces of every node touching another cube
+            position_vector: the positions of the cubes
+            parent_index: the position index of the polycube this one extends by its last cube, shared
+                          until the position index of this polycube is needed
+
+        Returns: the polycube
+        """
+        polycube = cls.__new__(cls)
+        polycube.__set_adjacencies(neighbors, masks, position_vector, parent_index)
+        return polycube
+
+    def __set_adjacencies(self, neighbors: array, masks: array, position_vector: list,
+                          parent_index: dict[tuple[int, int, int], int] = None) -> None:
+        self.neighbors = neighbors
+        self.masks = masks
+        self.position_vector = position_vector
+        self.size = len(masks)
+        self.__parses: dict[int, tuple[tuple, ...]] = {}
+        self.__position_index = None
+        self.__parent_index = parent_index
+        self.__adjacencies = None
+        self.cube_identity = tuple(bin(mask).count("1") for mask in masks)
+        self.tag = identity_to_tag(self.cube_identity)
+
+    @property
+    def position_index(self) -> dict[tuple[int, int, int], int]:
+        """
+        Returns: the node at each position of the polycube.
+                 it is only built when the polycube is expanded, most children being dropped as duplicates,
+                 and from the index of the parent when there is one
+        """
+        if self.__position_index is None:
+            if self.__parent_index is not None:
+                self.__position_index = dict(self.__parent_index)
+                self.__position_index[self.position_vector[-1]] = self.size - 1
+                self.__parent_index = None
+            else:
+                self.__position_index = {tuple(position): node for node, position in enumerate(self.position_vector)}
+        return self.__position_index
 
     def __repr__(self):
         # string = self.cube_identity.__repr__() + "\n"
@@ -66,13 +139,35 @@ class PolyCube:
 
         raise ValueError("no cube with such adjacency in the polygraph")
 
-    def get_adjacencies(self, node_index: int) -> dict[int, int]:
+    def __build_adjacencies(self) -> list[dict[int, int]]:
+        """
+        Returns: for every node, its neighbors by face, in increasing neighbor index.
+                 they are computed once, the first time the neighbors of the polycube are needed
+        """
+        adjacencies = []
+        neighbors = self.neighbors
+        for base in range(0, 6 * self.size, 6):
+            pairs = sorted((neighbors[base + slot], 1 << slot) for slot in range(6) if neighbors[base + slot] >= 0)
+            adjacencies.append({face: neighbor for neighbor, face in pairs})
+        self.__adjacencies = adjacencies
+        return adjacencies
+
+    def neighbor_items(self, node_index: int):
+        """
+        Returns: the (face, neighbor) pairs of a node, by increasing neighbor index
+        """
+        adjacencies = self.__adjacencies or self.__build_adjacencies()
+        return adjacencies[node_index].items()
 
-        print("get adjacencies: ", self.adjacency_matrix[node_index], node_index)
+    def get_adjacencies(self, node_index: int) -> dict[int, int]:
+        """
+        Returns: the neighbors of a node by face, shared between calls so they must not be modified
+        """
+        tracing.count("PolyCube.get_adjacencies")
+        tracing.debug("get adjacencies: {} {}", self.masks[node_index], node_index)
 
-        return dict(
-            [(adjacency, i) for (i, adjacency) in enumerate(self.adjacency_matrix[node_index]) if adjacency != 0]
-        )
+        adjacencies = self.__adjacencies or self.__build_adjacencies()
+        return adjacencies[node_index]
 
     def get_3D_representation(self) -> np.ndarray:
         vector = np.array(self.position_vector)
@@ -89,12 +184,12 @@ class PolyCube:
         return threed_tensor
 
     def get_parse_from_cube(self, cube: int, eq_list: dict[int, int] = []):
+        tracing.count("PolyCube.get_parse_from_cube")
         parse_list = []
         if not eq_list:
             eq_list = dict({1: 1, 2: 2, 4: 4, 8: 8, 16: 16, 32: 32})
-        create_parse_rec(self.adjacency_matrix, parse_list, cube, 0,
-                         [False for _ in range(len(self.adjacency_matrix))], eq_list)
-        print("using cube :", cube)
+        create_parse_rec(self, parse_list, cube, 0, [False for _ in range(self.size)], eq_list)
+        tracing.debug("using cube : {}", cube)
         return parse_list
 
     def get_parses(self, starter_nodes: int):
@@ -106,54 +201,64 @@ class PolyCube:
             starter_nodes:  the number of adjacent nodes (or connectivity)
                             of the nodes used in order to create the parse
 
-        Returns: a path inside the node starting from a polycube with starter_nodes neighbor
+        Returns: a path inside the node starting from a polycube with starter_nodes neighbor.
+                 the parses are computed once for each starter_nodes and returned as tuples, so they
+                 are shared without being copied
 
         """
 
-        if self.__parses:
-            returned_parses = copy.deepcopy(self.__parses)
-            return returned_parses
+        parses = self.__parses.get(starter_nodes)
+        if parses is not None:
+            return parses
 
         indexes = self.get_nodes_with_NAdjacencies(starter_nodes)
         if not indexes:
             raise AttributeError("starter node not present into the polycube")
 
+        parses = []
         for index in indexes:
             parse_list = []
-            create_parse_rec(self.adjacency_matrix, parse_list, index, 0,
-                             [False for _ in range(len(self.adjacency_matrix))],
+            create_parse_rec(self, parse_list, index, 0,
+                             [False for _ in range(self.size)],
                              dict(dict({1: 1, 2: 2, 4: 4, 8: 8, 16: 16, 32: 32})))
             if parse_list:
                 if isinstance(parse_list[len(parse_list) - 1], str):
                     parse_list.pop(len(parse_list) - 1)
-                if parse_list not in self.__parses:
-                    self.__parses += [copy.deepcopy(parse_list)]
+                if tuple(parse_list) not in parses:
+                    parses.append(tuple(parse_list))
 
-        returned_parses = copy.deepcopy(self.__parses)
-        return returned_parses
-
-    def __create_PCPO(self):
-        return np.pad(self.adjacency_matrix, (1, 1))[1:, 1:]
+        self.__parses[starter_nodes] = tuple(parses)
+        return self.__parses[starter_nodes]
 
     def iterate_through_All_PCPO(self):
         """
         from a polycube, we get all the PolyCube of size n Plus One (PCPO)
 
         Returns: an iterator of all the polycube of size n+1 that can be generated from the given polycube
+
+        every child gets its own copy of the neighbor slots, masks and positions of the polycube, as the
+        new cube also fills a slot of each cube it touches, which the polycube and the other children must
+        not see. the copies are flat copies of 6 slots, a mask and a position per cube, a few percent of
+        the time spent building a child, whose identity and tag already read every cube. the position
+        index is only copied from the one of the parent when a polycube is expanded, not per child.
         """
+        position_index = self.position_index
         for i in range(self.size):
-            available_space = 63 - np.sum(self.adjacency_matrix[i])
+            x, y, z = self.position_vector[i]
+            # the faces of the mask already touch a cube, so the new cube never overlaps one
+            available_space = 63 - self.masks[i]
             for position in gu.iterate_through(available_space):
-                new_adjacency_matrix = self.__create_PCPO()
-                new_adjacency_matrix[i, self.size] = position
-                new_adjacency_matrix[self.size, i] = gu.get_opposite(position)
-
-                new_position_vector = copy.deepcopy(self.position_vector)
-                new_position_vector += gu.get_position_from_adjacency(self.position_vector[i], position)
+                dx, dy, dz = gu.FACE_OFFSETS[SLOTS[position]]
+                new_position = (x + dx, y + dy, z + dz)
 
-                update_adjacency_matrix(new_adjacency_matrix, new_position_vector)
+                # the new cube is appended to copies with empty slots, and linked to its neighbors, cube i included
+                new_neighbors = self.neighbors + EMPTY_SLOTS
+                new_masks = self.masks + EMPTY_MASK
+                update_adjacencies(new_neighbors, new_masks, position_index, new_position)
 
-                yield PolyCube(new_adjacency_matrix, new_position_vector)
+                # the positions are immutable tuples, shared with the parent
+                yield PolyCube.from_adjacencies(new_neighbors, new_masks, self.position_vector + [new_position],
+                                                position_index)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,6 @@
 from __future__ import annotations
-import copy
 from collections import Counter
-import geometry_utils as gu
+import tracing
 from polycube import PolyCube
 from utils import has_equivalence, fill_eq_dict
 from geometry_utils import get_opposite
@@ -61,11 +60,12 @@ class Sorter:
 
     def add_polycube(self, polycube: PolyCube, polyparse: list[int]) -> bool:
         child = self
-        print(self)
-        print("adding polycube")
+        tracing.count("Sorter.add_polycube")
+        tracing.debug("{}", self)
+        tracing.debug("adding polycube")
 
         for _parse in polyparse:
-            print("parse: ", _parse)
+            tracing.debug("parse: {}", _parse)
             if isinstance(_parse, str):
                 child = child.__add_get_child(_parse)
             if isinstance(_parse, int):
@@ -99,50 +99,50 @@ class PolycubeSorter:
     def __is_inside_rec(self, sorter: Sorter, polycube: PolyCube, current_node: int, traversed_list: list[bool],
                         current_parse: list, eq_list: dict[int, int],
                         final_eq_list: dict[int, int], depth: int = 0, max_depth: int = 0) -> tuple[bool, int]:
-        print()
-        print("######################################################")
+        tracing.count("PolycubeSorter.is_inside_rec")
+        tracing.debug("\n######################################################")
         sort_order = [1, 2, 4, 8, 16, 32]
         traversed_list[current_node] = True
         adjacencies = polycube.get_adjacencies(current_node)
-        print(current_node, adjacencies, eq_list)
-        print("trace :" + sorter.show_path())
-        print("current parse : ", current_parse)
-        print(f"current node : {current_node}")
-        print("traversed_list: ", traversed_list)
+        tracing.debug("{} {} {}", current_node, adjacencies, eq_list)
+        tracing.debug("trace :{}", sorter.show_path)
+        tracing.debug("current parse : {}", current_parse)
+        tracing.debug("current node : {}", current_node)
+        tracing.debug("traversed_list: {}", traversed_list)
 
         is_inside = False
 
-        print(depth, max_depth)
+        tracing.debug("{} {}", depth, max_depth)
         if depth > max_depth:
             for key, value in eq_list.items():
                 final_eq_list[key] = value
             max_depth = depth
-            print("max_depth, final_eq_list", max_depth, final_eq_list)
+            tracing.debug("max_depth, final_eq_list {} {}", max_depth, final_eq_list)
 
         if all(traversed_list):
-            print("traversed all")
-            print(self.sorter.show_path())
+            tracing.debug("traversed all")
+            tracing.debug("{}", self.sorter.show_path)
             return True, max_depth
 
         # if this is true, it means that we have explored all the possible adjacent cube
         # and that we need to backtrack in order to continue exploring the polycube.
         is_neighbor_traversed = [traversed_list[traversed] for traversed in adjacencies.values()]
         if is_neighbor_traversed and all(is_neighbor_traversed):
-            print(adjacencies.items())
-            print(traversed_list)
-            print("backtracking")
+            tracing.debug("{}", adjacencies.items)
+            tracing.debug("{}", traversed_list)
+            tracing.debug("backtracking")
             for child in sorter.children.items():
-                print(child)
+                tracing.debug("{}", child)
                 if isinstance(child[0], str):
                     # check that the backtracking is correct: that is, that we effectively need to backtrack the
                     # right amount of cubes in order to get the first cube with a connection to an unexplored cube
                     backtrack: int = int(child[0].split(':')[1])
                     backtrack_node: int = current_node
                     backtracks_rec: int = 0
-                    print(f"backtrack_node: {backtrack_node} ", backtrack)
+                    tracing.debug("backtrack_node: {} {}", backtrack_node, backtrack)
                     for i in range(len(current_parse) - 1, len(current_parse) - 1 - backtrack, -1):
                         index = i - backtracks_rec
-                        print("current parse, parse[index]: ", current_parse, current_parse[index])
+                        tracing.debug("current parse, parse[index]: {} {}", current_parse, current_parse[index])
 
                         # possible error in this part of the code:
                         # we have to check that we
@@ -151,17 +151,17 @@ class PolycubeSorter:
                             backtracks_rec += int(current_parse[index].split(':')[1])
                             index = i - backtracks_rec
 
-                        print("test", backtrack_node, current_parse[index])
+                        tracing.debug("test {} {}", backtrack_node, current_parse[index])
 
                         adjacency = 0
                         for key, value in eq_list.items():
                             if value == get_opposite(current_parse[index]):
                                 adjacency = key
                         backtrack_node = polycube.get_adjacent_node(backtrack_node, adjacency)
-                        print(f"backtrack_node: {backtrack_node}")
+                        tracing.debug("backtrack_node: {}", backtrack_node)
 
-                    new_traversed_list = copy.deepcopy(traversed_list)
-                    print("current parse: ", current_parse, current_parse[-1])
+                    new_traversed_list = list(traversed_list)
+                    tracing.debug("current parse: {} {}", current_parse, current_parse[-1])
                     if isinstance(current_parse[-1], str):
                         parse: str = current_parse.pop(len(current_parse) - 1)
                         parse = f"BT:{int(parse.split(':')[0]) + backtrack}"
@@ -170,16 +170,16 @@ class PolycubeSorter:
                         current_parse.append(child[0])
                     is_inside_rec, max_depth = self.__is_inside_rec(child[1], polycube, backtrack_node,
                                                                     new_traversed_list,
-                                                                    copy.deepcopy(current_parse), eq_list,
+                                                                    list(current_parse), eq_list,
                                                                     final_eq_list, (depth + 1), max_depth)
                     is_inside |= is_inside_rec
-                    print("is inside: ", is_inside)
+                    tracing.debug("is inside: {}", is_inside)
                     if is_inside:
                         return is_inside, max_depth
 
         # else we can still continue exploring without backtracking and thus we continue.
         else:
-            print("continuing forward")
+            tracing.debug("continuing forward")
             # in this case we have to check depending on the equivalence list if there is the next connection
             # corresponding to the sort order and if it is not, it means that there is no correspondence
             # between all the polycube derived from that branch and thus the search can be stopped.
@@ -188,9 +188,9 @@ class PolycubeSorter:
             # then we update the equivalence list and continue inside
             possible_child = set([])
 
-            print("trying children :")
-            print(sorter.children)
-            print(polycube.get_adjacencies(current_node).items())
+            tracing.debug("trying children :")
+            tracing.debug("{}", sorter.children)
+            tracing.debug("{}", adjacencies.items)
             for key, value in sorter.children.items():
                 if isinstance(key, int):
                     for adja in polycube.get_adjacencies(current_node).items():
@@ -201,7 +201,7 @@ class PolycubeSorter:
                         else:
                             possible_child.add(key)
 
-            print("possible child : ", possible_child)
+            tracing.debug("possible child : {}", possible_child)
             if not possible_child:
                 return False, max_depth
 
@@ -210,56 +210,55 @@ class PolycubeSorter:
             can_create_equivalence = True
             minimum_sorter: int = min(possible_child)
             for adja in polycube.get_adjacencies(current_node).items():
-                print(adja, eq_list[adja[0]], minimum_sorter, traversed_list[adja[1]])
+                tracing.debug("{} {} {} {}", adja, eq_list[adja[0]], minimum_sorter, traversed_list[adja[1]])
                 if eq_list[adja[0]] != 0 and not traversed_list[adja[1]] \
                         and eq_list[adja[0]] == minimum_sorter:
                     current_parse += [minimum_sorter]
                     new_node = polycube.get_adjacent_node(node=current_node, adjacency=adja[0])
-                    new_traversed_list = copy.deepcopy(traversed_list)
-                    print(minimum_sorter)
+                    new_traversed_list = list(traversed_list)
+                    tracing.debug("{}", minimum_sorter)
                     is_inside_rec, max_depth = self.__is_inside_rec(sorter.children[minimum_sorter], polycube, new_node,
-                                                                    new_traversed_list, copy.deepcopy(current_parse),
+                                                                    new_traversed_list, list(current_parse),
                                                                     eq_list,
                                                                     final_eq_list, (depth + 1), max_depth)
                     is_inside |= is_inside_rec
-                    print(is_inside)
+                    tracing.debug("{}", is_inside)
                     if is_inside:
                         return is_inside, max_depth
                     current_parse.pop()
                     break
                 else:
-                    print("no equivalence :", eq_list[adja[0]], minimum_sorter,
-                          "traversed: ", traversed_list[adja[1]])
+                    tracing.debug("no equivalence : {} {} traversed: {}", eq_list[adja[0]], minimum_sorter,
+                                  traversed_list[adja[1]])
 
             if can_create_equivalence:
-                print("can create equivalence")
+                tracing.debug("can create equivalence")
                 possible_connection_equivalences = dict([adja for adja in polycube.get_adjacencies(current_node).items()
                                                          if eq_list[adja[0]] == 0 and not traversed_list[adja[1]]])
                 for connection in possible_connection_equivalences.keys():
-                    new_eq_list = copy.deepcopy(eq_list)
-                    print("new eq list : ", new_eq_list)
+                    new_eq_list = dict(eq_list)
+                    tracing.debug("new eq list : {}", new_eq_list)
                     for child in possible_child:
-                        print("connection, child: ", connection, child)
+                        tracing.debug("connection, child: {} {}", connection, child)
                         if has_equivalence(connection, child, new_eq_list):
-                            print("new eq list : ", new_eq_list)
+                            tracing.debug("new eq list : {}", new_eq_list)
                             new_node = possible_connection_equivalences[connection]
                             current_parse += [child]
-                            new_traversed_list = copy.deepcopy(traversed_list)
+                            new_traversed_list = list(traversed_list)
                             is_inside_rec, max_depth = self.__is_inside_rec(sorter.children[child], polycube,
                                                                             new_node,
                                                                             new_traversed_list,
-                                                                            copy.deepcopy(current_parse),
+                                                                            list(current_parse),
                                                                             new_eq_list, final_eq_list, (depth + 1),
                                                                             max_depth)
                             is_inside |= is_inside_rec
                             if is_inside:
                                 return is_inside, max_depth
                             current_parse.pop()
-                            print("returned from adding eq " + f"{is_inside}")
-                            print()
+                            tracing.debug("returned from adding eq {}\n", is_inside)
 
-        print("finished looking")
-        print("max_depth, final_eq_list", max_depth, final_eq_list)
+        tracing.debug("finished looking")
+        tracing.debug("max_depth, final_eq_list {} {}", max_depth, final_eq_list)
         return is_inside, max_depth
 
     def try_add_polycube(self, polycube: PolyCube) -> bool:
@@ -274,6 +273,7 @@ class PolycubeSorter:
 
         """
 
+        tracing.count("PolycubeSorter.try_add_polycube")
         if self.starter_node < 0:
             counter: dict[int, int] = Counter(polycube.cube_identity)
             # here the starter node is represented by the amount of connections it has
@@ -294,25 +294,25 @@ class PolycubeSorter:
             max_depth = 0
             final_cube = -1
 
-            print("\n\n\n\n\n\n\n")
-            print(self.starter_node)
-            print(self.sorter)
+            tracing.debug("\n\n\n\n\n\n\n")
+            tracing.debug("{}", self.starter_node)
+            tracing.debug("{}", self.sorter)
             for cube in polycube.get_nodes_with_NAdjacencies(self.starter_node):
                 old_max_depth = max_depth
                 new_eq_list: dict[int, int] = dict({1: 0, 2: 0, 4: 0, 8: 0, 16: 0, 32: 0})
 
-                print(polycube)
+                tracing.debug("{}", polycube)
                 is_inside, max_depth = self.__is_inside_rec(self.sorter, polycube, cube,
-                                                            [False for _ in range(len(polycube.adjacency_matrix))],
+                                                            [False for _ in range(polycube.size)],
                                                             [], equivalence_list, new_eq_list, max_depth=max_depth)
                 if is_inside:
                     can_be_added = False
-                    print("!!!!!!!!!!!!!!!!!!!  CANNOT BE ADDED !!!!!!!!!!!!!!!!!!!!!!!!")
-                    print(new_eq_list, is_inside)
+                    tracing.debug("!!!!!!!!!!!!!!!!!!!  CANNOT BE ADDED !!!!!!!!!!!!!!!!!!!!!!!!")
+                    tracing.debug("{} {}", new_eq_list, is_inside)
                     return False
 
-                print("old max_depth, max_depth: ", old_max_depth, max_depth)
-                print("final eq_list, new eq_list: ", final_eq_list, new_eq_list)
+                tracing.debug("old max_depth, max_depth: {} {}", old_max_depth, max_depth)
+                tracing.debug("final eq_list, new eq_list: {} {}", final_eq_list, new_eq_list)
                 if old_max_depth < max_depth:
                     for key, value in new_eq_list.items():
                         final_eq_list[key] = value
@@ -324,7 +324,7 @@ class PolycubeSorter:
             if can_be_added:
                 fill_eq_dict(eq_dict=final_eq_list)
                 parse = polycube.get_parse_from_cube(final_cube, eq_list=final_eq_list)
-                print("final eq_list : ", final_eq_list)
+                tracing.debug("final eq_list : {}", final_eq_list)
                 is_added = self.sorter.add_polycube(polycube, parse)
                 if is_added is False:
                     return False
@@ -0,0 +1,94 @@
+from __future__ import annotations
+import sys
+from collections import Counter
+from typing import TextIO
+
+# the levels of the trace messages, a message is written if its level is at least the current level
+DEBUG = 10
+INFO = 20
+OFF = 100
+
+LEVELS = {"debug": DEBUG, "info": INFO, "off": OFF}
+
+level: int = OFF
+output: TextIO = sys.stdout
+counting: bool = False
+counters: Counter[str] = Counter()
+
+
+def set_level(new_level: int | str, new_output: TextIO = None) -> None:
+    """
+    set the level of the messages written, tracing being off by default.
+
+    Args:
+        new_level: DEBUG, INFO or OFF, or the name of one of them
+        new_output: the file the messages are written to, the standard output if not given
+    """
+    global level, output
+    level = LEVELS[new_level.lower()] if isinstance(new_level, str) else new_level
+    output = new_output if new_output is not None else sys.stdout
+
+
+def set_counting(enabled: bool) -> None:
+    """
+    turn the per function call counters on or off, they are off by default.
+
+    Args:
+        enabled: whether calls are counted
+    """
+    global counting
+    counting = enabled
+
+
+def enabled(message_level: int) -> bool:
+    return message_level >= level
+
+
+def trace(message_level: int, message: str, *args) -> None:
+    """
+    write a message if its level is enabled.
+    the message is only formatted when written, with str.format and the args.
+    an argument that is callable is called first, so costly values such as
+    the path of a sorter are only computed when written.
+
+    Args:
+        message_level: the level of the message
+        message: the message, with {} placeholders for the args
+        *args: the values of the placeholders, or callables returning them
+    """
+    if message_level < level:
+        return
+    values = [arg() if callable(arg) else arg for arg in args]
+    print(message.format(*values), file=output)
+
+
+def debug(message: str, *args) -> None:
+    if DEBUG >= level:
+        trace(DEBUG, message, *args)
+
+
+def info(message: str, *args) -> None:
+    if INFO >= level:
+        trace(INFO, message, *args)
+
+
+def count(name: str) -> None:
+    """
+    count a call of a function, if counting is on.
+
+    Args:
+        name: the name of the function
+    """
+    if counting:
+        counters[name] += 1
+
+
+def reset_counters() -> None:
+    counters.clear()
+
+
+def report() -> str:
+    """
+    Returns: the calls counted for every function, the most called first
+    """
+    return "\n".join(f"{name}: {calls}" for name, calls in counters.most_common())
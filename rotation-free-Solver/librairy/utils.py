@@ -3,9 +3,9 @@ import copy
 import numpy as np
 import geometry_utils as gu
 import numpy.typing as npt
-from collections import Counter
 import math
 import matplotlib.pyplot as plt
+import tracing
 
 
 def has_equivalence(connection: int, _parse: int, eq_list: dict):
@@ -24,7 +24,8 @@ def has_equivalence(connection: int, _parse: int, eq_list: dict):
     Returns: true if there is an equivalence, false otherwise.
 
     """
-    print("has equivalence: ", connection, _parse)
+    tracing.count("has_equivalence")
+    tracing.debug("has equivalence: {} {}", connection, _parse)
     if _parse in eq_list.values() and (eq_list[connection] != _parse):
         return False
 
@@ -36,9 +37,15 @@ def has_equivalence(connection: int, _parse: int, eq_list: dict):
     return eq_list[connection] == _parse
 
 
-def identity_to_tag(identity: npt.NDArray):
+# the number of bits of the tag holding the number of cubes with each connectivity
+TAG_BITS = 16
+
+
+def identity_to_tag(identity: npt.NDArray) -> int:
     """
-    from the identity of a polycube, return its associated tag
+    from the identity of a polycube, return its associated tag.
+    the tag packs the number of cubes with each connectivity in TAG_BITS bits, the
+    cubes with no neighbor in the lowest bits, so it can key a dict without building a string
 
     Args:
         identity: the identity of a polycube
@@ -46,50 +53,64 @@ def identity_to_tag(identity: npt.NDArray):
     Returns: a tag
 
     """
-    tag = ""
-    values = dict(Counter(identity))
+    tag = 0
+    for connectivity in identity:
+        tag += 1 << (TAG_BITS * connectivity)
+
+    return tag
+
+
+def tag_to_string(tag: int) -> str:
+    """
+    from a tag, return a readable name such as H2_2C2, with the number of cubes
+    with each connectivity, H standing for the cubes with one neighbor
+
+    Args:
+        tag: the tag of a polycube
 
+    Returns: the name of the tag
+
+    """
+    string = ""
+    mask = (1 << TAG_BITS) - 1
     for connectivity in range(7):
-        occurrences = values.get(connectivity)
-        if occurrences is not None:
+        occurrences = (tag >> (TAG_BITS * connectivity)) & mask
+        if occurrences:
             if connectivity == 0:
-                tag = "C0"
+                string = "C0"
             elif connectivity == 1:
-                tag += f"H{occurrences}"
+                string += f"H{occurrences}"
             else:
-                tag += f"_{occurrences}C{connectivity}"
+                string += f"_{occurrences}C{connectivity}"
 
-    return tag
+    return string
 
 
-def update_adjacency_matrix(adjacency_matrix, position_vector) -> None:
+def update_adjacencies(neighbors, masks, position_index: dict[tuple[int, int, int], int],
+                       position: tuple[int, int, int]) -> None:
     """
-    this function is used after appending a value to the adjacency matrix to check for
-    any collision with another cube from the polycube
+    this function is used after appending a cube to the polycube to link it to
+    every other cube of the polycube it touches.
+    each of the 6 neighboring positions is looked up in the position index of the
+    polycube, instead of comparing the new cube with every cube.
 
 
     Args:
-        adjacency_matrix: the adjacency matrix from the polycube
-        position_vector: the position vector of the polycube
+        neighbors: the 6 neighbor slots of every node of the polycube, see polycube.compact_adjacency
+        masks: the faces of every node of the polycube touching another cube
+        position_index: the node at each position of the polycube, before the cube was appended
+        position: the position of the appended cube
     """
-    size = len(position_vector)
-    adjacent_position = [
-        tuple(np.array(position_vector)[-1] + np.array((0, 1, 0))),
-        tuple(np.array(position_vector)[-1] + np.array((0, -1, 0))),
-        tuple(np.array(position_vector)[-1] + np.array((1, 0, 0))),
-        tuple(np.array(position_vector)[-1] + np.array((-1, 0, 0))),
-        tuple(np.array(position_vector)[-1] + np.array((0, 0, 1))),
-        tuple(np.array(position_vector)[-1] + np.array((0, 0, -1)))
-    ]
-
-    for i, cube in enumerate(position_vector):
-        if i == len(position_vector) - 1:
-            pass
-
-        if tuple(cube) in adjacent_position:
-            adj = gu.get_adjacency_from_positions(cube, position_vector[-1])
-            adjacency_matrix[i, size - 1] = gu.get_opposite(adj)
-            adjacency_matrix[size - 1, i] = adj
+    new_node = len(masks) - 1
+    x, y, z = position
+    for slot, (dx, dy, dz) in enumerate(gu.FACE_OFFSETS):
+        neighbor = position_index.get((x + dx, y + dy, z + dz))
+        if neighbor is not None:
+            opposite = (slot + 3) % 6
+            neighbors[6 * new_node + slot] = neighbor
+            masks[new_node] |= 1 << slot
+            neighbors[6 * neighbor + opposite] = new_node
+            masks[neighbor] |= 1 << opposite
 
 
 def fill_eq_dict(eq_dict: dict[int, int]):
@@ -1,4 +1,16 @@
+from . import test_bitboard
 from . import test_cache
+from . import test_canonical
+from . import test_checkpoint
+from . import test_dedup
+from . import test_distribute
+from . import test_enumeration
+from . import test_invariants
+from . import test_kernels
+from . import test_memory
+from . import test_metrics
 from . import test_packing
+from . import test_parallel
 from . import test_resizing
-from . import test_rotation
\ No newline at end of file
+from . import test_rotation
+from . import test_symmetry
\ No newline at end of file
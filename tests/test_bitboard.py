@@ -0,0 +1,40 @@
+import unittest
+import numpy as np
+from libraries import bitboard
+from libraries.canonical import CanonicalStats, canonical_children, canonical_ids
+from libraries.packing import pack
+from libraries.resizing import expand_cube
+from numpy.testing import assert_array_equal
+from .utils import get_test_data
+
+class BitboardTests(unittest.TestCase):
+    def test_pack_matches(self):
+        test_data = get_test_data()
+        for polycube in test_data:
+            board = bitboard.from_array(polycube)
+            self.assertEqual(bitboard.pack(board), pack(polycube))
+            self.assertEqual(bitboard.unpack(pack(polycube)), board)
+            assert_array_equal(bitboard.to_array(board), polycube)
+
+    def test_expand_matches(self):
+        test_data = get_test_data()
+        for polycube in test_data:
+            expected = [pack(new_cube) for new_cube in expand_cube(polycube)]
+            expanded = [bitboard.pack(new_cube) for new_cube in bitboard.expand_cube(bitboard.from_array(polycube))]
+            self.assertEqual(expanded, expected, f"bitboard expansion of polycube {polycube} differs")
+
+    def test_canonical_id_matches(self):
+        test_data = get_test_data()
+        for reflections in [False, True]:
+            for polycube in test_data:
+                expected = canonical_ids(polycube[np.newaxis], reflections=reflections).tolist()[0]
+                self.assertEqual(bitboard.canonical_id(bitboard.from_array(polycube), reflections=reflections), expected)
+
+    def test_canonical_children_matches(self):
+        test_data = get_test_data()
+        stats, bitboard_stats = CanonicalStats(), CanonicalStats()
+        expected = set(cube_id for cube_ids in canonical_children(test_data, stats) for cube_id in cube_ids.tolist())
+        found = set(cube_id for cube_ids in bitboard.canonical_children(test_data, bitboard_stats)
+                    for cube_id in cube_ids.tolist())
+        self.assertEqual(found, expected)
+        self.assertEqual((bitboard_stats.checked, bitboard_stats.skipped), (stats.checked, stats.skipped))
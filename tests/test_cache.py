@@ -1,6 +1,11 @@
 import unittest
+from unittest import mock
 import os
-from libraries.cache import get_cache, save_cache
+import shutil
+import numpy as np
+from libraries.cache import get_cache, save_cache, save_cache_raw, iter_cache, convert_cache, cache_exists, PackedCache, \
+    CacheManager
+from libraries.packing import pack
 from numpy.testing import assert_array_equal
 from .utils import get_test_data
 
@@ -12,11 +17,152 @@ class CachingTests(unittest.TestCase):
         save_cache("test_temp", test_data)
         reloaded_data = get_cache("test_temp")
         
-        for test, reloaded in zip(test_data, reloaded_data):
+        # the packed cache groups polycubes by shape, so the order isnt kept
+        self.assertEqual(len(test_data), len(reloaded_data))
+        for test, reloaded in zip(sorted(test_data, key=pack), sorted(reloaded_data, key=pack)):
             assert_array_equal(test, reloaded)
 
+    def test_cache_streaming(self):
+        test_data = get_test_data()
+
+        save_cache("test_temp", test_data)
+        chunks = list(iter_cache("test_temp", chunk_size=4))
+
+        self.assertTrue(all(len(chunk) <= 4 for chunk in chunks))
+        self.assertTrue(all(chunk.ndim == 4 for chunk in chunks))
+        self.assertEqual(sum(len(chunk) for chunk in chunks), len(test_data))
+        self.assertEqual(set(pack(test) for test in test_data), set(pack(cube) for chunk in chunks for cube in chunk))
+
+    def test_cache_records(self):
+        test_data = get_test_data()
+
+        save_cache("test_temp", test_data)
+        cache = PackedCache("cubes_test_temp.pcubes")
+
+        self.assertEqual(len(cache), len(test_data))
+        records = [row.tobytes() for chunk in cache.iter_records() for row in chunk]
+        self.assertEqual(sorted(records), sorted(pack(test) for test in test_data))
+
+    def test_cache_conversion(self):
+        test_data = get_test_data()
+
+        save_cache_raw("cubes_test_legacy.npy", test_data)
+        legacy_data = get_cache("test_legacy")
+        for test, legacy in zip(test_data, legacy_data):
+            assert_array_equal(test, legacy)
+
+        convert_cache("test_legacy")
+        self.assertTrue(os.path.exists("cubes_test_legacy.pcubes"))
+        self.assertTrue(cache_exists("test_legacy"))
+        converted = [cube for chunk in iter_cache("test_legacy") for cube in chunk]
+        self.assertEqual(set(pack(test) for test in test_data), set(pack(cube) for cube in converted))
+
+    def test_legacy_cache_converted_once(self):
+        test_data = get_test_data()
+        manager = CacheManager("test_cache_dir")
+        os.makedirs("test_cache_dir", exist_ok=True)
+
+        save_cache_raw(manager.legacy_path("test_legacy_used"), test_data)
+        self.assertEqual(manager.verify("test_legacy_used", expected_count=len(test_data)), [])
+        self.assertTrue(os.path.exists(manager.path("test_legacy_used")))
+        self.assertTrue(os.path.exists(manager.path("test_legacy_used") + ".verified"))
+        with mock.patch("libraries.cache.get_cache_raw", side_effect=AssertionError("unpickled again")):
+            self.assertTrue(manager.exists("test_legacy_used"))
+            self.assertEqual(manager.count("test_legacy_used"), len(test_data))
+            self.assertEqual(sum(len(chunk) for chunk in manager.iter("test_legacy_used")), len(test_data))
+
+    def test_compressed_cache(self):
+        test_data = get_test_data()
+        manager = CacheManager("test_cache_dir", compress=True)
+
+        manager.save("test_compressed", test_data)
+        cache = PackedCache(manager.path("test_compressed"))
+        self.assertTrue(cache.compressed)
+        self.assertEqual(cache.verify(), [])
+        self.assertEqual(set(pack(test) for test in test_data),
+                         set(pack(cube) for chunk in manager.iter("test_compressed", chunk_size=3) for cube in chunk))
+
+        # a range of polycubes is the same whether it is read from a compressed cache or not
+        CacheManager("test_cache_dir").save("test_uncompressed", test_data)
+        uncompressed = PackedCache(CacheManager("test_cache_dir").path("test_uncompressed"))
+        for start, stop in [(0, 5), (3, 17), (10, len(test_data))]:
+            compressed_range = [pack(cube) for chunk in cache.iter_polycubes(4, start, stop) for cube in chunk]
+            uncompressed_range = [pack(cube) for chunk in uncompressed.iter_polycubes(4, start, stop) for cube in chunk]
+            self.assertEqual(compressed_range, uncompressed_range)
+
+    def test_cache_verification(self):
+        test_data = get_test_data()
+        manager = CacheManager("test_cache_dir")
+
+        manager.save("test_verified", test_data)
+        self.assertEqual(manager.verify("test_verified"), [])
+        self.assertNotEqual(manager.verify("test_verified", expected_count=len(test_data) + 1), [])
+
+        with open(manager.path("test_verified"), "r+b") as cache_file:
+            cache_file.seek(-1, os.SEEK_END)
+            last = cache_file.read(1)
+            cache_file.seek(-1, os.SEEK_END)
+            cache_file.write(bytes([last[0] ^ 1]))
+        self.assertNotEqual(manager.verify("test_verified"), [])
+        self.assertFalse(manager.exists("test_verified"))
+
+        manager.save("test_verified", test_data)
+        with open(manager.path("test_verified"), "r+b") as cache_file:
+            cache_file.truncate(os.path.getsize(manager.path("test_verified")) - 1)
+        self.assertNotEqual(manager.verify("test_verified"), [])
+
+    def test_writer_clears_stale_spool(self):
+        test_data = get_test_data()
+        manager = CacheManager("test_cache_dir")
+
+        # the spool of a killed run, holding ids of the first shape
+        cube_id = pack(test_data[0])
+        os.makedirs(manager.path("test_stale") + ".tmp", exist_ok=True)
+        with open(os.path.join(manager.path("test_stale") + ".tmp", cube_id[:3].hex()), "wb") as spool:
+            spool.write(cube_id * 2)
+
+        manager.save("test_stale", test_data)
+        self.assertEqual(manager.verify("test_stale", expected_count=len(test_data)), [])
+
+    def test_verification_is_recorded(self):
+        test_data = get_test_data()
+        manager = CacheManager("test_cache_dir")
+
+        manager.save("test_recorded", test_data)
+        self.assertEqual(manager.verify("test_recorded"), [])
+        self.assertTrue(os.path.exists(manager.path("test_recorded") + ".verified"))
+
+        # a new manager, as in a later run, trusts the record instead of reading the cache again
+        with mock.patch.object(PackedCache, "verify", side_effect=AssertionError("read through")):
+            self.assertEqual(CacheManager("test_cache_dir").verify("test_recorded"), [])
+        with mock.patch.object(PackedCache, "verify", return_value=["corrupted"]):
+            self.assertEqual(CacheManager("test_cache_dir").verify("test_recorded", recheck=True), ["corrupted"])
+
+        # rewriting the cache invalidates the record
+        os.utime(manager.path("test_recorded"), ns=(0, 0))
+        with mock.patch.object(PackedCache, "verify", return_value=["corrupted"]):
+            self.assertEqual(CacheManager("test_cache_dir").verify("test_recorded"), ["corrupted"])
+
+        manager.remove("test_recorded")
+        self.assertFalse(os.path.exists(manager.path("test_recorded") + ".verified"))
+
+    def test_nearest_cache(self):
+        test_data = get_test_data()
+        manager = CacheManager("test_cache_dir")
+
+        for level in [3, 5]:
+            manager.save(f"test_level_{level}", test_data)
+        name = lambda level: f"test_level_{level}"
+        self.assertEqual(manager.nearest(7, name), 5)
+        self.assertEqual(manager.nearest(4, name), 3)
+        self.assertIsNone(manager.nearest(2, name))
+        self.assertEqual(manager.nearest(7, name, known_counts={5: len(test_data) + 1}), 3)
+
     @classmethod
     def tearDownClass(cls):
-        expected_test_file_name = "cubes_test_temp.npy"
-        if os.path.exists(expected_test_file_name):
-            os.remove(expected_test_file_name)
\ No newline at end of file
+        shutil.rmtree("test_cache_dir", ignore_errors=True)
+        for expected_test_file_name in ["cubes_test_temp.npy", "cubes_test_temp.pcubes",
+                                        "cubes_test_temp.pcubes.verified", "cubes_test_legacy.npy",
+                                        "cubes_test_legacy.pcubes", "cubes_test_legacy.pcubes.verified"]:
+            if os.path.exists(expected_test_file_name):
+                os.remove(expected_test_file_name)
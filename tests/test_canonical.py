@@ -0,0 +1,60 @@
+import unittest
+import numpy as np
+from libraries.canonical import CanonicalStats, canonical_ids, canonical_children, canonical_symmetries
+from libraries.packing import pack
+from libraries.resizing import expand_cube
+from libraries.rotation import all_rotations, all_symmetries
+from .utils import get_test_data
+
+class CanonicalTests(unittest.TestCase):
+    def test_canonical_matches_max_rotation(self):
+        test_data = get_test_data()
+        for polycube in test_data:
+            expected = max(pack(rotation) for rotation in all_rotations(polycube))
+            cube_id = canonical_ids(polycube[np.newaxis]).tolist()[0]
+            self.assertEqual(cube_id, expected, f"canonical id of polycube {polycube} isnt its largest rotation")
+
+    def test_canonical_rotation_invariant(self):
+        test_data = get_test_data()
+        for polycube in test_data:
+            for rotation in all_rotations(polycube):
+                rotations = np.stack([r for r in all_rotations(rotation) if r.shape == rotation.shape])
+                self.assertEqual(len(set(canonical_ids(rotations).tolist())), 1, "rotations of a polycube have different canonical ids")
+
+    def test_canonical_children_count(self):
+        test_data = get_test_data()
+        known_ids = set()
+        for cube_ids in canonical_children(test_data):
+            known_ids.update(cube_ids.tolist())
+        expected = set()
+        for polycube in test_data:
+            for new_cube in expand_cube(polycube):
+                expected.add(max(pack(rotation) for rotation in all_rotations(new_cube)))
+        self.assertEqual(known_ids, expected)
+        self.assertEqual(len(known_ids), 166)
+
+    def test_canonical_stats(self):
+        test_data = get_test_data()
+        stats = CanonicalStats()
+        for polycube in test_data:
+            canonical_ids(polycube[np.newaxis], stats)
+        self.assertEqual(stats.checked + stats.skipped, 24 * len(test_data))
+        self.assertGreater(stats.skipped, 0)
+
+    def test_reflected_canonical_matches_max_symmetry(self):
+        test_data = get_test_data()
+        for polycube in test_data:
+            expected = max(pack(symmetry) for symmetry in all_symmetries(polycube))
+            self.assertEqual(canonical_ids(polycube[np.newaxis], reflections=True).tolist()[0], expected)
+            mirror = np.ascontiguousarray(np.flip(polycube, axis=0))
+            self.assertEqual(canonical_ids(mirror[np.newaxis], reflections=True).tolist()[0], expected,
+                             "a polycube and its mirror image have different free ids")
+
+    def test_canonical_symmetries_group_order(self):
+        test_data = get_test_data()
+        for polycube in test_data:
+            _, orders, rotation_orders = canonical_symmetries(polycube[np.newaxis])
+            expected = sum(np.array_equal(symmetry, polycube) for symmetry in all_symmetries(polycube))
+            expected_rotations = sum(np.array_equal(rotation, polycube) for rotation in all_rotations(polycube))
+            self.assertEqual(orders[0], expected)
+            self.assertEqual(rotation_orders[0], expected_rotations)
@@ -0,0 +1,83 @@
+import shutil
+import tempfile
+import unittest
+from libraries.canonical import canonical_children
+from libraries.checkpoint import Checkpoint, chunked
+from libraries.parallel import generate_ids_parallel
+from .utils import get_test_data
+
+class CheckpointTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.test_data = list(get_test_data())
+        self.expected = set()
+        for cube_ids in canonical_children(self.test_data):
+            self.expected.update(cube_ids.tolist())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def interrupted_run(self, parents):
+        checkpoint = Checkpoint(6, interval=0, directory=self.directory)
+        known_ids = set()
+        for start in range(0, parents, 10):
+            batch = self.test_data[start:start + 10]
+            batch_ids = set()
+            for cube_ids in canonical_children(batch):
+                batch_ids.update(cube_ids.tolist())
+            batch_ids -= known_ids
+            known_ids.update(batch_ids)
+            checkpoint.advance(batch, batch_ids)
+        return known_ids
+
+    def test_resume_matches_full(self):
+        known_ids = self.interrupted_run(20)
+        checkpoint = Checkpoint(6, directory=self.directory)
+        self.assertTrue(checkpoint.exists())
+        resumed_ids = set(checkpoint.load())
+        self.assertEqual(resumed_ids, known_ids)
+        self.assertEqual(checkpoint.next_parent, 20)
+
+        parents = iter(self.test_data)
+        checkpoint.skip(parents)
+        for cube_ids in canonical_children(list(parents)):
+            resumed_ids.update(cube_ids.tolist())
+        self.assertEqual(resumed_ids, self.expected)
+
+    def test_resume_parallel(self):
+        self.interrupted_run(20)
+        checkpoint = Checkpoint(6, directory=self.directory)
+        resumed_ids = checkpoint.load()
+        checkpoint.skip(iter(self.test_data))
+        known_ids = generate_ids_parallel(self.test_data, workers=2, batch_size=7,
+                                          checkpoint=checkpoint, resumed_ids=resumed_ids)
+        self.assertEqual(set(known_ids), self.expected)
+        self.assertEqual(checkpoint.next_parent, len(self.test_data))
+
+    def test_load_truncates_partial_save(self):
+        known_ids = self.interrupted_run(20)
+        with open(Checkpoint(6, directory=self.directory).ids_path, "ab") as ids_file:
+            ids_file.write(b"\x02\x01\x01")
+        self.assertEqual(set(Checkpoint(6, directory=self.directory).load()), known_ids)
+
+    def test_skip_checks_order(self):
+        self.interrupted_run(20)
+        checkpoint = Checkpoint(6, directory=self.directory)
+        checkpoint.load()
+        with self.assertRaises(ValueError):
+            checkpoint.skip(iter(self.test_data[::-1]))
+
+    def test_remove(self):
+        self.interrupted_run(10)
+        checkpoint = Checkpoint(6, directory=self.directory)
+        checkpoint.remove()
+        self.assertFalse(checkpoint.exists())
+
+    def test_free_checkpoint_is_apart(self):
+        self.interrupted_run(10)
+        self.assertTrue(Checkpoint(6, directory=self.directory).exists())
+        self.assertFalse(Checkpoint(6, directory=self.directory, name="6_free").exists())
+
+    def test_chunked(self):
+        self.assertEqual(list(chunked(iter(range(5)), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(chunked(())), [])
@@ -0,0 +1,93 @@
+import unittest
+import os
+from libraries.canonical import canonical_children
+from libraries.packing import pack
+from libraries.dedup import ExternalIdSet, U64IdSet, parse_size, unknown_ids
+from .utils import get_test_data
+
+class ExternalDedupTests(unittest.TestCase):
+    def test_external_matches_set(self):
+        test_data = get_test_data()
+        expected = set()
+        with ExternalIdSet(max_memory=2048) as known_ids:
+            for cube_ids in canonical_children(test_data):
+                expected.update(cube_ids.tolist())
+                known_ids.update(cube_ids.tolist())
+
+            self.assertGreater(len(known_ids.runs), 1, "ids were never spilled to disk")
+            self.assertEqual(len(known_ids), len(expected))
+            self.assertEqual(list(known_ids), sorted(expected))
+
+    def test_external_in_memory(self):
+        test_data = get_test_data()
+        expected = set()
+        with ExternalIdSet(max_memory=1 << 30) as known_ids:
+            for cube_ids in canonical_children(test_data):
+                expected.update(cube_ids.tolist())
+                known_ids.update(cube_ids.tolist())
+
+            self.assertEqual(len(known_ids.runs), 0)
+            self.assertEqual(list(known_ids), sorted(expected))
+
+    def test_external_merge_passes(self):
+        test_data = get_test_data()
+        expected = set()
+        with ExternalIdSet(max_memory=0) as known_ids:
+            known_ids.merge_fan_in = 3
+            for cube_ids in canonical_children(test_data):
+                expected.update(cube_ids.tolist())
+                known_ids.update(cube_ids.tolist())
+
+            self.assertEqual(list(known_ids), sorted(expected))
+            self.assertEqual(len(known_ids.runs), 1)
+
+    def test_external_close(self):
+        known_ids = ExternalIdSet(max_memory=0)
+        known_ids.add(b'\x01\x01\x01\x01')
+        known_ids.close()
+        self.assertFalse(os.path.exists(known_ids.directory))
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size("512"), 512)
+        self.assertEqual(parse_size("4k"), 4096)
+        self.assertEqual(parse_size("1.5G"), 3 << 29)
+        self.assertEqual(parse_size("8GB"), 8 << 30)
+
+
+class U64DedupTests(unittest.TestCase):
+    def test_u64_matches_set(self):
+        test_data = get_test_data()
+        expected = set()
+        known_ids = U64IdSet(compact_size=16)
+        for cube_ids in canonical_children(test_data):
+            expected.update(cube_ids.tolist())
+            known_ids.update(cube_ids.tolist())
+
+        self.assertEqual(len(known_ids), len(expected))
+        self.assertEqual(set(known_ids), expected)
+        self.assertEqual(known_ids.memory(), 16 * len(expected))
+
+    def test_u64_mixed_shapes(self):
+        test_data = get_test_data()
+        known_ids = U64IdSet()
+        known_ids.update(pack(polycube) for polycube in test_data)
+        known_ids.update(pack(polycube) for polycube in test_data)
+        self.assertEqual(set(known_ids), set(pack(polycube) for polycube in test_data))
+
+    def test_unknown_ids(self):
+        cube_ids = [pack(polycube) for polycube in get_test_data()]
+        known, batch = set(cube_ids[::2]), set(cube_ids)
+        expected = batch - known
+
+        # the known ids are split between the sorted array, the pending and the incoming ids
+        u64_ids = U64IdSet(compact_size=1 << 30, chunk_size=8)
+        u64_ids.update(cube_ids[:20:2])
+        u64_ids.compact()
+        u64_ids.update(cube_ids[20::2])
+        self.assertEqual(unknown_ids(u64_ids, batch), expected)
+        self.assertEqual(unknown_ids(known, batch), expected)
+        for max_memory in [1 << 30, 0]:
+            with ExternalIdSet(max_memory=max_memory) as external_ids:
+                external_ids.update(sorted(known)[:10])
+                external_ids.update(sorted(known)[10:])
+                self.assertEqual(unknown_ids(external_ids, batch), expected)
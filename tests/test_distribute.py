@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from libraries.cache import PackedCache, save_cache, packed_cache_path_fstring
+from libraries.canonical import canonical_children
+from libraries.distribute import distribute_local, parent_range
+from libraries.packing import pack
+from .utils import get_test_data
+
+class DistributeTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.test_data = list(get_test_data())
+        save_cache(98, self.test_data)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        for n in [98, 99]:
+            if os.path.exists(packed_cache_path_fstring.format(n)):
+                os.remove(packed_cache_path_fstring.format(n))
+
+    def test_parent_ranges_cover_cache(self):
+        cache = PackedCache(packed_cache_path_fstring.format(98))
+        parents = []
+        for node in range(3):
+            start, stop = parent_range(len(cache), node, 3)
+            for polycubes in cache.iter_polycubes(4, start, stop):
+                parents.extend(pack(polycube) for polycube in polycubes)
+        self.assertEqual(sorted(parents), sorted(pack(polycube) for polycube in self.test_data))
+
+    def test_distribute_matches_serial(self):
+        expected = set()
+        for cube_ids in canonical_children(self.test_data):
+            expected.update(cube_ids.tolist())
+
+        count = distribute_local(99, nodes=3, shards=4, directory=self.directory, batch_size=5)
+        self.assertEqual(count, len(expected))
+        cache = PackedCache(packed_cache_path_fstring.format(99))
+        found = {record.tobytes() for records in cache.iter_records() for record in records}
+        self.assertEqual(found, expected)
+        self.assertFalse(os.path.exists(self.directory))
+
+    def test_reduce_ignores_stale_map_files(self):
+        expected = set()
+        for cube_ids in canonical_children(self.test_data):
+            expected.update(cube_ids.tolist())
+
+        # a map file of a node of an earlier run with more nodes
+        stale_id = pack(np.ones((1, 1, 1), dtype=np.byte))
+        os.makedirs(os.path.join(self.directory, "shard_0"))
+        with open(os.path.join(self.directory, "shard_0", "map_5.ids"), "wb") as map_file:
+            map_file.write(stale_id)
+        count = distribute_local(99, nodes=2, shards=1, directory=self.directory, batch_size=5)
+        self.assertEqual(count, len(expected))
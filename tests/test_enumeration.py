@@ -0,0 +1,38 @@
+import unittest
+from libraries.canonical import canonical_children
+from libraries.enumeration import KNOWN_COUNTS, accepted_children, canonical_deletion, check_count, enumerate_children, iter_polycubes
+from libraries.packing import unpack
+from .utils import get_test_data
+
+class EnumerationTests(unittest.TestCase):
+    def test_counts_match_known_counts(self):
+        for n in range(1, 8):
+            self.assertEqual(sum(1 for _ in iter_polycubes(n)), KNOWN_COUNTS[n], f"wrong number of polycubes n={n}")
+
+    def test_each_polycube_once(self):
+        test_data = get_test_data()
+        expected = set()
+        for cube_ids in canonical_children(test_data):
+            expected.update(cube_ids.tolist())
+
+        found = [cube_id for polycube in test_data for cube_id in accepted_children(polycube)]
+        self.assertEqual(len(found), len(set(found)), "a polycube was accepted by several parents")
+        self.assertEqual(set(found), expected)
+
+    def test_enumerate_children_workers(self):
+        test_data = get_test_data()
+        serial = [cube_id for cube_ids in enumerate_children(test_data, chunk_size=4) for cube_id in cube_ids]
+        parallel = [cube_id for cube_ids in enumerate_children(test_data, workers=2, chunk_size=4) for cube_id in cube_ids]
+        self.assertEqual(sorted(serial), sorted(parallel))
+        self.assertEqual(len(serial), KNOWN_COUNTS[6])
+
+    def test_canonical_deletion_connected(self):
+        for cube_id in iter_polycubes(6):
+            parent = canonical_deletion(unpack(cube_id))
+            self.assertEqual(parent.sum(), 5)
+
+    def test_check_count(self):
+        self.assertTrue(check_count(5, 29))
+        self.assertFalse(check_count(5, 30))
+        self.assertFalse(check_count(5, 29, cached_count=28))
+        self.assertTrue(check_count(40, 1))
@@ -0,0 +1,20 @@
+import unittest
+from libraries.invariants import fingerprint
+from libraries.rotation import all_rotations
+from .utils import get_test_data
+
+class FingerprintTests(unittest.TestCase):
+    def test_fingerprint_rotation_invariant(self):
+        test_data = get_test_data()
+        for polycube in test_data:
+            expected = fingerprint(polycube)
+            for rotation in all_rotations(polycube):
+                self.assertEqual(fingerprint(rotation), expected, f"fingerprint of polycube {polycube} changed by rotation")
+
+    def test_fingerprint_hashable(self):
+        test_data = get_test_data()
+        for polycube in test_data:
+            try:
+                hash(fingerprint(polycube))
+            except:
+                self.fail(f"fingerprint of pollycube {polycube} isnt hashable")
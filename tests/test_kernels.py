@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+from libraries import kernels
+from libraries.canonical import CanonicalStats, canonical_ids, canonical_rotations
+from libraries.resizing import expand_cube_bulk
+from .utils import get_test_data
+
+class KernelTests(unittest.TestCase):
+    def stacks(self):
+        # the children of the test data, stacked by shape
+        groups = {}
+        for polycube in get_test_data():
+            for children in expand_cube_bulk(polycube):
+                groups.setdefault(children.shape[1:], []).append(children)
+        return [np.concatenate(children) for children in groups.values()]
+
+    def test_kernel_matches_numpy(self):
+        # the kernel runs as plain Python without numba, much slower but with the same results
+        for reflections in [False, True]:
+            for polycubes in self.stacks()[:8]:
+                shapes, permutations = canonical_rotations(polycubes.shape[1:], reflections)
+                flat = polycubes.reshape(len(polycubes), -1).astype(np.uint8)
+                bits = np.empty((len(polycubes), -(-flat.shape[1] // 8)), dtype=np.uint8)
+                kernels.canonical_bits(flat, permutations, bits)
+                found = [bytes(shapes[0].tolist()) + row.tobytes() for row in bits]
+                self.assertEqual(found, canonical_ids(polycubes, reflections=reflections).tolist())
+
+    @unittest.skipUnless(kernels.NUMBA_AVAILABLE, "numba is not installed")
+    def test_compiled_kernel_matches_numpy(self):
+        for reflections in [False, True]:
+            for polycubes in self.stacks():
+                kernels.use_numba(False)
+                expected, expected_stats = canonical_ids(polycubes, reflections=reflections).tolist(), CanonicalStats()
+                canonical_ids(polycubes, expected_stats, reflections)
+                kernels.use_numba(True)
+                stats = CanonicalStats()
+                self.assertEqual(canonical_ids(polycubes, stats, reflections).tolist(), expected)
+                self.assertEqual((stats.checked, stats.skipped), (expected_stats.checked, expected_stats.skipped))
+
+    @unittest.skipIf(kernels.NUMBA_AVAILABLE, "numba is installed")
+    def test_numba_missing(self):
+        self.assertFalse(kernels.numba_enabled())
+        with self.assertRaises(ValueError):
+            kernels.use_numba(True)
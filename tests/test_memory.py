@@ -0,0 +1,36 @@
+import sys
+import unittest
+from unittest import mock
+from libraries import memory
+from libraries.dedup import U64IdSet
+from libraries.memory import deep_size, format_mib, peak_rss, representation_sizes
+from libraries.packing import pack
+from libraries.parallel import ShardedIds
+from .utils import get_test_data
+
+class MemoryTests(unittest.TestCase):
+    def test_deep_size_counts_ids(self):
+        cube_ids = {pack(polycube) for polycube in get_test_data()}
+        self.assertEqual(deep_size(cube_ids),
+                         sys.getsizeof(cube_ids) + sum(sys.getsizeof(cube_id) for cube_id in cube_ids))
+        self.assertGreater(deep_size(ShardedIds([cube_ids, set()])), deep_size(cube_ids))
+
+        u64_ids = U64IdSet()
+        u64_ids.update(cube_ids)
+        self.assertEqual(deep_size(u64_ids), u64_ids.memory())
+
+    def test_representation_sizes(self):
+        test_data = list(get_test_data())
+        sizes = representation_sizes(test_data)
+        self.assertEqual(set(sizes), {"dense", "packed", "csr", "coo"})
+        self.assertLess(sizes["packed"], sizes["dense"])
+        self.assertEqual(sizes["packed"], sum(sys.getsizeof(pack(polycube)) for polycube in test_data) / len(test_data))
+
+    def test_peak_rss(self):
+        self.assertGreater(peak_rss(), 0)
+
+    def test_peak_rss_unavailable(self):
+        with mock.patch.object(memory, "resource", None), mock.patch.object(memory, "psutil", None):
+            self.assertIsNone(peak_rss())
+        self.assertEqual(format_mib(None), "n/a")
+        self.assertEqual(format_mib(3 << 19), "1.5 MiB")
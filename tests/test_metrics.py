@@ -0,0 +1,51 @@
+import json
+import io
+import unittest
+from libraries.canonical import canonical_children
+from libraries.dedup import ExternalIdSet
+from libraries.metrics import GenerationMetrics, json_lines, known_size
+from libraries.parallel import ShardedIds
+from .utils import get_test_data
+
+class MetricsTests(unittest.TestCase):
+    def test_snapshots(self):
+        test_data = list(get_test_data())
+        snapshots = []
+        metrics = GenerationMetrics(snapshots.append, interval=0)
+        metrics.start(99, len(test_data))
+
+        known_ids = set()
+        candidates = 0
+        for cube_ids in canonical_children(test_data, metrics):
+            known_ids.update(cube_ids.tolist())
+            candidates += len(cube_ids)
+        metrics.update(len(test_data), len(known_ids))
+        metrics.finish(len(known_ids))
+
+        self.assertEqual(len(snapshots), 2)
+        final = snapshots[-1]
+        self.assertTrue(final["final"])
+        self.assertEqual(final["n"], 99)
+        self.assertEqual(final["candidates"], candidates)
+        self.assertEqual(final["duplicates"], candidates - len(known_ids))
+        self.assertEqual(final["rotations_checked"] + final["rotations_skipped"], 24 * candidates)
+        self.assertGreater(final["timings"]["expansion"], 0)
+        self.assertGreater(final["timings"]["packing"], 0)
+
+    def test_start_resets(self):
+        metrics = GenerationMetrics(lambda snapshot: None)
+        list(canonical_children(list(get_test_data())[:3], metrics))
+        metrics.start(5, 10)
+        self.assertEqual(metrics.candidates, 0)
+        self.assertEqual(metrics.timings["expansion"], 0)
+
+    def test_json_lines(self):
+        output = io.StringIO()
+        metrics = GenerationMetrics(json_lines(output))
+        metrics.finish(0)
+        self.assertEqual(json.loads(output.getvalue())["set_size"], 0)
+
+    def test_known_size(self):
+        self.assertEqual(known_size(ShardedIds([{b"a"}, {b"b", b"c"}])), 3)
+        with ExternalIdSet(1 << 20) as external:
+            self.assertIsNone(known_size(ShardedIds([set(), external])))
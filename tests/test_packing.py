@@ -1,6 +1,7 @@
 import unittest
 from numpy.testing import assert_array_equal
-from libraries.packing import pack, unpack
+import numpy as np
+from libraries.packing import pack, unpack, pack_u64, unpack_u64, ids_to_u64, u64_to_ids
 from .utils import get_test_data
 
 class PackingTests(unittest.TestCase):
@@ -49,4 +50,38 @@ class PackingTests(unittest.TestCase):
         for polycube in test_data:
             packed = pack(polycube)
             unpacked = unpack(packed)
-            assert_array_equal(polycube, unpacked, f"packing of polycube isnt symetric, unpacked polycube {polycube} packed to {packed} which unpacked to {unpacked}")
\ No newline at end of file
+            assert_array_equal(polycube, unpacked, f"packing of polycube isnt symetric, unpacked polycube {polycube} packed to {packed} which unpacked to {unpacked}")
+
+    def test_pack_u64_symetric(self):
+        test_data = get_test_data()
+        for polycube in test_data:
+            packed = pack_u64(polycube)
+            self.assertEqual(packed.dtype, np.uint64)
+            self.assertEqual(packed.shape, (2,))
+            unpacked = unpack_u64(packed)
+            assert_array_equal(polycube, unpacked, f"u64 packing of polycube isnt symetric, unpacked polycube {polycube} packed to {packed} which unpacked to {unpacked}")
+
+    def test_pack_u64_unique(self):
+        test_data = get_test_data()
+        seen = set()
+        for polycube in test_data:
+            packed = tuple(pack_u64(polycube).tolist())
+            self.assertNotIn(packed, seen)
+            seen.add(packed)
+
+    def test_pack_u64_matches_pack(self):
+        test_data = get_test_data()
+        for polycube in test_data:
+            packed = pack(polycube)
+            records = np.frombuffer(packed, dtype=np.uint8)[np.newaxis]
+            words = ids_to_u64(records)
+            assert_array_equal(words[0], pack_u64(polycube))
+            self.assertEqual(u64_to_ids(words), [packed])
+
+    def test_pack_u64_bounds(self):
+        for shape in [(16, 1, 1), (1, 16, 1), (1, 1, 16), (4, 4, 7), (2, 3, 4)]:
+            polycube = np.ones(shape, dtype=np.int8)
+            assert_array_equal(unpack_u64(pack_u64(polycube)), polycube)
+        for shape in [(17, 1, 1), (5, 5, 5)]:
+            with self.assertRaises(ValueError):
+                pack_u64(np.ones(shape, dtype=np.int8))
\ No newline at end of file
@@ -0,0 +1,22 @@
+import unittest
+from libraries.canonical import canonical_children
+from libraries.parallel import generate_ids_parallel, shard_of
+from .utils import get_test_data
+
+class ParallelTests(unittest.TestCase):
+    def test_parallel_matches_serial(self):
+        test_data = list(get_test_data())
+        expected = set()
+        for cube_ids in canonical_children(test_data):
+            expected.update(cube_ids.tolist())
+
+        known_ids = generate_ids_parallel(test_data, workers=2, batch_size=7)
+        self.assertEqual(len(known_ids), len(expected))
+        self.assertEqual(set(known_ids), expected)
+
+    def test_shards_disjoint(self):
+        test_data = list(get_test_data())
+        known_ids = generate_ids_parallel(test_data, workers=3, batch_size=5)
+        for index, shard in enumerate(known_ids.shards):
+            for cube_id in shard:
+                self.assertEqual(shard_of(cube_id, 3), index, "id stored in a shard that doesnt own it")
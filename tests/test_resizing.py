@@ -1,9 +1,29 @@
 import unittest
 import os
-from libraries.resizing import crop_cube, expand_cube
+from libraries.packing import pack
+from libraries.resizing import crop_cube, expand_cube, expand_cube_bulk
 from .utils import get_test_data
 
 class CroppingTests(unittest.TestCase):
     #todo
     # i am not smart enough to come up with helpful cropping tests right now.
-    pass
\ No newline at end of file
+    pass
+
+
+class ExpansionTests(unittest.TestCase):
+    def test_bulk_matches_expand_cube(self):
+        test_data = get_test_data()
+        for polycube in test_data:
+            expected = sorted(pack(new_cube) for new_cube in expand_cube(polycube))
+            bulk = sorted(pack(new_cube) for stack in expand_cube_bulk(polycube) for new_cube in stack)
+            self.assertEqual(bulk, expected, f"bulk expansion of polycube {polycube} differs from expand_cube")
+
+    def test_bulk_stacks_cropped(self):
+        test_data = get_test_data()
+        for polycube in test_data:
+            stacks = expand_cube_bulk(polycube)
+            self.assertLessEqual(len(stacks), 7)
+            for stack in stacks:
+                for new_cube in stack:
+                    self.assertEqual(new_cube.sum(), polycube.sum() + 1)
+                    self.assertEqual(crop_cube(new_cube).shape, new_cube.shape, "bulk expansion left zero padding")
\ No newline at end of file
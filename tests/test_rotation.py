@@ -1,6 +1,6 @@
 import unittest
 import numpy as np
-from libraries.rotation import all_rotations
+from libraries.rotation import all_rotations, all_symmetries, rotation_table, RotationTableCache
 from .utils import get_test_data
 
 class RotatingTests(unittest.TestCase):
@@ -23,4 +23,41 @@ class RotatingTests(unittest.TestCase):
                         if np.array_equal(rotated_cube_rotation, inner_base_polycube_rotation):
                             found_match = True
                             break
-                    self.assertTrue(found_match, "rotation of a rotated polycube wasnt in the set of all rotations for the initial pollycube, rotating it twice has changed its shape")
\ No newline at end of file
+                    self.assertTrue(found_match, "rotation of a rotated polycube wasnt in the set of all rotations for the initial pollycube, rotating it twice has changed its shape")
+
+    def test_rotation_table_matches_all_rotations(self):
+        test_data = get_test_data()
+        for polycube in test_data:
+            table = rotation_table(polycube.shape)
+            self.assertEqual(table.permutations.shape, (24, polycube.size))
+            for rotation, shape, permutation in zip(all_rotations(polycube), table.shapes, table.permutations):
+                self.assertEqual(rotation.shape, tuple(shape))
+                self.assertTrue(np.array_equal(polycube.flatten()[permutation].reshape(shape), rotation),
+                                "rotation table gathered a different rotation than all_rotations")
+
+    def test_rotation_table_cache(self):
+        cache = RotationTableCache(maxsize=2)
+        first = cache.get((1, 2, 3))
+        self.assertIs(cache.get((1, 2, 3)), first)
+        cache.get((2, 2, 3))
+        cache.get((1, 2, 3))
+        cache.get((3, 2, 3))
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (2, 3, 1))
+        self.assertIn((1, 2, 3), cache.tables, "most recently used table was evicted")
+        self.assertNotIn((2, 2, 3), cache.tables, "least recently used table wasnt evicted")
+
+    def test_symmetry_table_matches_all_symmetries(self):
+        test_data = get_test_data()
+        for polycube in test_data:
+            table = rotation_table(polycube.shape, reflections=True)
+            self.assertEqual(table.permutations.shape, (48, polycube.size))
+            self.assertTrue(np.array_equal(table.permutations[:24], rotation_table(polycube.shape).permutations))
+            for symmetry, shape, permutation in zip(all_symmetries(polycube), table.shapes, table.permutations):
+                self.assertTrue(np.array_equal(polycube.flatten()[permutation].reshape(shape), symmetry))
+
+    def test_reflections_are_not_rotations(self):
+        # the mirror image of a chiral polycube is none of its rotations
+        chiral = np.array([[[1, 1], [0, 1]], [[0, 0], [0, 1]]], dtype=np.byte)
+        mirror = np.flip(chiral, axis=0)
+        self.assertFalse(any(np.array_equal(rotation, mirror) for rotation in all_rotations(chiral)))
+        self.assertTrue(any(np.array_equal(symmetry, mirror) for symmetry in all_symmetries(chiral)))
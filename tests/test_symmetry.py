@@ -0,0 +1,28 @@
+import unittest
+from libraries.canonical import canonical_children
+from libraries.packing import pack
+from libraries.symmetry import SymmetryCounts
+from .utils import get_test_data
+
+class SymmetryTests(unittest.TestCase):
+    def test_one_sided_ids(self):
+        counts = SymmetryCounts(5)
+        counts.add(pack(polycube) for polycube in get_test_data())
+        self.assertEqual((counts.one_sided, counts.free, counts.chiral, counts.achiral, counts.fixed),
+                         (29, 23, 6, 17, 534))
+        self.assertEqual(counts.check(), [])
+
+    def test_free_ids(self):
+        free_ids = set()
+        for cube_ids in canonical_children(get_test_data(), reflections=True):
+            free_ids.update(cube_ids.tolist())
+        counts = SymmetryCounts(6, reflections=True)
+        counts.add(free_ids)
+        self.assertEqual((counts.free, counts.one_sided, counts.fixed), (112, 166, 3481))
+        self.assertEqual(sum(counts.group_orders.values()), 112)
+        self.assertEqual(counts.check(), [])
+
+    def test_check_reports_mismatch(self):
+        counts = SymmetryCounts(6)
+        counts.add(pack(polycube) for polycube in get_test_data())
+        self.assertEqual(len(counts.check()), 3)